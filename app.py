@@ -3,11 +3,12 @@ Secure File Shredder - Main Launcher
 Military-grade file destruction tool
 """
 
-from gui import ModernShredderGUI
-
 
 def main():
     """Launch the application"""
+    # Imported here so importing this module doesn't load tkinter
+    from gui import ModernShredderGUI
+
     app = ModernShredderGUI()
     app.run()
 
@@ -0,0 +1 @@
+"""Benchmarks for the shredding engine"""
@@ -0,0 +1,344 @@
+"""
+Benchmark harness for ShredderEngine and FreeSpaceShredder
+
+Each case (workload x method x I/O options x target directory) runs in a
+fresh subprocess so CPU time and peak RSS are measured per case. Results
+are written as JSON and can be compared against a stored baseline.
+
+Import time of the package's entry points is measured the same way, with
+``python -X importtime`` in fresh interpreters.
+
+Examples:
+    python -m benchmarks.bench_engine --targets /dev/shm /var/tmp --output results.json
+    python -m benchmarks.bench_engine --baseline baseline.json --threshold 0.15
+    python -m benchmarks.bench_engine --free-space /mnt/loop --methods simple
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+KIB = 1024
+MIB = 1024 * KIB
+
+# name -> (file count, file size in bytes, sparse)
+WORKLOADS = {
+    'tiny': (2000, 2 * KIB, False),
+    'small': (200, 64 * KIB, False),
+    'medium': (20, 8 * MIB, False),
+    'large': (2, 128 * MIB, False),
+    'sparse': (4, 64 * MIB, True),
+}
+
+METHODS = ('simple', 'dod', 'random_7', 'gutmann')
+IO_BACKENDS = ('write', 'mmap')
+SYNC_POLICIES = ('per_pass', 'final', 'batched')
+
+# Entry points whose import time is tracked: the package, the overwrite
+# path and the CLI (what `python -m core` loads)
+IMPORT_MODULES = ('core', 'core.shredder_engine', 'core.cli')
+
+
+def default_targets():
+    """tmpfs when available, plus the system temp directory"""
+    targets = []
+    if os.path.isdir('/dev/shm'):
+        targets.append('/dev/shm')
+    targets.append(tempfile.gettempdir())
+    return targets
+
+
+def _usage():
+    """(cpu seconds, peak RSS in bytes) of this process so far"""
+    if resource is None:
+        return time.process_time(), 0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss * scale
+
+
+def _create_files(directory: Path, count: int, size: int, sparse: bool) -> list:
+    """Create the workload's files; sparse files get data only in their first block"""
+    paths = []
+    chunk = os.urandom(min(size, MIB)) if size else b''
+    for i in range(count):
+        path = directory / f'bench_{i:06d}.bin'
+        with open(path, 'wb') as f:
+            if sparse:
+                f.write(chunk[:64 * KIB])
+                f.truncate(size)
+            else:
+                remaining = size
+                while remaining > 0:
+                    n = min(len(chunk), remaining)
+                    f.write(chunk[:n])
+                    remaining -= n
+        paths.append(str(path))
+    return paths
+
+
+def run_case(case: dict) -> dict:
+    """Run one benchmark case in this process and return its metrics"""
+    from core.shredder_engine import FreeSpaceShredder, ShredderEngine
+
+    work_dir = Path(tempfile.mkdtemp(prefix='shredder_bench_', dir=case['target']))
+    try:
+        if case['workload'] == 'free_space':
+            shredder = FreeSpaceShredder(random_source=case['random_source'],
+                                         block_size=case['block_size'])
+            cpu_start, _ = _usage()
+            start = time.perf_counter()
+            result = shredder.shred_free_space(str(work_dir), method=case['method'])
+            elapsed = time.perf_counter() - start
+            cpu_end, peak_rss = _usage()
+            written = result.get('bytes_written', 0)
+            files = 1
+            failed = 0 if result.get('success') else 1
+        else:
+            count, size, sparse = WORKLOADS[case['workload']]
+            paths = _create_files(work_dir, count, size, sparse)
+            engine = ShredderEngine(random_source=case['random_source'],
+                                    block_size=case['block_size'],
+                                    sync_policy=case['sync_policy'],
+                                    io_backend=case.get('io_backend', 'write'))
+            cpu_start, _ = _usage()
+            start = time.perf_counter()
+            results = list(engine.shred_many(paths, method=case['method'],
+                                             workers=case['workers']))
+            elapsed = time.perf_counter() - start
+            cpu_end, peak_rss = _usage()
+            written = sum(r['bytes_written'] for r in results if r['success'])
+            files = len(results)
+            failed = sum(1 for r in results if not r['success'])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        **case,
+        'seconds': elapsed,
+        'bytes_written': written,
+        'mb_per_s': written / MIB / elapsed if elapsed > 0 else 0.0,
+        'files_per_s': files / elapsed if elapsed > 0 else 0.0,
+        'cpu_seconds': cpu_end - cpu_start,
+        'peak_rss_bytes': peak_rss,
+        'failed': failed,
+    }
+
+
+def case_key(case: dict) -> str:
+    """Stable identifier used to match results against a baseline"""
+    block = case['block_size'] or 'auto'
+    parts = [case['target_label'], case['workload'], case['method'], case['sync_policy'],
+             block, case['random_source'], f"w{case['workers']}"]
+    # Keys from before backends were selectable stay valid for write()
+    if case.get('io_backend', 'write') != 'write':
+        parts.append(case['io_backend'])
+    return '/'.join(str(part) for part in parts)
+
+
+def build_cases(args) -> list:
+    """Expand the command-line matrix into case dicts"""
+    cases = []
+    for target in args.targets:
+        label = Path(target).name or target
+        matrix = itertools.product(args.workloads, args.methods, args.sync_policies,
+                                   args.block_sizes, args.random_sources, args.io_backends)
+        for workload, method, sync_policy, block_size, random_source, backend in matrix:
+            cases.append({
+                'target': target, 'target_label': label, 'workload': workload,
+                'method': method, 'sync_policy': sync_policy, 'block_size': block_size,
+                'random_source': random_source, 'workers': args.workers,
+                'io_backend': backend,
+            })
+
+    if args.free_space:
+        for method, block_size, random_source in itertools.product(
+                args.methods, args.block_sizes, args.random_sources):
+            cases.append({
+                'target': args.free_space, 'target_label': Path(args.free_space).name,
+                'workload': 'free_space', 'method': method, 'sync_policy': 'final',
+                'block_size': block_size, 'random_source': random_source, 'workers': 1,
+            })
+    return cases
+
+
+def run_isolated(case: dict) -> dict:
+    """Run a case in a child interpreter so CPU and RSS are per case"""
+    proc = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_engine', '--run-case', json.dumps(case)],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return {**case, 'error': proc.stderr.strip().splitlines()[-1:] or ['failed']}
+    return json.loads(proc.stdout)
+
+
+def measure_import(module: str, runs: int) -> dict:
+    """
+    Import time of module in fresh interpreters (python -X importtime)
+
+    Reports the fastest of runs cumulative times, which filters out noise
+    from the page cache and other processes, and how many modules the
+    import loaded.
+    """
+    best = None
+    loaded = 0
+    for _ in range(max(1, runs)):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                              cwd=REPO_ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {'module': module, 'error': proc.stderr.strip().splitlines()[-1:] or ['failed']}
+        # "import time: self [us] | cumulative | imported package"
+        lines = [line.split('|') for line in proc.stderr.splitlines()
+                 if line.startswith('import time:') and '[us]' not in line]
+        loaded = len(lines)
+        for _self_us, cumulative, name in lines:
+            if name.strip() == module:
+                micros = int(cumulative)
+                best = micros if best is None else min(best, micros)
+    return {'module': module, 'import_ms': (best or 0) / 1000, 'modules_loaded': loaded}
+
+
+def compare(results: list, baseline: dict, threshold: float,
+            import_threshold: float = 0.25) -> list:
+    """
+    Cases whose throughput dropped more than threshold below the baseline,
+    or whose import time grew more than import_threshold above it
+    """
+    regressions = []
+    for result in results:
+        reference = baseline.get(result['key'])
+        if reference and 'import_ms' in result:
+            old, new = reference.get('import_ms', 0), result['import_ms']
+            if old > 0 and new > old * (1 + import_threshold):
+                regressions.append({'key': result['key'], 'metric': 'import_ms',
+                                    'baseline': old, 'current': new,
+                                    'change': new / old - 1})
+            continue
+        if not reference or 'mb_per_s' not in result:
+            continue
+        for metric in ('mb_per_s', 'files_per_s'):
+            old, new = reference.get(metric, 0), result[metric]
+            if old > 0 and new < old * (1 - threshold):
+                regressions.append({'key': result['key'], 'metric': metric,
+                                    'baseline': old, 'current': new,
+                                    'change': new / old - 1})
+    return regressions
+
+
+def parse_block_size(value: str):
+    """argparse type for --block-sizes"""
+    return None if value == 'auto' else int(value)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the benchmark argument parser"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--targets', nargs='+', default=default_targets(),
+                        help='Directories to benchmark in (tmpfs, disk, loop mounts)')
+    parser.add_argument('--workloads', nargs='+', choices=sorted(WORKLOADS),
+                        default=['tiny', 'small', 'medium', 'large', 'sparse'])
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=list(METHODS))
+    parser.add_argument('--sync-policies', nargs='+', choices=SYNC_POLICIES,
+                        default=['per_pass'])
+    parser.add_argument('--block-sizes', nargs='+', type=parse_block_size, default=[None],
+                        help="Block sizes in bytes, or 'auto'")
+    parser.add_argument('--random-sources', nargs='+', choices=('urandom', 'stream'),
+                        default=['urandom'])
+    parser.add_argument('--io-backends', nargs='+', choices=IO_BACKENDS, default=['write'],
+                        help='How pattern passes are written (compare with: write mmap)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--free-space', metavar='DIR',
+                        help='Also benchmark free-space wiping in DIR (fills that filesystem!)')
+    parser.add_argument('--import-modules', nargs='*', default=list(IMPORT_MODULES),
+                        help='Modules whose import time is measured (none to skip)')
+    parser.add_argument('--import-runs', type=int, default=7,
+                        help='Fresh interpreters per import measurement (default: 7)')
+    parser.add_argument('--output', help='Write results JSON here')
+    parser.add_argument('--baseline', help='Compare against this results JSON')
+    parser.add_argument('--save-baseline', help='Store these results as a baseline')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Allowed throughput drop before flagging (default: 0.10)')
+    parser.add_argument('--import-threshold', type=float, default=0.25,
+                        help='Allowed import time growth before flagging (default: 0.25; '
+                             'startup timings are noisier than throughput)')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return 0
+
+    results = []
+    for case in build_cases(args):
+        result = run_isolated(case)
+        result['key'] = case_key(case)
+        results.append(result)
+        if 'error' in result:
+            print(f"{result['key']:<70} ERROR {result['error']}", file=sys.stderr)
+        else:
+            print(f"{result['key']:<70} {result['mb_per_s']:9.1f} MB/s "
+                  f"{result['files_per_s']:9.1f} files/s "
+                  f"cpu {result['cpu_seconds']:6.2f}s "
+                  f"rss {result['peak_rss_bytes'] / MIB:6.1f} MB", file=sys.stderr)
+
+    for module in args.import_modules:
+        result = measure_import(module, args.import_runs)
+        result['key'] = f'import/{module}'
+        results.append(result)
+        if 'error' in result:
+            print(f"{result['key']:<70} ERROR {result['error']}", file=sys.stderr)
+        else:
+            print(f"{result['key']:<70} {result['import_ms']:9.1f} ms import "
+                  f"{result['modules_loaded']:9d} modules", file=sys.stderr)
+
+    report = {'generated': time.time(), 'python': sys.version.split()[0], 'results': results}
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {r['key']: r for r in json.load(f)['results']}
+        report['regressions'] = compare(results, baseline, args.threshold,
+                                         args.import_threshold)
+        for regression in report['regressions']:
+            print(f"REGRESSION {regression['key']} {regression['metric']}: "
+                  f"{regression['baseline']:.1f} -> {regression['current']:.1f} "
+                  f"({regression['change']:+.0%})", file=sys.stderr)
+        if report['regressions']:
+            exit_code = 1
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if not args.output:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,3 +2,41 @@
 
 __version__ = "1.0.0"
 __author__ = "Your Name"
+
+# Public names, imported from their modules on first access so that
+# `import core` stays cheap and each entry point loads only what it uses
+_EXPORTS = {
+    'ShredderEngine': 'shredder_engine',
+    'FreeSpaceShredder': 'shredder_engine',
+    'ShredCancelled': 'shredder_engine',
+    'SYNC_POLICIES': 'shredder_engine',
+    'AsyncShredderEngine': 'async_engine',
+    'ShredInterrupted': 'async_engine',
+    'MethodRegistry': 'methods',
+    'ShredJournal': 'journal',
+    'ShredPlanner': 'planner',
+    'WatchFolderShredder': 'watcher',
+    'ProgressTracker': 'progress',
+    'IOScheduler': 'scheduler',
+    'DeviceBudget': 'scheduler',
+    'MetricsRegistry': 'metrics',
+    'PrometheusTextfile': 'metrics',
+    'JsonLinesTrace': 'metrics',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
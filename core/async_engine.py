@@ -0,0 +1,153 @@
+"""
+asyncio front end for ShredderEngine
+Runs blocking shred jobs on a bounded thread pool so one event loop can
+drive many of them, with backpressure and pass-boundary cancellation
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Optional, Union
+
+from .shredder_engine import ShredderEngine
+
+
+class ShredInterrupted(Exception):
+    """
+    shred_many was closed or failed while jobs were finishing
+
+    ``results`` holds the results it never yielded, files already shredded
+    included.
+    """
+
+    def __init__(self, results: List[dict]):
+        super().__init__(f"{len(results)} shred result(s) not yielded")
+        self.results = results
+
+
+class AsyncShredderEngine:
+    """
+    Awaitable shredding on top of a ShredderEngine
+
+    At most ``max_concurrency`` jobs run at once, each on a thread of a
+    private pool; further calls wait their turn without blocking the loop.
+    Cancelling a task asks its job to stop at the next pass boundary and
+    waits for it to get there, so a cancelled file never holds a partly
+    written pass it would claim to have done; it is left in place (and can
+    be resumed when the engine has a journal). A job already in its last
+    pass finishes; if it succeeded, the file is gone and its result is
+    returned instead of raising.
+
+    Example:
+        async with AsyncShredderEngine(max_concurrency=8, sync_policy='final') as shredder:
+            async for result in shredder.shred_many(paths, method='dod'):
+                print(result['path'], result['success'])
+    """
+
+    def __init__(self, engine: Optional[ShredderEngine] = None, max_concurrency: int = 4,
+                 **engine_options):
+        """
+        Args:
+            engine: Engine to run jobs with (default: ShredderEngine(**engine_options))
+            max_concurrency: Maximum number of jobs running at once
+            engine_options: ShredderEngine options, when no engine is given
+        """
+        self.engine = engine or ShredderEngine(**engine_options)
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                            thread_name_prefix='shredder')
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def shred_file(self, file_path: str, method: str = 'dod',
+                         verify: Union[bool, str] = True) -> dict:
+        """
+        Shred one file (see ShredderEngine.shred_file)
+
+        A cancel that arrives after the last pass has started can't stop the
+        job; if the job then succeeds, its result is returned and the
+        cancellation is withdrawn (the file is gone either way).
+
+        Raises:
+            asyncio.CancelledError: once the job has stopped, unless it succeeded
+        """
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            cancel = threading.Event()
+            future = loop.run_in_executor(self._executor, self.engine.shred_file,
+                                          file_path, method, verify, cancel)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                cancel.set()
+                # The thread can't be interrupted: wait for the boundary
+                await asyncio.wait([future])
+                if future.exception() is None and future.result()['success']:
+                    # Cancelled too late: the file is already gone
+                    task = asyncio.current_task()
+                    if hasattr(task, 'uncancel'):
+                        task.uncancel()
+                    return future.result()
+                raise
+
+    async def shred_many(self, paths: Union[Iterable[str], AsyncIterable[str]],
+                         method: str = 'dod',
+                         verify: Union[bool, str] = True) -> AsyncIterator[dict]:
+        """
+        Shred files as they arrive, yielding results in completion order
+
+        Paths are pulled only while fewer than ``max_concurrency`` jobs are
+        pending, so a slow consumer or a large (or endless) path source
+        never builds up an unbounded backlog. Closing the iterator cancels
+        the jobs still running.
+
+        Raises:
+            ShredInterrupted: when the iterator is closed (or the path source
+                fails) after jobs finished that were never yielded; a
+                cancelled consumer gets the same exception as the
+                CancelledError's __cause__
+        """
+        pending = set()
+        try:
+            async for path in _aiter(paths):
+                while len(pending) >= self.max_concurrency:
+                    done, pending = await asyncio.wait(pending,
+                                                       return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+                pending.add(asyncio.ensure_future(self.shred_file(path, method, verify)))
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        except BaseException as error:
+            for task in pending:
+                task.cancel()
+            outcomes = await asyncio.gather(*pending, return_exceptions=True)
+            late = [outcome for outcome in outcomes if isinstance(outcome, dict)]
+            if not late:
+                raise
+            if isinstance(error, asyncio.CancelledError):
+                # Cancellation must stay a plain CancelledError
+                raise error from ShredInterrupted(late)
+            raise ShredInterrupted(late) from error
+
+    async def close(self):
+        """Wait for running jobs and release the worker threads"""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+async def _aiter(paths: Union[Iterable[str], AsyncIterable[str]]) -> AsyncIterator[str]:
+    """Iterate a sync or async iterable of paths"""
+    if hasattr(paths, '__aiter__'):
+        async for path in paths:
+            yield path
+    else:
+        for path in paths:
+            yield path
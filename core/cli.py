@@ -0,0 +1,335 @@
+"""
+Headless command-line interface
+Shreds files without loading the GUI and streams one JSON result per line
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import Iterator, List, Tuple
+
+from .io_backend import IO_BACKENDS
+from .journal import ShredJournal
+from .methods import MethodRegistry
+from .metrics import JsonLinesTrace, PrometheusTextfile, Tee
+from .random_source import RANDOM_SOURCES
+from .scanner import scan_tree
+from .scheduler import DeviceBudget
+from .shredder_engine import SYNC_POLICIES, ShredderEngine
+from .verification import VERIFY_MODES
+
+
+def parse_budget(value: str) -> Tuple[str, DeviceBudget]:
+    """Parse a --device-budget value into (key, DeviceBudget)"""
+    key, sep, budget = value.rpartition('=')
+    jobs, _, mbps = budget.partition(':')
+    try:
+        if not sep or not key:
+            raise ValueError
+        bandwidth = float(mbps) * 1024 * 1024 if mbps else None
+        return key, DeviceBudget(int(jobs), bandwidth)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected KEY=JOBS[:MBPS], got {value!r}') from None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command-line argument parser"""
+    parser = argparse.ArgumentParser(
+        prog='python -m core',
+        description='Securely shred files. Shredded files CANNOT be recovered.'
+    )
+    parser.add_argument('paths', nargs='*',
+                        help="Files, directories or glob patterns ('-' reads paths from stdin)")
+    parser.add_argument('-m', '--method', default='dod',
+                        help='Shredding method: dod, gutmann, random_7, simple or one '
+                             'from --methods-file (default: dod)')
+    parser.add_argument('--methods-file', metavar='FILE', action='append', default=[],
+                        help='Load extra shredding methods from a JSON or TOML file')
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                        help='Files shredded concurrently (default: 4)')
+    parser.add_argument('--per-device', type=int, default=None,
+                        help='Concurrent files per device (default: by device type)')
+    parser.add_argument('--device-budget', metavar='KEY=JOBS[:MBPS]', action='append',
+                        type=parse_budget, default=[],
+                        help="Budget for a device kind (ssd, rotational, network, unknown) "
+                             "or mount point, e.g. rotational=1:80 or /mnt/nas=2")
+    parser.add_argument('--processes', action='store_true',
+                        help='Use worker processes instead of threads')
+    parser.add_argument('--sync-policy', choices=sorted(SYNC_POLICIES), default='per_pass',
+                        help='When overwritten data is flushed (default: per_pass)')
+    parser.add_argument('--batch-size', type=int, default=64,
+                        help="Files per syncfs with --sync-policy batched (default: 64)")
+    parser.add_argument('--random-source', choices=sorted(RANDOM_SOURCES), default='urandom',
+                        help='Random data source for random passes (default: urandom)')
+    parser.add_argument('--block-size', type=int, default=None,
+                        help='Write size in bytes (default: auto)')
+    parser.add_argument('--range-workers', type=int, default=1,
+                        help='Threads writing one large file in parallel (default: 1)')
+    parser.add_argument('--small-file-size', type=int, default=64 * 1024,
+                        help='Shred files up to this size a directory at a time '
+                             '(0 disables; default: 65536)')
+    parser.add_argument('--io-backend', choices=sorted(IO_BACKENDS), default='write',
+                        help='How pattern passes are written (default: write)')
+    parser.add_argument('--direct-io', action='store_true',
+                        help='Write with O_DIRECT where supported')
+    parser.add_argument('--renames', type=int, default=10,
+                        help='Random renames per file before unlinking (default: 10)')
+    parser.add_argument('--preserve-name-length', action='store_true',
+                        help='Rename through random names as long as the original')
+    parser.add_argument('--scrub-directories', action='store_true',
+                        help='Overwrite removed names in each directory once it is done')
+    parser.add_argument('--journal', metavar='FILE',
+                        help='Record progress in FILE; rerunning with it resumes interrupted files')
+    parser.add_argument('--resume', action='store_true',
+                        help='Also shred every unfinished file recorded in --journal')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Shred every file below directory arguments')
+    parser.add_argument('-0', '--null', action='store_true',
+                        help='Paths read from stdin are NUL-separated')
+    parser.add_argument('--no-verify', action='store_true',
+                        help='Skip deletion verification')
+    parser.add_argument('--verify-mode', choices=sorted(VERIFY_MODES), default='sampled',
+                        help='Read-back of the final pass (default: sampled)')
+    parser.add_argument('--fingerprint', action='store_true',
+                        help="Report each file's original SHA-256, hashed during the first pass")
+    parser.add_argument('--metrics-textfile', metavar='FILE',
+                        help='Write Prometheus metrics to FILE (node_exporter textfile collector)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='Append per-file phase timings and pass histograms to FILE (JSON lines)')
+    parser.add_argument('--plan', action='store_true',
+                        help='Dry run: print projected bytes, syscalls and time as JSON '
+                             'and shred nothing')
+    parser.add_argument('--plan-methods', nargs='+', metavar='METHOD',
+                        help='Methods to compare with --plan (default: --method)')
+    parser.add_argument('--plan-workers', nargs='+', type=int, metavar='N',
+                        help='Worker counts to compare with --plan (default: --workers)')
+    parser.add_argument('--watch', metavar='DIR', action='append', default=[],
+                        help='Run as a service shredding files dropped into DIR (repeatable)')
+    parser.add_argument('--settle', type=float, default=1.0,
+                        help='With --watch: seconds a file must stay unchanged (default: 1)')
+    parser.add_argument('--watch-batch', type=int, default=512,
+                        help='With --watch: most files per batch (default: 512)')
+    parser.add_argument('--watch-queue', type=int, default=100000,
+                        help='With --watch: most files tracked at once (default: 100000)')
+    parser.add_argument('--poll', action='store_true',
+                        help='With --watch: rescan directories instead of using inotify')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='With --watch --poll: seconds between scans (default: 1)')
+    parser.add_argument('--status-file', metavar='FILE',
+                        help='With --watch: write queue depth, lag and throughput to FILE (JSON)')
+    parser.add_argument('-y', '--yes', action='store_true',
+                        help='Confirm permanent deletion (required)')
+    return parser
+
+
+def _read_stdin_paths(null_separated: bool) -> Iterator[str]:
+    """Read a path list from stdin, one per line (or NUL-separated)"""
+    data = sys.stdin.read()
+    if null_separated:
+        entries = data.split('\0')
+    else:
+        entries = data.splitlines()
+    return (entry for entry in entries if entry)
+
+
+def expand_paths(args: argparse.Namespace, errors: List[dict]) -> Iterator[str]:
+    """Expand arguments, globs, stdin and (with -r) directories into file paths"""
+    seen = set()
+    sources = []
+
+    for arg in args.paths:
+        if arg == '-':
+            sources.extend(_read_stdin_paths(args.null))
+        elif glob.has_magic(arg):
+            matches = glob.glob(arg, recursive=True)
+            if not matches:
+                errors.append({'success': False, 'error': 'No match', 'file': arg, 'path': arg})
+            sources.extend(matches)
+        else:
+            sources.append(arg)
+
+    for path in sources:
+        if os.path.isdir(path):
+            if not args.recursive:
+                errors.append({'success': False, 'error': 'Is a directory (use -r)',
+                               'file': path, 'path': path})
+                continue
+            for batch in scan_tree(path):
+                for file_path, _size in batch:
+                    if file_path not in seen:
+                        seen.add(file_path)
+                        yield file_path
+        elif path not in seen:
+            seen.add(path)
+            yield path
+
+
+def main(argv=None) -> int:
+    """Run the CLI; returns the process exit code (1 if any file failed)"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.resume and not args.journal:
+        parser.error('--resume requires --journal')
+    if not args.paths and not args.resume and not args.watch:
+        parser.error('no paths given')
+    if args.watch and (args.paths or args.plan):
+        parser.error('--watch takes no paths and cannot be combined with --plan')
+    if args.plan and args.resume:
+        parser.error('--plan cannot be combined with --resume')
+    if not args.yes and not args.plan:
+        parser.error('refusing to shred without --yes (deletion is permanent)')
+
+    methods = MethodRegistry()
+    for methods_file in args.methods_file:
+        try:
+            methods.load(methods_file)
+        except (OSError, ValueError) as e:
+            parser.error(f'--methods-file {methods_file}: {e}')
+    for method in [args.method, *(args.plan_methods or [])]:
+        if method not in methods:
+            parser.error(f"unknown method {method!r} (choose from {', '.join(methods.names())})")
+
+    # A plan opens no journal or metrics files; a journal only turns off
+    # the small-file path, which small_file_size=0 reproduces
+    journal = ShredJournal(args.journal) if args.journal and not args.plan else None
+    small_file_size = 0 if args.journal and args.plan else args.small_file_size
+
+    sinks = []
+    if args.metrics_textfile and not args.plan:
+        sinks.append(PrometheusTextfile(args.metrics_textfile))
+    if args.trace and not args.plan:
+        sinks.append(JsonLinesTrace(args.trace))
+    metrics = Tee(*sinks) if sinks else None
+
+    engine = ShredderEngine(
+        random_source=args.random_source,
+        block_size=args.block_size,
+        direct_io=args.direct_io,
+        sync_policy=args.sync_policy,
+        range_workers=args.range_workers,
+        journal=journal,
+        rename_count=args.renames,
+        preserve_name_length=args.preserve_name_length,
+        scrub_directories=args.scrub_directories,
+        verify_mode=args.verify_mode,
+        fingerprint=args.fingerprint,
+        methods=methods,
+        metrics=metrics,
+        small_file_size=small_file_size,
+        io_backend=args.io_backend
+    )
+
+    if args.watch:
+        try:
+            return watch(args, engine)
+        finally:
+            if metrics:
+                metrics.close()
+
+    errors: List[dict] = []
+    paths = list(expand_paths(args, errors))
+    if args.resume:
+        # Interrupted files may only exist under a rename target by now; the
+        # original name may even belong to a new file, so go by where they are
+        queued = {os.path.abspath(path) for path in paths}
+        paths[:0] = [str(entry.current_path()) for entry in journal.pending()
+                     if os.path.abspath(entry.path) not in queued]
+    failed = len(errors)
+
+    out = sys.stdout
+    if args.plan:
+        from .planner import ShredPlanner
+
+        report = ShredPlanner(engine).plan_files(
+            paths,
+            methods=args.plan_methods or [args.method],
+            workers=args.plan_workers or [args.workers],
+            per_device=args.per_device,
+            budgets=dict(args.device_budget),
+            batch_size=args.batch_size,
+            verify=not args.no_verify
+        )
+        report['skipped'][:0] = errors
+        out.write(json.dumps(report, indent=2) + '\n')
+        return 0
+    for error in errors:
+        out.write(json.dumps(error) + '\n')
+
+    results = engine.shred_many(
+        paths,
+        method=args.method,
+        verify=not args.no_verify,
+        workers=args.workers,
+        per_device=args.per_device,
+        budgets=dict(args.device_budget),
+        use_processes=args.processes,
+        batch_size=args.batch_size
+    )
+    try:
+        for result in results:
+            if not result['success']:
+                failed += 1
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+    except BrokenPipeError:
+        # Reader went away: stop submitting work, let in-flight files finish
+        results.close()
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if metrics:
+            metrics.close()
+
+    return 1 if failed else 0
+
+
+def watch(args: argparse.Namespace, engine: ShredderEngine) -> int:
+    """Shred files dropped into the --watch directories until SIGINT/SIGTERM"""
+    import signal
+    import threading
+
+    from .watcher import WatchFolderShredder
+
+    out = sys.stdout
+    lock = threading.Lock()
+
+    def report(result):
+        with lock:
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+
+    try:
+        watcher = WatchFolderShredder(
+            args.watch, engine,
+            method=args.method,
+            verify=not args.no_verify,
+            workers=args.workers,
+            batch_size=args.watch_batch,
+            settle=args.settle,
+            max_queue=args.watch_queue,
+            use_inotify=not args.poll,
+            poll_interval=args.poll_interval,
+            on_result=report,
+            status_file=args.status_file,
+            shred_options={'per_device': args.per_device, 'budgets': dict(args.device_budget),
+                           'use_processes': args.processes, 'batch_size': args.batch_size}
+        )
+    except ValueError as e:
+        sys.stderr.write(f'python -m core: error: {e}\n')
+        return 2
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    watcher.start()
+    try:
+        while not stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Files still queued are picked up by the next start
+        watcher.stop()
+    return 0
@@ -0,0 +1,138 @@
+"""
+Extent mapping for sparse-aware overwriting
+Finds the regions of a file that actually hold data so holes are never written
+"""
+
+import errno
+import os
+import struct
+from typing import List, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# linux/fiemap.h
+FS_IOC_FIEMAP = 0xC020660B
+FIEMAP_FLAG_SYNC = 0x1
+FIEMAP_EXTENT_LAST = 0x1
+FIEMAP_EXTENT_UNKNOWN = 0x2
+FIEMAP_EXTENT_UNWRITTEN = 0x800
+
+_FIEMAP_HEADER = struct.Struct('=QQIIII')
+_FIEMAP_EXTENT = struct.Struct('=QQQQQIIII')
+_FIEMAP_BATCH = 256
+
+
+class Extent(NamedTuple):
+    """A run of file data; physical is the device offset when known"""
+    offset: int
+    length: int
+    physical: Optional[int] = None
+
+
+def seek_data_extents(fd: int, size: int) -> Optional[List[Extent]]:
+    """
+    Map data regions with lseek(SEEK_DATA/SEEK_HOLE)
+
+    Returns:
+        List of extents, or None if the platform/filesystem can't report holes
+    """
+    if not hasattr(os, 'SEEK_DATA'):
+        return None
+
+    extents = []
+    offset = 0
+    while offset < size:
+        try:
+            start = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                # No data past offset: the rest of the file is a hole
+                break
+            if e.errno == errno.EINVAL:
+                return None
+            raise
+        end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+        if end > start:
+            extents.append(Extent(start, end - start))
+        offset = end
+
+    return extents
+
+
+def fiemap_extents(fd: int, sync: bool = False) -> Optional[List[Extent]]:
+    """
+    Map data regions with the FIEMAP ioctl (Linux), including physical offsets
+
+    Unwritten (preallocated) extents read back as zeros and are skipped.
+
+    Returns:
+        List of extents, or None if FIEMAP is not supported
+    """
+    if fcntl is None:
+        return None
+
+    extents = []
+    start = 0
+    flags = FIEMAP_FLAG_SYNC if sync else 0
+    request_size = _FIEMAP_HEADER.size + _FIEMAP_BATCH * _FIEMAP_EXTENT.size
+
+    while True:
+        request = bytearray(request_size)
+        _FIEMAP_HEADER.pack_into(request, 0, start, 0xFFFFFFFFFFFFFFFF - start,
+                                 flags, 0, _FIEMAP_BATCH, 0)
+        try:
+            fcntl.ioctl(fd, FS_IOC_FIEMAP, request, True)
+        except OSError:
+            return None
+
+        mapped = _FIEMAP_HEADER.unpack_from(request, 0)[3]
+        if mapped == 0:
+            break
+
+        last = False
+        for i in range(mapped):
+            logical, physical, length, _, _, extent_flags, _, _, _ = _FIEMAP_EXTENT.unpack_from(
+                request, _FIEMAP_HEADER.size + i * _FIEMAP_EXTENT.size
+            )
+            if not extent_flags & FIEMAP_EXTENT_UNWRITTEN:
+                known = not extent_flags & FIEMAP_EXTENT_UNKNOWN
+                extents.append(Extent(logical, length, physical if known else None))
+            start = logical + length
+            last = bool(extent_flags & FIEMAP_EXTENT_LAST)
+        if last:
+            break
+
+    return extents
+
+
+def data_extents(fd: int, size: int) -> List[Extent]:
+    """
+    Get the data regions of a file, clipped to size
+
+    Tries SEEK_DATA/SEEK_HOLE, then FIEMAP, and falls back to treating the
+    whole file as data.
+    """
+    if size <= 0:
+        return []
+
+    extents = seek_data_extents(fd, size)
+    if extents is None:
+        extents = fiemap_extents(fd, sync=True)
+        if extents is not None:
+            extents = [
+                Extent(e.offset, min(e.offset + e.length, size) - e.offset, e.physical)
+                for e in extents if e.offset < size
+            ]
+    if extents is None:
+        extents = [Extent(0, size)]
+
+    return extents
+
+
+def allocated_bytes(st: os.stat_result) -> Optional[int]:
+    """Bytes allocated on disk for a file (None where st_blocks is unavailable)"""
+    blocks = getattr(st, 'st_blocks', None)
+    return None if blocks is None else blocks * 512
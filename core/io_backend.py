@@ -0,0 +1,354 @@
+"""
+I/O backend for overwrite passes
+Block size selection, O_DIRECT writes and page cache management
+"""
+
+import errno
+import mmap
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .patterns import allocate_buffer, tile_pattern
+
+DEFAULT_BLOCK_SIZE = 64 * 1024
+MAX_BLOCK_SIZE = 8 * 1024 * 1024
+
+# O_DIRECT needs buffer address, offset and length aligned to the logical
+# block size; 4 KiB covers every common device
+DIRECT_ALIGNMENT = 4096
+
+# Candidate sizes tried by the calibration write
+CALIBRATION_SIZES = (64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024)
+CALIBRATION_BYTES = 16 * 1024 * 1024
+
+_O_BINARY = getattr(os, 'O_BINARY', 0)
+
+# How pattern passes reach the file
+IO_BACKENDS = {
+    'write': 'pwrite() from cached, pre-tiled pattern buffers',
+    'mmap': 'Pattern tiled straight into shared mappings of the file, one window at a time',
+}
+MMAP_WINDOW = 64 * 1024 * 1024
+
+
+def pwrite_all(fd: int, data, offset: int):
+    """Write all of data at offset"""
+    view = memoryview(data)
+
+    if not hasattr(os, 'pwrite'):
+        os.lseek(fd, offset, os.SEEK_SET)
+        while view:
+            view = view[os.write(fd, view):]
+        return
+
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def pread(fd: int, length: int, offset: int) -> bytes:
+    """Read up to length bytes at offset (seek and read where pread is missing)"""
+    if hasattr(os, 'pread'):
+        return os.pread(fd, length, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    chunks = []
+    while length > 0:
+        data = os.read(fd, length)
+        if not data:
+            break
+        chunks.append(data)
+        length -= len(data)
+    return b''.join(chunks)
+
+
+def pread_into(fd: int, buffer, offset: int):
+    """Fill buffer from the file at offset (zeros past end of file)"""
+    view = memoryview(buffer)
+    while view:
+        if hasattr(os, 'preadv'):
+            n = os.preadv(fd, [view], offset)
+        else:
+            data = pread(fd, len(view), offset)
+            n = len(data)
+            view[:n] = data
+        if n == 0:
+            view[:] = bytes(len(view))
+            return
+        view = view[n:]
+        offset += n
+
+
+def fill_mapped(fd: int, pattern: bytes, offset: int, end: int, flush: bool = True):
+    """
+    Fill [offset, end) of a file with a repeating pattern through a shared mapping
+
+    The range is mapped as one window (its start rounded down to the
+    allocation granularity) and the pattern, phase-aligned to the file
+    offset, is tiled in place by doubling slice assignment, so no data is
+    copied from user buffers by write(). With flush, the window is
+    msync'ed before it is unmapped. The range must lie within the file.
+    """
+    start = offset - offset % mmap.ALLOCATIONGRANULARITY
+    mapping = mmap.mmap(fd, end - start, access=mmap.ACCESS_WRITE, offset=start)
+    try:
+        phase = offset % len(pattern)
+        rotated = pattern[phase:] + pattern[:phase]
+        with memoryview(mapping) as view, view[offset - start:] as window:
+            tile_pattern(window, rotated, end - offset)
+        if flush:
+            mapping.flush()
+    finally:
+        mapping.close()
+
+
+def datasync(fd: int):
+    """Flush file data (and only the metadata needed to read it back)"""
+    if hasattr(os, 'fdatasync'):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
+
+
+_syncfs = None
+
+
+def syncfs(fd: int):
+    """Flush every dirty file on the filesystem containing fd"""
+    global _syncfs
+
+    if _syncfs is None:
+        _syncfs = False
+        try:
+            import ctypes
+            import ctypes.util
+
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            _syncfs = libc.syncfs
+            _syncfs.argtypes = [ctypes.c_int]
+        except (OSError, AttributeError, TypeError):
+            pass
+
+    if _syncfs and _syncfs(fd) == 0:
+        return
+    if hasattr(os, 'sync'):
+        os.sync()
+    else:
+        os.fsync(fd)
+
+
+_fallocate = None
+
+
+def fallocate(fd: int, offset: int, length: int) -> bool:
+    """
+    Reserve blocks for [offset, offset + length) without writing them
+
+    Unlike os.posix_fallocate, which glibc emulates by writing every block
+    where the filesystem can't allocate, this calls fallocate(2) directly.
+
+    Returns:
+        False if the filesystem (or platform) can't preallocate
+
+    Raises:
+        OSError: on any other failure, ENOSPC included
+    """
+    global _fallocate
+
+    if _fallocate is None:
+        _fallocate = False
+        try:
+            import ctypes
+            import ctypes.util
+
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            _fallocate = libc.fallocate64
+            _fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+        except (OSError, AttributeError, TypeError):
+            pass
+
+    if not _fallocate:
+        return False
+    if _fallocate(fd, 0, offset, length) == 0:
+        return True
+    import ctypes
+    err = ctypes.get_errno()
+    if err in (errno.EOPNOTSUPP, errno.ENOSYS):
+        return False
+    raise OSError(err, os.strerror(err))
+
+
+def drop_cache(fd: int, offset: int = 0, length: int = 0):
+    """Ask the kernel to evict clean cached pages of a file range"""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+
+def preferred_block_size(st_blksize: int) -> int:
+    """Round the filesystem's preferred I/O size up to a sensible write size"""
+    blksize = st_blksize if st_blksize and st_blksize > 0 else DIRECT_ALIGNMENT
+    size = max(blksize, DEFAULT_BLOCK_SIZE)
+    size = -(-size // blksize) * blksize
+    return min(size, max(MAX_BLOCK_SIZE, blksize))
+
+
+class BlockSizeCalibrator:
+    """
+    Choose a write block size per device
+
+    Starts from ``st_blksize`` and, for large files, refines it with a short
+    calibration write to a temporary file next to the target. Results are
+    cached per device (st_dev).
+    """
+
+    def __init__(self, min_file_size: int = 64 * 1024 * 1024,
+                 probe_bytes: int = CALIBRATION_BYTES):
+        self.min_file_size = min_file_size
+        self.probe_bytes = probe_bytes
+        self._cache: Dict[int, int] = {}
+        # Write throughput (bytes/s) measured at the chosen size, per device
+        self._rates: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def block_size_for(self, path: Path, st: os.stat_result, calibrate: bool = True) -> int:
+        """
+        Get the block size to use for a file
+
+        Args:
+            path: File that will be overwritten
+            st: Its stat result
+            calibrate: Allow a calibration write for large files
+        """
+        if not calibrate or st.st_size < self.min_file_size:
+            return preferred_block_size(getattr(st, 'st_blksize', 0))
+
+        return self.device_block_size(path.parent, st)
+
+    def device_block_size(self, directory: Path, st: os.stat_result) -> int:
+        """Get the calibrated block size for the device holding directory"""
+        with self._lock:
+            if st.st_dev not in self._cache:
+                base = preferred_block_size(getattr(st, 'st_blksize', 0))
+                size, rate = self._calibrate(directory, base)
+                self._cache[st.st_dev] = size
+                if rate:
+                    self._rates[st.st_dev] = rate
+            return self._cache[st.st_dev]
+
+    def throughput(self, directory: Path, st: os.stat_result) -> Optional[float]:
+        """Calibrated write throughput of the device holding directory (bytes/s)"""
+        self.device_block_size(directory, st)
+        return self._rates.get(st.st_dev)
+
+    def _calibrate(self, directory: Path, base: int) -> Tuple[int, float]:
+        """Time a short write at each candidate size and keep the fastest"""
+        probe = directory / f'__shredder_temp_calib_{os.urandom(8).hex()}.tmp'
+        candidates = sorted({base, *CALIBRATION_SIZES})
+        buffer = memoryview(allocate_buffer(max(candidates)))
+        best, best_rate = base, 0.0
+
+        try:
+            fd = os.open(probe, os.O_RDWR | os.O_CREAT | os.O_EXCL | _O_BINARY, 0o600)
+        except OSError:
+            return base, 0.0
+
+        try:
+            for size in candidates:
+                chunk = buffer[:size]
+                start = time.perf_counter()
+                for offset in range(0, self.probe_bytes, size):
+                    pwrite_all(fd, chunk, offset)
+                datasync(fd)
+                elapsed = time.perf_counter() - start
+                rate = self.probe_bytes / elapsed if elapsed > 0 else float('inf')
+                if rate > best_rate:
+                    best, best_rate = size, rate
+                drop_cache(fd)
+        except OSError:
+            return base, 0.0
+        finally:
+            os.close(fd)
+            try:
+                probe.unlink()
+            except OSError:
+                pass
+
+        return best, best_rate
+
+
+class OverwriteTarget:
+    """
+    File opened for in-place overwriting
+
+    In direct mode a second O_DIRECT descriptor is used for aligned writes.
+    Unaligned tails, and filesystems that refuse O_DIRECT (e.g. tmpfs), fall
+    back to the regular descriptor. Buffers passed to write_at() in direct
+    mode must come from allocate_buffer() so they are page-aligned.
+    """
+
+    def __init__(self, path: Path, direct: bool = False, drop_cache: bool = True,
+                 dir_fd: Optional[int] = None):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | _O_BINARY, dir_fd=dir_fd)
+        self.direct_fd: Optional[int] = None
+        self.direct_enabled = False
+        self.drop_cache_enabled = drop_cache
+
+        if direct and hasattr(os, 'O_DIRECT'):
+            try:
+                self.direct_fd = os.open(path, os.O_WRONLY | os.O_DIRECT, dir_fd=dir_fd)
+                self.direct_enabled = True
+            except OSError:
+                self.direct_fd = None
+
+    @property
+    def direct(self) -> bool:
+        """Whether aligned writes currently bypass the page cache"""
+        return self.direct_enabled
+
+    def write_at(self, data, offset: int):
+        """Write all of data at offset (safe to call from several threads)"""
+        if (self.direct_enabled and offset % DIRECT_ALIGNMENT == 0
+                and len(data) % DIRECT_ALIGNMENT == 0):
+            try:
+                pwrite_all(self.direct_fd, data, offset)
+                return
+            except OSError as e:
+                if e.errno != errno.EINVAL:
+                    raise
+                # Filesystem accepted the flag but not the write; the
+                # descriptor stays open until close() as other threads may use it
+                self.direct_enabled = False
+
+        pwrite_all(self.fd, data, offset)
+
+    def sync(self):
+        """Make written data durable, then drop it from the page cache"""
+        datasync(self.fd)
+        self.drop_cached_pages()
+
+    def drop_cached_pages(self):
+        """Evict the file's clean pages if cache dropping is enabled"""
+        if self.drop_cache_enabled:
+            drop_cache(self.fd)
+
+    def close(self):
+        self.direct_enabled = False
+        if self.direct_fd is not None:
+            os.close(self.direct_fd)
+            self.direct_fd = None
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
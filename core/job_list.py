@@ -0,0 +1,121 @@
+"""
+Ordered, de-duplicated list of files queued for shredding
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Row status codes
+QUEUED = 0
+SHREDDING = 1
+DONE = 2
+FAILED = 3
+_REMOVED = 255
+
+STATUS_NAMES = {QUEUED: 'queued', SHREDDING: 'shredding', DONE: 'done', FAILED: 'failed'}
+
+# Sentinel stored in the size array when a file could not be stat'ed
+_UNKNOWN_SIZE = -1
+
+
+class JobList:
+    """
+    Insertion-ordered set of file paths with their sizes and status
+
+    Rows live in parallel arrays (paths, sizes, status codes) with a dict
+    index for O(1) lookups. Removed rows are tombstoned and compacted lazily,
+    so add, remove and status changes are O(1) and the file count and byte
+    total are kept as running counters.
+    """
+
+    def __init__(self):
+        self._paths: List[Optional[str]] = []
+        self._sizes = array('q')
+        self._status = bytearray()
+        self._index: Dict[str, int] = {}
+        self._removed = 0
+        self.total_bytes = 0
+        self.status_counts = dict.fromkeys(STATUS_NAMES, 0)
+
+    def add(self, path: str, size: Optional[int] = None) -> bool:
+        """Queue a file; returns False if it was already queued"""
+        if path in self._index:
+            return False
+        self._index[path] = len(self._paths)
+        self._paths.append(path)
+        self._sizes.append(_UNKNOWN_SIZE if size is None else size)
+        self._status.append(QUEUED)
+        self.status_counts[QUEUED] += 1
+        if size is not None:
+            self.total_bytes += size
+        return True
+
+    def extend(self, entries: Iterable[Tuple[str, Optional[int]]]) -> List[Tuple[str, Optional[int]]]:
+        """Queue many (path, size) entries; returns the ones that were new"""
+        added = []
+        for path, size in entries:
+            if self.add(path, size):
+                added.append((path, size))
+        return added
+
+    def remove(self, path: str) -> bool:
+        """Drop a file from the list; returns False if it was not queued"""
+        row = self._index.pop(path, None)
+        if row is None:
+            return False
+        size = self._sizes[row]
+        if size != _UNKNOWN_SIZE:
+            self.total_bytes -= size
+        self.status_counts[self._status[row]] -= 1
+        self._paths[row] = None
+        self._status[row] = _REMOVED
+        self._removed += 1
+        return True
+
+    def set_status(self, path: str, status: int):
+        """Update the status of a queued file"""
+        row = self._index.get(path)
+        if row is None:
+            return
+        self.status_counts[self._status[row]] -= 1
+        self.status_counts[status] += 1
+        self._status[row] = status
+
+    def size_of(self, path: str) -> Optional[int]:
+        """Size recorded when the file was queued (None if unknown)"""
+        size = self._sizes[self._index[path]]
+        return None if size == _UNKNOWN_SIZE else size
+
+    def row(self, index: int) -> Tuple[str, Optional[int], int]:
+        """Get (path, size, status) of the index-th live row"""
+        self._compact()
+        size = self._sizes[index]
+        return self._paths[index], None if size == _UNKNOWN_SIZE else size, self._status[index]
+
+    def items(self) -> Iterator[Tuple[str, Optional[int]]]:
+        for path, size in zip(self._paths, self._sizes):
+            if path is not None:
+                yield path, None if size == _UNKNOWN_SIZE else size
+
+    def clear(self):
+        self.__init__()
+
+    def _compact(self):
+        """Squeeze out tombstoned rows so row indexes are contiguous again"""
+        if not self._removed:
+            return
+        keep = [i for i, status in enumerate(self._status) if status != _REMOVED]
+        self._paths = [self._paths[i] for i in keep]
+        self._sizes = array('q', (self._sizes[i] for i in keep))
+        self._status = bytearray(self._status[i] for i in keep)
+        self._index = {path: i for i, path in enumerate(self._paths)}
+        self._removed = 0
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return (path for path in self._paths if path is not None)
+
+    def __len__(self) -> int:
+        return len(self._index)
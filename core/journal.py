@@ -0,0 +1,234 @@
+"""
+Crash-safe shred journal
+Append-only JSON-lines log of each file's progress, so an interrupted run
+resumes at the exact pass and offset and renamed files can be traced
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Stages a file moves through
+OVERWRITING = 'overwriting'
+RENAMING = 'renaming'
+TRUNCATED = 'truncated'
+
+
+def _key(path: str) -> str:
+    """Journal key of a path: absolute, so rename targets resolve from any cwd"""
+    return os.path.abspath(path)
+
+
+def default_journal_path() -> Path:
+    """Per-user journal location used by the GUI"""
+    return Path.home() / '.secure_file_shredder' / 'journal.jsonl'
+
+
+class JournalEntry:
+    """Last known state of one file, replayed from the journal"""
+
+    __slots__ = ('path', 'method', 'device', 'inode', 'size', 'passes_done', 'offset',
+                 'renames', 'stage')
+
+    def __init__(self, path: str, method: str, device: int, inode: int, size: int):
+        self.path = path
+        self.method = method
+        self.device = device
+        self.inode = inode
+        self.size = size
+        self.passes_done = 0
+        self.offset = 0
+        self.renames: List[str] = []
+        self.stage = OVERWRITING
+
+    def matches(self, st: os.stat_result) -> bool:
+        """True if st describes the same file the entry was recorded for"""
+        return st.st_dev == self.device and st.st_ino == self.inode
+
+    def current_path(self) -> Path:
+        """Where the file is now: the last planned rename target that exists"""
+        original = Path(self.path)
+        for name in reversed(self.renames):
+            candidate = original.parent / name
+            if os.path.lexists(candidate):
+                return candidate
+        return original
+
+    def remaining_renames(self) -> List[str]:
+        """Planned rename targets the file has not reached yet"""
+        current = self.current_path().name
+        if current in self.renames:
+            return self.renames[self.renames.index(current) + 1:]
+        return list(self.renames)
+
+
+class ShredJournal:
+    """
+    Append-only record of shred progress
+
+    Each line is one JSON record keyed by the file's original path, made
+    absolute so a run started from another directory still finds it. Records
+    that must survive a crash (rename plans, pass checkpoints) are fsync'd;
+    the rest are written through and may be lost, which only costs a little
+    repeated work on resume. A torn last line is ignored when replaying.
+    """
+
+    def __init__(self, path, compact: bool = True):
+        """
+        Open (or create) a journal and replay its records
+
+        Args:
+            path: Journal file
+            compact: Rewrite the file with only unfinished entries first
+                (leave False when several processes share the journal)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.entries: Dict[str, JournalEntry] = {}
+        # Planned rename target -> key of the entry that planned it
+        self._targets: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._fd = None
+        self._replay()
+        if compact:
+            self.compact()
+        if self._fd is None:
+            self._fd = self._open()
+
+    def _open(self) -> int:
+        return os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def _replay(self):
+        import json
+
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self._apply(record)
+
+    def _apply(self, record: dict):
+        """Fold one record into the in-memory entries"""
+        op = record.get('op')
+        path = record.get('path')
+        if op == 'queued':
+            self.entries[path] = JournalEntry(path, record['method'], record['dev'],
+                                              record['ino'], record['size'])
+            return
+        entry = self.entries.get(path)
+        if entry is None:
+            return
+        if op == 'checkpoint':
+            entry.passes_done = record['pass']
+            entry.offset = record['offset']
+        elif op == 'renames':
+            entry.renames = record['names']
+            entry.stage = RENAMING
+            for name in entry.renames:
+                self._targets[_key(os.path.join(os.path.dirname(path), name))] = path
+        elif op == 'truncated':
+            entry.stage = TRUNCATED
+        elif op == 'unlinked':
+            del self.entries[path]
+            for name in entry.renames:
+                self._targets.pop(_key(os.path.join(os.path.dirname(path), name)), None)
+
+    def _append(self, record: dict, durable: bool = False):
+        import json
+
+        line = (json.dumps(record) + '\n').encode('utf-8')
+        with self._lock:
+            self._apply(record)
+            # One write per record: O_APPEND keeps concurrent writers' lines whole
+            os.write(self._fd, line)
+            if durable:
+                os.fsync(self._fd)
+
+    # ---- Recording ----
+
+    def queued(self, path: str, method: str, st: os.stat_result):
+        """Start (or restart) tracking a file"""
+        self._append({'op': 'queued', 'path': _key(path), 'method': method,
+                      'dev': st.st_dev, 'ino': st.st_ino, 'size': st.st_size})
+
+    def checkpoint(self, path: str, passes_done: int, offset: int = 0):
+        """Record that passes_done passes, plus offset bytes of the next, are on disk"""
+        self._append({'op': 'checkpoint', 'path': _key(path), 'pass': passes_done,
+                      'offset': offset}, durable=True)
+
+    def renames(self, path: str, names: List[str]):
+        """Record the planned rename targets before the first rename happens"""
+        self._append({'op': 'renames', 'path': _key(path), 'names': names}, durable=True)
+
+    def truncated(self, path: str):
+        self._append({'op': 'truncated', 'path': _key(path)})
+
+    def unlinked(self, path: str):
+        self._append({'op': 'unlinked', 'path': _key(path)})
+
+    # ---- Queries ----
+
+    def lookup(self, path: str) -> Optional[JournalEntry]:
+        """Unfinished entry for a file's original path, if any"""
+        return self.entries.get(_key(path))
+
+    def locate(self, path: str) -> Optional[JournalEntry]:
+        """Unfinished entry whose file now sits at path, one of its rename targets"""
+        path = _key(path)
+        entry = self.entries.get(self._targets.get(path))
+        if entry is not None and _key(entry.current_path()) == path:
+            return entry
+        return None
+
+    def pending(self) -> List[JournalEntry]:
+        """Files that were started but never unlinked"""
+        return list(self.entries.values())
+
+    def compact(self):
+        """Atomically rewrite the journal with one record set per unfinished file"""
+        import json
+
+        tmp_path = self.path.with_name(self.path.name + '.new')
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in self.entries.values():
+                    for record in self._records_for(entry):
+                        f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            if self._fd is not None:
+                # Appends must go to the new file, not the replaced one
+                os.close(self._fd)
+                self._fd = self._open()
+
+    def _records_for(self, entry: JournalEntry) -> List[dict]:
+        records = [
+            {'op': 'queued', 'path': entry.path, 'method': entry.method,
+             'dev': entry.device, 'ino': entry.inode, 'size': entry.size},
+            {'op': 'checkpoint', 'path': entry.path, 'pass': entry.passes_done,
+             'offset': entry.offset},
+        ]
+        if entry.renames:
+            records.append({'op': 'renames', 'path': entry.path, 'names': entry.renames})
+        if entry.stage == TRUNCATED:
+            records.append({'op': 'truncated', 'path': entry.path})
+        return records
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
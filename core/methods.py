@@ -0,0 +1,253 @@
+"""
+Shredding method registry
+Methods are declared as data (built in, or loaded from JSON/TOML) and
+compiled once into pass plans the engine reuses for every file
+"""
+
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Union
+
+from .verification import VERIFY_MODES
+
+
+class _Complement:
+    """Marker pass: write the bitwise complement of what the file holds now"""
+
+    def __repr__(self):
+        return 'COMPLEMENT'
+
+    def __reduce__(self):
+        # Stay a singleton across process boundaries
+        return 'COMPLEMENT'
+
+
+COMPLEMENT = _Complement()
+
+# Byte translation table for complement passes
+INVERT = bytes(255 - i for i in range(256))
+
+# Gutmann method patterns (35 passes)
+GUTMANN_PATTERNS = [
+    # Pass 1-4: Random
+    None, None, None, None,
+    # Pass 5-9: Special patterns
+    b'\x55', b'\xAA', b'\x92\x49\x24', b'\x49\x24\x92', b'\x24\x92\x49',
+    # Pass 10-25: More patterns
+    b'\x00', b'\x11', b'\x22', b'\x33', b'\x44', b'\x55', b'\x66', b'\x77',
+    b'\x88', b'\x99', b'\xAA', b'\xBB', b'\xCC', b'\xDD', b'\xEE', b'\xFF',
+    # Pass 26-28: Special MFM patterns
+    b'\x92\x49\x24', b'\x49\x24\x92', b'\x24\x92\x49',
+    # Pass 29-31: Special patterns
+    b'\x6D\xB6\xDB', b'\xB6\xDB\x6D', b'\xDB\x6D\xB6',
+    # Pass 32-35: Random
+    None, None, None, None
+]
+
+
+def _pass_spec(pattern: Optional[bytes]) -> dict:
+    if pattern is None:
+        return {'type': 'random'}
+    if len(pattern) == 1:
+        return {'type': 'constant', 'value': pattern[0]}
+    return {'type': 'pattern', 'hex': pattern.hex()}
+
+
+# Built-in methods, in the same format as a methods file
+BUILTIN_METHODS = {
+    'dod': {
+        'description': 'DoD 5220.22-M (3 passes)',
+        'passes': [
+            {'type': 'constant', 'value': 0x00},    # Pass 1: All zeros
+            {'type': 'constant', 'value': 0xFF},    # Pass 2: All ones
+            {'type': 'random'},                     # Pass 3: Random
+        ],
+    },
+    'gutmann': {
+        'description': 'Gutmann 35-pass',
+        'passes': [_pass_spec(pattern) for pattern in GUTMANN_PATTERNS],
+    },
+    'random_7': {
+        'description': '7 random passes',
+        'passes': [{'type': 'random'}] * 7,
+    },
+    'simple': {
+        'description': 'Simple 1-pass random',
+        'passes': [{'type': 'random'}],
+    },
+}
+
+
+class PassPlan(NamedTuple):
+    """A compiled method: what each pass writes and which passes are verified"""
+    name: str
+    description: str
+    # Per pass: repeating pattern bytes, None (random) or COMPLEMENT
+    patterns: List[Union[bytes, None, _Complement]]
+    # Pass index -> read-back mode ('sampled' or 'full') for verify-after passes
+    verify_after: Dict[int, str]
+
+    @property
+    def reads_back(self) -> int:
+        """Passes that read the file (complement and verify-after passes)"""
+        return (sum(1 for pattern in self.patterns if pattern is COMPLEMENT)
+                + sum(1 for mode in self.verify_after.values() if mode == 'full'))
+
+    def prepare(self, pattern_cache, buffer_size: int):
+        """Build every pattern buffer (all phases) the plan needs at buffer_size"""
+        for pattern in self.patterns:
+            if isinstance(pattern, bytes):
+                for phase in range(len(pattern)):
+                    pattern_cache.get(pattern, buffer_size, phase)
+
+    def estimate(self, data_bytes: int, write_rate: Optional[float] = None,
+                 read_rate: Optional[float] = None) -> dict:
+        """
+        Estimate the cost of running the plan over data_bytes
+
+        Args:
+            data_bytes: Bytes of file data each pass covers
+            write_rate: Device write throughput in bytes/s (None = unknown)
+            read_rate: Device read throughput in bytes/s (defaults to write_rate)
+
+        Returns:
+            dict with passes, bytes_written, bytes_read and seconds (None
+            when no throughput is known)
+        """
+        written = data_bytes * len(self.patterns)
+        read = data_bytes * self.reads_back
+        read_rate = read_rate or write_rate
+        seconds = None
+        if write_rate:
+            seconds = written / write_rate + (read / read_rate if read else 0.0)
+        return {
+            'method': self.name,
+            'passes': len(self.patterns),
+            'bytes_written': written,
+            'bytes_read': read,
+            'seconds': seconds,
+        }
+
+
+def compile_method(name: str, spec: dict) -> PassPlan:
+    """
+    Compile a method spec into a PassPlan
+
+    Pass types: constant (value: 0-255), pattern (hex: repeating bytes),
+    random, and complement (bitwise complement of the previous pass; of the
+    file's current content when the previous pass is random or there is
+    none). Any pass may set verify: true, 'sampled' or 'full'.
+
+    Raises:
+        ValueError: if the spec is malformed
+    """
+    passes = spec.get('passes')
+    if not isinstance(passes, list) or not passes:
+        raise ValueError(f"Method {name!r}: 'passes' must be a non-empty list")
+
+    patterns = []
+    verify_after = {}
+    for index, entry in enumerate(passes):
+        where = f"Method {name!r} pass {index + 1}"
+        if not isinstance(entry, dict):
+            raise ValueError(f"{where}: must be a table/object")
+        kind = entry.get('type')
+
+        if kind == 'constant':
+            value = entry.get('value')
+            # bool is an int subclass: true/false must not become 0x01/0x00
+            if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 255:
+                raise ValueError(f"{where}: 'value' must be an integer 0-255")
+            pattern = bytes([value])
+        elif kind == 'pattern':
+            try:
+                pattern = bytes.fromhex(entry['hex'])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"{where}: 'hex' must be a hex byte string") from None
+            if not pattern:
+                raise ValueError(f"{where}: 'hex' must not be empty")
+        elif kind == 'random':
+            pattern = None
+        elif kind == 'complement':
+            previous = patterns[-1] if patterns else None
+            pattern = previous.translate(INVERT) if isinstance(previous, bytes) else COMPLEMENT
+        else:
+            raise ValueError(f"{where}: unknown pass type {kind!r}")
+        patterns.append(pattern)
+
+        verify = entry.get('verify', False)
+        if verify is True:
+            verify = 'full'
+        if verify:
+            if verify not in VERIFY_MODES or verify == 'none':
+                raise ValueError(f"{where}: 'verify' must be true, 'sampled' or 'full'")
+            verify_after[index] = verify
+
+    return PassPlan(name, spec.get('description', name), patterns, verify_after)
+
+
+class MethodRegistry:
+    """Named shredding methods, compiled on first use"""
+
+    def __init__(self, include_builtins: bool = True):
+        self._specs: Dict[str, dict] = {}
+        self._plans: Dict[str, PassPlan] = {}
+        if include_builtins:
+            for name, spec in BUILTIN_METHODS.items():
+                self.register(name, spec)
+
+    def register(self, name: str, spec: dict):
+        """Add (or replace) a method; the spec is validated immediately"""
+        plan = compile_method(name, spec)
+        self._specs[name] = spec
+        self._plans[name] = plan
+
+    def load(self, path: Union[str, Path]) -> List[str]:
+        """
+        Register every method in a JSON or TOML file
+
+        The file holds a ``methods`` table mapping names to specs (see
+        compile_method). TOML needs Python 3.11+ (tomllib).
+
+        Returns:
+            Names of the methods loaded
+        """
+        path = Path(path)
+        if path.suffix.lower() == '.toml':
+            import tomllib
+
+            with open(path, 'rb') as f:
+                data = tomllib.load(f)
+        else:
+            import json
+
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+
+        methods = data.get('methods') if isinstance(data, dict) else None
+        if not isinstance(methods, dict):
+            raise ValueError(f"{path}: expected a 'methods' table")
+        for name, spec in methods.items():
+            self.register(name, spec)
+        return list(methods)
+
+    def get(self, name: str) -> PassPlan:
+        """
+        Get a method's compiled plan
+
+        Raises:
+            ValueError: for unknown methods
+        """
+        plan = self._plans.get(name)
+        if plan is None:
+            raise ValueError(f"Unknown shredding method: {name}")
+        return plan
+
+    def names(self) -> List[str]:
+        return sorted(self._plans)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._plans
+
+
+# Shared registry used by engines created without their own
+default_registry = MethodRegistry()
@@ -0,0 +1,318 @@
+"""
+Shredding metrics
+Per-phase timings and per-pass bytes/latency histograms for each job,
+handed to a pluggable sink: an in-process registry, a Prometheus textfile
+or a JSON-lines trace
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# Where a job's time goes, in the order it gets there
+PHASES = (
+    'open',         # open, stat and extent mapping
+    'generate',     # random data and complement reads
+    'fingerprint',  # hashing the original content
+    'write',        # pwrite calls
+    'sync',         # fsync/fdatasync/syncfs
+    'verify',       # read-back checks
+    'rename',
+    'truncate',
+    'unlink',
+)
+
+# Histogram upper bounds (le); one more bucket catches everything above
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PASS_SECONDS_BUCKETS = (0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+PASS_BYTES_BUCKETS = tuple(4096 * 4 ** i for i in range(13))   # 4 KiB .. 64 GiB
+
+
+def _escape_label(value) -> str:
+    """Escape a label value for the text exposition format (method names are user-defined)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus style: bucket i counts values <= bounds[i])"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, data: dict):
+        """Add the counts of another histogram's to_dict() over the same bounds"""
+        for i, n in enumerate(data['counts']):
+            self.counts[i] += n
+        self.sum += data['sum']
+        self.count += data['count']
+
+    def to_dict(self) -> dict:
+        return {'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+
+class PassMetrics:
+    """Bytes, time and write latency of one pass"""
+
+    __slots__ = ('index', 'kind', 'bytes', 'start', 'seconds', 'write_latency')
+
+    def __init__(self, index: int, kind: str):
+        self.index = index
+        self.kind = kind
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.write_latency = Histogram(LATENCY_BUCKETS)
+
+    def to_dict(self) -> dict:
+        return {
+            'pass': self.index + 1,
+            'kind': self.kind,
+            'bytes': self.bytes,
+            'seconds': self.seconds,
+            'write_latency': self.write_latency.to_dict(),
+        }
+
+
+class JobMetrics:
+    """
+    Timings collected for one shred job
+
+    Range writers accumulate locally and merge once per range, so the lock
+    is taken a handful of times per pass rather than per chunk.
+    """
+
+    __slots__ = ('phases', 'passes', 'current', '_lock')
+
+    def __init__(self):
+        self.phases: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.passes: List[PassMetrics] = []
+        self.current: Optional[PassMetrics] = None
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float):
+        with self._lock:
+            self.phases[phase] += seconds
+
+    def timed(self, phase: str) -> '_Timer':
+        """Context manager adding its duration to phase"""
+        return _Timer(self, phase)
+
+    def start_pass(self, index: int, pattern) -> PassMetrics:
+        if pattern is None:
+            kind = 'random'
+        elif isinstance(pattern, bytes):
+            kind = 'pattern'
+        else:
+            kind = 'complement'
+        self.current = PassMetrics(index, kind)
+        self.passes.append(self.current)
+        return self.current
+
+    def end_pass(self):
+        if self.current is not None:
+            self.current.seconds = time.perf_counter() - self.current.start
+            self.current = None
+
+    def merge_range(self, generate: float, write: float, nbytes: int, latency: Histogram):
+        """Fold one written range into the job and its current pass"""
+        with self._lock:
+            self.phases['generate'] += generate
+            self.phases['write'] += write
+            if self.current is not None:
+                self.current.bytes += nbytes
+                self.current.write_latency.merge(latency.to_dict())
+
+    def record(self, **fields) -> dict:
+        """Finished job as a plain dict (what sinks receive)"""
+        self.end_pass()
+        return {
+            **fields,
+            'phases': {phase: seconds for phase, seconds in self.phases.items() if seconds},
+            'passes': [metrics.to_dict() for metrics in self.passes],
+        }
+
+
+class _Timer:
+    __slots__ = ('metrics', 'phase', 'start')
+
+    def __init__(self, metrics: JobMetrics, phase: str):
+        self.metrics = metrics
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add(self.phase, time.perf_counter() - self.start)
+
+
+# ---- Sinks ----
+
+class MetricsSink:
+    """Receives one record per finished job; this base class drops them"""
+
+    def job_finished(self, record: dict):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullSink(MetricsSink):
+    """Collect per-job metrics (returned in results) without exporting them"""
+
+
+class Tee(MetricsSink):
+    """Send every record to several sinks"""
+
+    def __init__(self, *sinks: MetricsSink):
+        self.sinks = sinks
+
+    def job_finished(self, record: dict):
+        for sink in self.sinks:
+            sink.job_finished(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+class MetricsRegistry(MetricsSink):
+    """In-process totals across jobs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.jobs = Counter()               # (method, 'success'|'failure')
+        self.bytes_written = Counter()      # method
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self.write_latency = Histogram(LATENCY_BUCKETS)
+        self.pass_seconds = Histogram(PASS_SECONDS_BUCKETS)
+        self.pass_bytes = Histogram(PASS_BYTES_BUCKETS)
+
+    def job_finished(self, record: dict):
+        method = record.get('method') or 'unknown'
+        with self._lock:
+            self.jobs[method, 'success' if record.get('success') else 'failure'] += 1
+            self.bytes_written[method] += record.get('bytes_written') or 0
+            for phase, seconds in record['phases'].items():
+                self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+            for metrics in record['passes']:
+                self.write_latency.merge(metrics['write_latency'])
+                self.pass_seconds.observe(metrics['seconds'])
+                self.pass_bytes.observe(metrics['bytes'])
+
+    def snapshot(self) -> dict:
+        """Copy of the current totals"""
+        with self._lock:
+            return {
+                'jobs': {f'{method}:{outcome}': n for (method, outcome), n in self.jobs.items()},
+                'bytes_written': dict(self.bytes_written),
+                'phase_seconds': dict(self.phase_seconds),
+                'write_latency': self.write_latency.to_dict(),
+                'pass_seconds': self.pass_seconds.to_dict(),
+                'pass_bytes': self.pass_bytes.to_dict(),
+            }
+
+    def to_prometheus(self, prefix: str = 'shredder') -> str:
+        """Totals in the Prometheus text exposition format"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+                label_text = f'{{{label_text}}}' if label_text else ''
+                lines.append(f'{prefix}_{name}{suffix}{label_text} {value}')
+
+        def histogram(name, help_text, hist):
+            samples, cumulative = [], 0
+            for bound, n in zip(list(hist.bounds) + ['+Inf'], hist.counts):
+                cumulative += n
+                samples.append(('_bucket', [('le', bound)], cumulative))
+            samples.append(('_sum', [], hist.sum))
+            samples.append(('_count', [], hist.count))
+            metric(name, 'histogram', help_text, samples)
+
+        with self._lock:
+            metric('jobs_total', 'counter', 'Files processed',
+                   [('', [('method', m), ('result', r)], n)
+                    for (m, r), n in sorted(self.jobs.items())])
+            metric('bytes_written_total', 'counter', 'Bytes overwritten',
+                   [('', [('method', m)], n) for m, n in sorted(self.bytes_written.items())])
+            metric('phase_seconds_total', 'counter', 'Time spent per job phase',
+                   [('', [('phase', p)], s) for p, s in self.phase_seconds.items()])
+            histogram('write_latency_seconds', 'Latency of single writes',
+                      self.write_latency)
+            histogram('pass_seconds', 'Duration of one overwrite pass', self.pass_seconds)
+            histogram('pass_bytes', 'Bytes written by one overwrite pass', self.pass_bytes)
+        return '\n'.join(lines) + '\n'
+
+
+class PrometheusTextfile(MetricsSink):
+    """
+    Registry totals written to a file for node_exporter's textfile collector
+
+    The file is replaced atomically, at most every ``interval`` seconds while
+    jobs finish and once more on flush()/close().
+    """
+
+    def __init__(self, path, registry: Optional[MetricsRegistry] = None,
+                 interval: float = 10.0):
+        self.path = Path(path)
+        self.registry = registry or MetricsRegistry()
+        self.interval = interval
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def job_finished(self, record: dict):
+        self.registry.job_finished(record)
+        if time.monotonic() - self._last_write >= self.interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            tmp_path.write_text(self.registry.to_prometheus(), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+            self._last_write = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+
+class JsonLinesTrace(MetricsSink):
+    """Every job record appended as one JSON line"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def job_finished(self, record: dict):
+        import json
+
+        line = json.dumps({'timestamp': time.time(), **record}) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,336 @@
+"""
+Filename obfuscation
+Renames files through random names before they are unlinked, relative to an
+open directory descriptor, and scrubs stale directory entries afterwards
+"""
+
+import errno
+import os
+import string
+import threading
+from pathlib import Path
+from random import SystemRandom
+from typing import Dict, List, Optional
+
+# Characters used for random names (valid and case-insensitive-safe everywhere)
+NAME_ALPHABET = string.ascii_lowercase + string.digits
+
+# CSPRNG-backed choices (what secrets.choice uses, without importing secrets)
+_system_random = SystemRandom()
+
+# linux/fs.h
+RENAME_NOREPLACE = 1
+
+# Renames and unlinks relative to a directory descriptor (POSIX *at calls)
+DIR_FD_SUPPORTED = os.rename in os.supports_dir_fd and os.unlink in os.supports_dir_fd
+
+_renameat2 = None
+
+
+def rename_noreplace(src: str, dst: str, dir_fd: Optional[int] = None):
+    """
+    Rename src to dst, failing with FileExistsError instead of replacing dst
+
+    Uses renameat2(RENAME_NOREPLACE) where available. Elsewhere dst is checked
+    first, which leaves a small race window.
+    """
+    global _renameat2
+
+    if _renameat2 is None:
+        _renameat2 = False
+        try:
+            import ctypes
+            import ctypes.util
+
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            _renameat2 = libc.renameat2
+            _renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int,
+                                   ctypes.c_char_p, ctypes.c_uint]
+        except (OSError, AttributeError, TypeError):
+            pass
+
+    if _renameat2:
+        at_fd = dir_fd if dir_fd is not None else -100  # AT_FDCWD
+        if _renameat2(at_fd, os.fsencode(src), at_fd, os.fsencode(dst), RENAME_NOREPLACE) == 0:
+            return
+        import ctypes
+        err = ctypes.get_errno()
+        # Filesystems without RENAME_NOREPLACE support fall through to the check
+        if err not in (errno.EINVAL, errno.ENOSYS):
+            raise OSError(err, os.strerror(err), src, None, dst)
+
+    try:
+        os.stat(dst, dir_fd=dir_fd, follow_symlinks=False)
+    except FileNotFoundError:
+        pass
+    else:
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), dst)
+    if dir_fd is None:
+        os.rename(src, dst)
+    else:
+        os.rename(src, dst, src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+
+
+class DirectoryHandle:
+    """An open directory shared by the jobs shredding files inside it"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.fd: Optional[int] = None
+        self.pending = 0
+        # Lengths of every name that was unlinked here, for scrubbing
+        self.name_lengths: List[int] = []
+        self.lock = threading.Lock()
+
+    def open(self):
+        """Open the directory for *at calls (path-based calls are used otherwise)"""
+        if self.fd is None and DIR_FD_SUPPORTED:
+            try:
+                self.fd = os.open(self.path, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+            except OSError:
+                self.fd = None
+
+    def removed(self, name: str):
+        """Remember that an entry with this original name was unlinked"""
+        with self.lock:
+            self.name_lengths.append(len(name))
+
+    def exists(self, name: str) -> bool:
+        try:
+            if self.fd is not None:
+                os.stat(name, dir_fd=self.fd, follow_symlinks=False)
+            else:
+                os.lstat(self.path / name)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def rename(self, src: str, dst: str):
+        if self.fd is not None:
+            rename_noreplace(src, dst, self.fd)
+        else:
+            rename_noreplace(str(self.path / src), str(self.path / dst))
+
+    def unlink(self, name: str):
+        if self.fd is not None:
+            os.unlink(name, dir_fd=self.fd)
+        else:
+            (self.path / name).unlink()
+
+    def sync(self):
+        """Make renames and unlinks in this directory durable"""
+        if self.fd is not None:
+            os.fsync(self.fd)
+        elif os.name != 'nt':
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class FilenameObfuscator:
+    """
+    Rename strategy applied before a file is unlinked
+
+    Every name is drawn so that it does not exist yet, and renames never
+    replace an existing entry.
+    """
+
+    def __init__(self, rename_count: int = 10, preserve_length: bool = False):
+        """
+        Args:
+            rename_count: Renames per file (0 unlinks under the original name)
+            preserve_length: Use random names as long as the original name, so
+                each rename reuses the original directory entry's slot instead
+                of the default 16 hex characters plus the original suffix
+        """
+        self.rename_count = max(0, rename_count)
+        self.preserve_length = preserve_length
+
+    def plan(self, file_path: Path, directory: Optional[DirectoryHandle] = None) -> List[str]:
+        """Random names the file will be renamed through, in order"""
+        if directory is not None:
+            exists = directory.exists
+        else:
+            exists = lambda name: os.path.lexists(file_path.parent / name)
+
+        names = []
+        taken = {file_path.name}
+        length = len(file_path.name)
+        for _ in range(self.rename_count):
+            for _attempt in range(32):
+                name = self._draw(length, file_path.suffix)
+                if name not in taken and not exists(name):
+                    break
+            else:
+                # Short names run out of unused values: grow by one character
+                length += 1
+                name = random_name(length)
+            taken.add(name)
+            names.append(name)
+        return names
+
+    def _draw(self, length: int, suffix: str) -> str:
+        if self.preserve_length:
+            return random_name(length)
+        return os.urandom(8).hex() + suffix
+
+    def rename_random(self, file_path: Path, directory: Optional[DirectoryHandle] = None) -> Path:
+        """
+        Rename file_path through fresh random names without probing them first
+
+        A name that turns out to exist is redrawn (renames never replace), so
+        a rename costs one syscall instead of a stat plus the rename. The
+        names are not known in advance, so journalled jobs use plan() instead.
+        """
+        current = file_path.name
+        taken = {current}
+        length = len(current)
+        for _ in range(self.rename_count):
+            attempts = 0
+            while True:
+                attempts += 1
+                if attempts > 32:
+                    # Short names run out of unused values: grow by one character
+                    length += 1
+                    attempts = 0
+                name = self._draw(length, file_path.suffix)
+                if name in taken:
+                    continue
+                try:
+                    if directory is not None:
+                        directory.rename(current, name)
+                    else:
+                        rename_noreplace(str(file_path.parent / current),
+                                         str(file_path.parent / name))
+                except FileExistsError:
+                    continue
+                taken.add(name)
+                current = name
+                break
+        return file_path.parent / current
+
+    def rename_chain(self, file_path: Path, names: List[str],
+                     directory: Optional[DirectoryHandle] = None) -> Path:
+        """Rename file_path through names; returns where it ends up"""
+        current = file_path.name
+        for name in names:
+            if directory is not None:
+                directory.rename(current, name)
+            else:
+                rename_noreplace(str(file_path.parent / current), str(file_path.parent / name))
+            current = name
+        return file_path.parent / current
+
+
+def random_name(length: int) -> str:
+    """Random name of exactly length characters"""
+    return ''.join(_system_random.choice(NAME_ALPHABET) for _ in range(max(1, length)))
+
+
+def scrub_entries(directory: DirectoryHandle, name_lengths: List[int]):
+    """
+    Overwrite the names of removed directory entries
+
+    Filesystems such as ext4 leave deleted names in directory blocks until
+    the slot is reused. Creating (then removing) one empty file per removed
+    name, with a random name of the same length, fills those slots.
+    """
+    created = []
+    try:
+        for length in name_lengths:
+            for _attempt in range(32):
+                name = random_name(length)
+                try:
+                    if directory.fd is not None:
+                        fd = os.open(name, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600,
+                                     dir_fd=directory.fd)
+                    else:
+                        fd = os.open(directory.path / name,
+                                     os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                except FileExistsError:
+                    continue
+                os.close(fd)
+                created.append(name)
+                break
+    finally:
+        for name in created:
+            try:
+                directory.unlink(name)
+            except OSError:
+                pass
+
+
+class DirectoryBatch:
+    """
+    Directories touched by one batch of shred jobs
+
+    Each directory is opened once and shared by its jobs. When its last
+    file is done, its entries are optionally scrubbed and it is fsync'd
+    once, instead of once per file.
+    """
+
+    def __init__(self, sync: bool = True, scrub: bool = False):
+        self.sync = sync
+        self.scrub = scrub
+        self._handles: Dict[Path, DirectoryHandle] = {}
+        self._lock = threading.Lock()
+
+    def expect(self, file_path: Path):
+        """Count a file that will be shredded in its directory"""
+        with self._lock:
+            handle = self._handles.get(file_path.parent)
+            if handle is None:
+                handle = self._handles[file_path.parent] = DirectoryHandle(file_path.parent)
+            handle.pending += 1
+
+    def get(self, file_path: Path) -> Optional[DirectoryHandle]:
+        """Handle for a file's directory, opened on first use"""
+        with self._lock:
+            handle = self._handles.get(file_path.parent)
+            if handle is not None:
+                handle.open()
+        return handle
+
+    def finished(self, file_path: Path):
+        """A file's job is over (either way); finalize its directory if it was the last"""
+        with self._lock:
+            handle = self._handles.get(file_path.parent)
+            if handle is None:
+                return
+            handle.pending -= 1
+            if handle.pending > 0:
+                return
+            del self._handles[file_path.parent]
+        self._finalize(handle)
+
+    def _finalize(self, handle: DirectoryHandle):
+        try:
+            if self.scrub and handle.name_lengths:
+                scrub_entries(handle, handle.name_lengths)
+            if self.sync:
+                handle.sync()
+        except OSError:
+            pass
+        finally:
+            handle.close()
+
+    def close(self):
+        """Finalize directories whose jobs never all finished"""
+        with self._lock:
+            handles = list(self._handles.values())
+            self._handles.clear()
+        for handle in handles:
+            self._finalize(handle)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
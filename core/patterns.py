@@ -0,0 +1,68 @@
+"""
+Reusable overwrite pattern buffers
+Each pattern is tiled once into a page-aligned buffer and shared by every pass
+"""
+
+import mmap
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+def allocate_buffer(size: int) -> mmap.mmap:
+    """Allocate a zero-filled, page-aligned buffer of at least 1 byte"""
+    return mmap.mmap(-1, max(size, 1))
+
+
+def tile_pattern(buffer, pattern: bytes, size: int):
+    """Fill buffer[:size] with pattern by doubling in-place slice assignment"""
+    filled = min(len(pattern), size)
+    buffer[:filled] = pattern[:filled]
+    while filled < size:
+        step = min(filled, size - filled)
+        buffer[filled:filled + step] = buffer[:step]
+        filled += step
+
+
+class PatternCache:
+    """Cache of tiled pattern buffers keyed by (pattern, buffer size)
+
+    Multi-byte patterns (e.g. the 3-byte Gutmann MFM patterns) keep one
+    buffer per phase, so a chunk written at any file offset continues the
+    pattern exactly where the previous chunk stopped.
+    """
+
+    def __init__(self):
+        self._buffers: Dict[Tuple[bytes, int], List[Optional[memoryview]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, pattern: bytes, size: int, offset: int = 0) -> memoryview:
+        """
+        Get a read-only view of ``size`` pattern bytes
+
+        Args:
+            pattern: Repeating byte pattern
+            size: Buffer size in bytes
+            offset: File offset the buffer will be written at (selects the phase)
+
+        Returns:
+            memoryview whose first byte lines up with ``offset``
+        """
+        phase = offset % len(pattern)
+        key = (pattern, size)
+        variants = self._buffers.get(key)
+
+        if variants is None or variants[phase] is None:
+            with self._lock:
+                variants = self._buffers.setdefault(key, [None] * len(pattern))
+                if variants[phase] is None:
+                    rotated = pattern[phase:] + pattern[:phase]
+                    buffer = allocate_buffer(size)
+                    tile_pattern(buffer, rotated, size)
+                    variants[phase] = memoryview(buffer)[:size].toreadonly()
+
+        return variants[phase]
+
+    def clear(self):
+        """Drop all cached buffers"""
+        with self._lock:
+            self._buffers.clear()
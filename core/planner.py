@@ -0,0 +1,436 @@
+"""
+Dry-run planning
+Projects the bytes, syscalls and wall-clock time of a shred job (files or
+free space) for several methods and worker counts without touching the
+targets
+"""
+
+import os
+import stat
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .extents import allocated_bytes
+from .io_backend import datasync, preferred_block_size, pwrite_all
+from .methods import COMPLEMENT
+from .patterns import allocate_buffer
+from .random_source import create_random_source
+from .scheduler import NOMINAL_RATES, DeviceInfo, IOScheduler
+from .shredder_engine import (
+    SMALL_UNIT_BUFFER, SMALL_UNIT_FILES, FreeSpaceShredder, ShredderEngine
+)
+from .verification import READ_CHUNK, SAMPLE_SIZE
+
+# Syscalls counted per plan, in the order a file goes through them
+SYSCALLS = ('open', 'read', 'write', 'sync', 'rename', 'truncate', 'unlink')
+
+# fdatasync latency assumed when it can't be measured (seconds)
+NOMINAL_SYNC_LATENCY = {
+    'ssd': 0.001,
+    'rotational': 0.015,
+    'network': 0.005,
+    'unknown': 0.005,
+}
+
+SYNC_PROBES = 4
+RANDOM_PROBE_BYTES = 8 * 1024 * 1024
+
+
+class DeviceEstimate(NamedTuple):
+    """Measured (or assumed) speed of one device"""
+    info: DeviceInfo
+    write_rate: float
+    sync_latency: float
+    concurrency: int
+    measured: bool
+
+    def to_dict(self) -> dict:
+        return {
+            'device': self.info.device,
+            'mount_point': self.info.mount_point,
+            'fs_type': self.info.fs_type,
+            'kind': self.info.kind,
+            'write_rate': self.write_rate,
+            'sync_latency': self.sync_latency,
+            'concurrency': self.concurrency,
+            'rate_source': 'probe' if self.measured else 'nominal',
+        }
+
+
+class _Work(NamedTuple):
+    """One scheduled job (a file, a small-file unit or a fill file) as costs"""
+    device: Optional[int]
+    written: int
+    read: int
+    random: int
+    syncs: int
+
+
+class ShredPlanner:
+    """
+    Estimates a shred job before it runs
+
+    Targets are only stat'ed, never opened. Each device gets one short
+    calibration write and a few fdatasync probes in a temporary
+    ``__shredder_temp_*`` file next to the first target on it (removed
+    straight away), and random sources are timed in memory. Projections
+    are lower bounds of a simple model: a device moves data no faster than
+    its calibrated single-stream rate, sync latency and random generation
+    overlap across concurrent jobs, and no job finishes before its own
+    serial cost.
+
+    Example:
+        planner = ShredPlanner(ShredderEngine(sync_policy='final'))
+        report = planner.plan_files(paths, methods=['dod', 'gutmann'], workers=[1, 4, 8])
+    """
+
+    def __init__(self, engine: Optional[ShredderEngine] = None,
+                 free_space: Optional[FreeSpaceShredder] = None, probe: bool = True):
+        """
+        Args:
+            engine: Engine whose settings are planned for (default: ShredderEngine())
+            free_space: Free-space shredder to plan for (default: FreeSpaceShredder())
+            probe: Measure devices and random sources (False = nominal device
+                rates, and random generation is left out of the projection)
+        """
+        self.engine = engine or ShredderEngine()
+        self.free_space = free_space or FreeSpaceShredder(methods=self.engine.methods)
+        self.probe = probe
+        self._devices: Dict[Optional[int], DeviceEstimate] = {}
+        self._random_rates: Dict[str, float] = {}
+
+    def plan_files(self, paths: Iterable[str], methods: Sequence[str] = ('dod',),
+                   workers: Sequence[int] = (4,), per_device: Optional[int] = None,
+                   budgets: Optional[dict] = None, batch_size: int = 64,
+                   verify: Union[bool, str] = True) -> dict:
+        """
+        Plan ShredderEngine.shred_many over paths
+
+        Args:
+            paths: Files to shred
+            methods: Methods to compare
+            workers: Worker counts to compare
+            per_device, budgets, batch_size: As for shred_many
+            verify: As for shred_many (True uses the engine's verify_mode)
+
+        Returns:
+            dict with the survey (files, logical/allocated/data bytes, skipped
+            entries), the devices with their rates, and one plan per method
+            and worker count (passes, bytes_written, bytes_read, syscalls,
+            seconds)
+        """
+        engine = self.engine
+        for method in methods:
+            engine.methods.get(method)
+        scheduler = IOScheduler(budgets, per_device, engine.devices)
+
+        # Survey: stat only
+        files = []
+        skipped = []
+        logical = allocated = 0
+        seen = set()
+        for path in paths:
+            # shred_many shreds a repeated path once
+            key = os.path.abspath(path)
+            if key in seen:
+                continue
+            seen.add(key)
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                skipped.append({'success': False, 'error': e.strerror or str(e),
+                                'file': os.path.basename(path), 'path': str(path)})
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                skipped.append({'success': False, 'error': 'Not a regular file',
+                                'file': os.path.basename(path), 'path': str(path)})
+                continue
+            data = st.st_size
+            on_disk = allocated_bytes(st)
+            if engine.sparse_aware and on_disk is not None:
+                data = min(data, on_disk)
+            logical += st.st_size
+            allocated += on_disk if on_disk is not None else st.st_size
+            files.append((Path(path), st, data))
+            if st.st_dev not in self._devices:
+                self._devices[st.st_dev] = self._probe_device(
+                    Path(path).parent, st, scheduler.budget_for(engine.devices.info(path, st)))
+
+        # Files the fast path would shred a directory at a time
+        units = defaultdict(list)
+        singles = []
+        fast_path = engine.small_file_size > 0 and engine.journal is None
+        for item in files:
+            if fast_path and item[1].st_size <= engine.small_file_size:
+                units[item[0].parent].append(item)
+            else:
+                singles.append(item)
+        unit_groups = [group[i:i + SMALL_UNIT_FILES]
+                       for group in units.values() for i in range(0, len(group), SMALL_UNIT_FILES)]
+
+        mode = engine._verify_mode_for(verify)
+        plans = []
+        for method in methods:
+            plan = engine.methods.get(method)
+            passes = plan.patterns
+            random_rate = self._random_rate(engine._random_source_for(method), passes)
+            counts = dict.fromkeys(SYSCALLS, 0)
+            work: List[_Work] = []
+
+            for path, st, data in singles:
+                buffer_size = engine.block_size or engine.calibrator.block_size_for(
+                    path, st, calibrate=engine.calibrate and self.probe)
+                if engine.sync_policy == 'per_pass':
+                    syncs = len(passes)
+                else:
+                    syncs = 1 if engine.sync_policy == 'final' else 0
+                work.append(self._file_work(counts, plan, data, buffer_size, mode, syncs,
+                                            st.st_dev, opens=2 if engine.direct_io else 1))
+
+            for unit in unit_groups:
+                written = read = random_bytes = 0
+                for _path, st, data in unit:
+                    cost = self._file_work(counts, plan, data,
+                                           min(engine.small_file_size, SMALL_UNIT_BUFFER),
+                                           mode, 0, st.st_dev)
+                    written += cost.written
+                    read += cost.read
+                    random_bytes += cost.random
+                syncs = sum(1 for index in range(len(passes))
+                            if engine.sync_policy == 'per_pass' or index == len(passes) - 1
+                            or index in plan.verify_after)
+                if engine.sync_policy != 'batched':
+                    syncs += 1
+                counts['sync'] += syncs
+                work.append(_Work(unit[0][1].st_dev, written, read, random_bytes, syncs))
+
+            if engine.sync_policy == 'batched' and singles:
+                counts['sync'] += -(-len(singles) // max(1, batch_size))
+            if engine.sync_directories:
+                counts['sync'] += len({path.parent for path, _st, _data in files})
+
+            for worker_count in workers:
+                plans.append({
+                    'method': method,
+                    'workers': worker_count,
+                    'passes': len(passes),
+                    'bytes_written': sum(item.written for item in work),
+                    'bytes_read': sum(item.read for item in work),
+                    'random_bytes': sum(item.random for item in work),
+                    'syscalls': dict(counts),
+                    'seconds': self._project(work, max(1, worker_count), random_rate),
+                })
+
+        return {
+            'files': len(files),
+            'small_file_units': len(unit_groups),
+            'logical_bytes': logical,
+            'allocated_bytes': allocated,
+            'data_bytes': sum(data for _path, _st, data in files),
+            'skipped': skipped,
+            'devices': [self._devices[st_dev].to_dict()
+                        for st_dev in sorted({st.st_dev for _path, st, _data in files})],
+            'sync_policy': engine.sync_policy,
+            'verify_mode': mode,
+            'plans': plans,
+        }
+
+    def plan_free_space(self, target_path: str, methods: Sequence[str] = ('random',),
+                        workers: Sequence[int] = (1,)) -> dict:
+        """
+        Plan FreeSpaceShredder.shred_free_space over target_path
+
+        Returns:
+            dict with the free bytes that would be filled, the device and one
+            plan per method and worker count (fill files written in parallel)
+        """
+        import shutil
+
+        shredder = self.free_space
+        target = Path(target_path)
+        st = os.stat(target)
+        free = shutil.disk_usage(target).free
+        covered = max(0, free - shredder.SAFETY_MARGIN)
+        if st.st_dev not in self._devices:
+            info = self.engine.devices.info(target, st)
+            self._devices[st.st_dev] = self._probe_device(
+                target, st, IOScheduler(probe=self.engine.devices).budget_for(info),
+                calibrator=shredder.calibrator)
+        device = self._devices[st.st_dev]
+        if shredder.block_size:
+            buffer_size = shredder.block_size
+        elif self.probe:
+            buffer_size = shredder.calibrator.device_block_size(target, st)
+        else:
+            buffer_size = preferred_block_size(getattr(st, 'st_blksize', 0))
+
+        plans = []
+        for method in methods:
+            passes = shredder.get_passes(method)
+            random_passes = passes.count(None)
+            random_rate = self._random_rate(shredder.random_source, passes)
+            for worker_count in workers:
+                worker_count = max(1, worker_count)
+                share = -(-covered // worker_count)
+                sizes = [size for size in (min(share, covered - n * share)
+                                           for n in range(worker_count)) if size > 0]
+                chunks = sum(-(-size // buffer_size) for size in sizes)
+                checkpoints = len(sizes) * len(passes) + 1
+                work = [_Work(st.st_dev, size * len(passes), 0, size * random_passes,
+                              len(passes)) for size in sizes]
+                plans.append({
+                    'method': method,
+                    'workers': worker_count,
+                    'passes': len(passes),
+                    'bytes_written': covered * len(passes),
+                    'bytes_read': 0,
+                    'random_bytes': covered * random_passes,
+                    # Each pass of each fill file ends with an fdatasync and a
+                    # state checkpoint (open, fsync, rename)
+                    'syscalls': {
+                        'open': len(sizes) * (3 if shredder.direct_io else 2) + checkpoints,
+                        'read': 0,
+                        'write': chunks * len(passes),
+                        'sync': len(sizes) * len(passes) + checkpoints,
+                        'rename': checkpoints,
+                        'truncate': 0,
+                        'unlink': len(sizes) + 1,
+                    },
+                    'seconds': self._project(work, len(sizes) or 1, random_rate,
+                                             concurrency=len(sizes) or 1),
+                })
+
+        return {
+            'target': str(target),
+            'free_bytes': free,
+            'bytes_covered': covered,
+            'block_size': buffer_size,
+            'devices': [device.to_dict()],
+            'plans': plans,
+        }
+
+    def _file_work(self, counts: dict, plan, data: int, buffer_size: int, mode: str,
+                   syncs: int, device: Optional[int], opens: int = 1) -> _Work:
+        """Add one file's syscalls to counts and return its costs"""
+        engine = self.engine
+        passes = plan.patterns
+        chunks = -(-data // buffer_size)
+        complements = sum(1 for pattern in passes if pattern is COMPLEMENT)
+
+        reads = chunks * complements
+        read = data * complements
+        for check in [*plan.verify_after.values(), mode]:
+            n, nbytes = _read_back(check, data, engine.verify_samples)
+            reads += n
+            read += nbytes
+        if engine.fingerprint:
+            reads += chunks
+            read += data
+
+        counts['open'] += opens
+        counts['read'] += reads
+        counts['write'] += chunks * len(passes)
+        counts['sync'] += syncs
+        counts['rename'] += engine.rename_count
+        counts['truncate'] += 1
+        counts['unlink'] += 1
+        return _Work(device, data * len(passes), read, data * passes.count(None), syncs)
+
+    def _project(self, work: List[_Work], workers: int, random_rate: float,
+                 concurrency: Optional[int] = None) -> Optional[float]:
+        """Projected wall-clock seconds for work spread over workers"""
+        if not work:
+            return 0.0
+        cpus = os.cpu_count() or 1
+        generate = sum(item.random for item in work) / random_rate if random_rate else 0.0
+        wall = generate / min(workers, cpus)
+
+        serial_total = 0.0
+        for st_dev in {item.device for item in work}:
+            device = self._devices[st_dev]
+            jobs = [item for item in work if item.device == st_dev]
+            transfer = sum(item.written + item.read for item in jobs) / device.write_rate
+            costs = [self._job_seconds(item, device, random_rate) for item in jobs]
+            slots = min(workers, concurrency or device.concurrency)
+            wall = max(wall, transfer, sum(costs) / slots, max(costs))
+            serial_total += sum(costs)
+        return max(wall, serial_total / workers)
+
+    @staticmethod
+    def _job_seconds(item: _Work, device: DeviceEstimate, random_rate: float) -> float:
+        seconds = (item.written + item.read) / device.write_rate + item.syncs * device.sync_latency
+        if random_rate:
+            seconds += item.random / random_rate
+        return seconds
+
+    def _probe_device(self, directory: Path, st: os.stat_result, budget,
+                      calibrator=None) -> DeviceEstimate:
+        """Calibrated write rate and sync latency of the device holding directory"""
+        info = self.engine.devices.info(directory, st)
+        rate = latency = None
+        if self.probe:
+            calibrator = calibrator or self.engine.calibrator
+            rate = calibrator.throughput(directory, st)
+            latency = _sync_latency(directory)
+        measured = bool(rate) and latency is not None
+        if not rate:
+            rate = NOMINAL_RATES[info.kind]
+        if budget.bandwidth:
+            rate = min(rate, budget.bandwidth)
+        if latency is None:
+            latency = NOMINAL_SYNC_LATENCY[info.kind]
+        return DeviceEstimate(info, rate, latency, budget.concurrency, measured)
+
+    def _random_rate(self, source_name: str, passes: list) -> float:
+        """Single-thread throughput of a random source (0 when the passes need none)"""
+        if None not in passes or not self.probe:
+            return 0.0
+        if source_name not in self._random_rates:
+            source = create_random_source(source_name)
+            try:
+                buffer = memoryview(allocate_buffer(RANDOM_PROBE_BYTES))
+                source.fill(buffer)
+                self._random_rates[source_name] = source.throughput
+            finally:
+                source.close()
+        return self._random_rates[source_name]
+
+
+def _read_back(mode: str, data: int, samples: int) -> Tuple[int, int]:
+    """(reads, bytes) of one read-back check over data bytes"""
+    if mode == 'full':
+        return -(-data // READ_CHUNK), data
+    if mode == 'sampled':
+        blocks = min(samples, -(-data // SAMPLE_SIZE))
+        return blocks, min(data, blocks * SAMPLE_SIZE)
+    return 0, 0
+
+
+def _sync_latency(directory: Path) -> Optional[float]:
+    """Median fdatasync latency of a small write in directory (None if it can't be measured)"""
+    probe = directory / f'{FreeSpaceShredder.TEMP_PREFIX}plan_{os.urandom(8).hex()}.tmp'
+    try:
+        fd = os.open(probe, os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0),
+                     0o600)
+    except OSError:
+        return None
+
+    block = bytes(SAMPLE_SIZE)
+    timings = []
+    try:
+        for n in range(SYNC_PROBES):
+            start = time.perf_counter()
+            pwrite_all(fd, block, n * SAMPLE_SIZE)
+            datasync(fd)
+            timings.append(time.perf_counter() - start)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+        try:
+            probe.unlink()
+        except OSError:
+            pass
+    return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,117 @@
+"""
+Progress reporting between shredding workers and a UI/consumer
+
+Workers only ever write to their own job objects or append to a list, so the
+hot path takes no locks. A single consumer polls snapshot() at its own pace
+(e.g. from Tk's root.after) and derives aggregate bytes, MB/s and ETA.
+"""
+
+import time
+from typing import Optional
+
+
+class ProgressTracker:
+    """Aggregate progress of running and finished shred jobs"""
+
+    # Smoothing factor for the throughput moving average
+    RATE_SMOOTHING = 0.3
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget all jobs (call before reusing the tracker for a new run)"""
+        self._expected_bytes = 0
+        self._expected_files = 0
+        self._active = {}
+        self._finished = []
+
+        # Consumer-side state
+        self._finished_seen = 0
+        self._finished_bytes = 0
+        self._unwritten_bytes = 0
+        self._start = time.monotonic()
+        self._last_time = self._start
+        self._last_bytes = 0
+        self._rate = 0.0
+
+    # ---- Producer side (engine threads) ----
+
+    def expect(self, total_bytes: int, files: int):
+        """Announce work that is about to be submitted"""
+        self._expected_bytes += total_bytes
+        self._expected_files += files
+
+    def job_started(self, job):
+        """Start following a job's processed_bytes/total_bytes counters"""
+        self._active[id(job)] = job
+
+    def job_finished(self, job):
+        """Stop following a job; bytes it never wrote are dropped from the total"""
+        self._active.pop(id(job), None)
+        self._finished.append((job.processed_bytes, job.total_bytes))
+
+    def add_finished(self, written: int, total: Optional[int] = None):
+        """Record a job that ran elsewhere (e.g. in a worker process)"""
+        self._finished.append((written, written if total is None else total))
+
+    # ---- Consumer side (single poller) ----
+
+    def snapshot(self) -> dict:
+        """
+        Current progress
+
+        Returns:
+            dict with aggregate bytes/files, percent, mb_per_s, eta_seconds
+            and per-file entries for jobs still running
+        """
+        finished = self._finished
+        end = len(finished)
+        for written, total in finished[self._finished_seen:end]:
+            self._finished_bytes += written
+            self._unwritten_bytes += max(0, total - written)
+        self._finished_seen = end
+
+        files = []
+        active_bytes = 0
+        active_remaining = 0
+        for job in list(self._active.values()):
+            done, total = job.processed_bytes, job.total_bytes
+            active_bytes += done
+            active_remaining += max(0, total - done)
+            files.append({
+                'path': str(job.path),
+                'bytes_done': done,
+                'bytes_total': total,
+                'percent': int(done * 100 / total) if total else 0
+            })
+
+        bytes_done = self._finished_bytes + active_bytes
+        bytes_total = max(self._expected_bytes - self._unwritten_bytes,
+                          bytes_done + active_remaining)
+
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        if elapsed > 0:
+            instant = (bytes_done - self._last_bytes) / elapsed
+            if self._rate:
+                self._rate += self.RATE_SMOOTHING * (instant - self._rate)
+            else:
+                self._rate = instant
+            self._last_time = now
+            self._last_bytes = bytes_done
+
+        remaining = bytes_total - bytes_done
+        eta = remaining / self._rate if self._rate > 0 else None
+
+        return {
+            'bytes_done': bytes_done,
+            'bytes_total': bytes_total,
+            'files_done': end,
+            'files_total': max(self._expected_files, end + len(files)),
+            'percent': int(bytes_done * 100 / bytes_total) if bytes_total else 0,
+            'mb_per_s': self._rate / (1024 * 1024),
+            'eta_seconds': eta,
+            'elapsed': now - self._start,
+            'files': files
+        }
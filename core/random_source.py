@@ -0,0 +1,149 @@
+"""
+Random data sources for random overwrite passes
+Sources fill caller-owned buffers in place and track their own throughput
+"""
+
+import os
+import time
+
+
+class RandomSource:
+    """Base class for random data sources"""
+
+    name = 'base'
+
+    def __init__(self):
+        self.bytes_generated = 0
+        self.seconds = 0.0
+
+    def fill(self, buffer: memoryview):
+        """Fill buffer in place with random bytes"""
+        start = time.perf_counter()
+        self._fill(buffer)
+        self.seconds += time.perf_counter() - start
+        self.bytes_generated += len(buffer)
+
+    def _fill(self, buffer: memoryview):
+        raise NotImplementedError
+
+    def merge_stats(self, other: 'RandomSource'):
+        """Fold another source's counters into this one (e.g. per-worker sources)"""
+        self.bytes_generated += other.bytes_generated
+        self.seconds += other.seconds
+
+    @property
+    def throughput(self) -> float:
+        """Achieved generation throughput in bytes per second"""
+        if self.seconds <= 0:
+            return 0.0
+        return self.bytes_generated / self.seconds
+
+    def stats(self) -> dict:
+        """Generation statistics for result reporting"""
+        return {
+            'source': self.name,
+            'bytes': self.bytes_generated,
+            'seconds': self.seconds,
+            'mb_per_s': self.throughput / (1024 * 1024)
+        }
+
+    def close(self):
+        """Release any resources held by the source"""
+
+
+class UrandomSource(RandomSource):
+    """Operating system CSPRNG (os.urandom / getrandom)"""
+
+    name = 'urandom'
+
+    def __init__(self):
+        super().__init__()
+        # Reading the device directly lets us fill buffers without allocating
+        try:
+            self._device = open('/dev/urandom', 'rb', buffering=0)
+        except OSError:
+            self._device = None
+
+    def _fill(self, buffer: memoryview):
+        if self._device is None:
+            buffer[:] = os.urandom(len(buffer))
+            return
+
+        view = memoryview(buffer)
+        while view:
+            read = self._device.readinto(view)
+            view = view[read:]
+
+    def close(self):
+        if self._device is not None:
+            self._device.close()
+            self._device = None
+
+
+class KeystreamSource(RandomSource):
+    """
+    Cipher keystream seeded once from os.urandom
+
+    Uses ChaCha20 from the optional ``cryptography`` package. Without it no
+    stdlib construction beats the OS CSPRNG (a SHAKE-128 stream measured no
+    faster and can't fill in place), so the source warns once and reads
+    /dev/urandom instead; stats() reports which backend ran.
+    """
+
+    name = 'stream'
+
+    def __init__(self):
+        super().__init__()
+        self._zeros = b''
+        self._fallback = None
+
+        try:
+            from cryptography.hazmat.primitives.ciphers import Cipher, algorithms
+        except ImportError:
+            import warnings
+
+            warnings.warn("random_source='stream' needs the 'cryptography' package to be "
+                          "faster than the OS CSPRNG; using urandom", RuntimeWarning,
+                          stacklevel=2)
+            self._encryptor = None
+            self._fallback = UrandomSource()
+            self.backend = 'urandom'
+            return
+
+        key, nonce = os.urandom(32), os.urandom(16)
+        self._encryptor = Cipher(algorithms.ChaCha20(key, nonce), mode=None).encryptor()
+        self.backend = 'chacha20'
+
+    def _fill(self, buffer: memoryview):
+        if self._fallback is not None:
+            self._fallback._fill(buffer)
+            return
+
+        # Encrypting zeros yields the raw keystream
+        size = len(buffer)
+        if len(self._zeros) < size:
+            self._zeros = bytes(size)
+        self._encryptor.update_into(memoryview(self._zeros)[:size], buffer)
+
+    def close(self):
+        if self._fallback is not None:
+            self._fallback.close()
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats['backend'] = self.backend
+        return stats
+
+
+RANDOM_SOURCES = {
+    UrandomSource.name: UrandomSource,
+    KeystreamSource.name: KeystreamSource,
+}
+
+
+def create_random_source(name: str) -> RandomSource:
+    """Create a random source by name ('urandom' or 'stream')"""
+    try:
+        return RANDOM_SOURCES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown random source: {name}") from None
@@ -0,0 +1,90 @@
+"""
+Directory enumeration for building shred job lists
+Streams (path, size) batches from os.scandir without blocking the caller
+"""
+
+import os
+import queue
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+# (path, size) - size is None when the entry could not be stat'ed
+ScanEntry = Tuple[str, Optional[int]]
+
+
+def scan_tree(root: str, batch_size: int = 1000,
+              stop_event: Optional[threading.Event] = None) -> Iterator[List[ScanEntry]]:
+    """
+    Walk a directory tree and yield batches of files
+
+    Follows the same rules as os.walk(): symlinks to directories are not
+    descended into. Sizes come from the DirEntry stat cache, so each file is
+    stat'ed at most once.
+
+    Args:
+        root: Directory to scan
+        batch_size: Maximum entries per yielded batch
+        stop_event: Optional event that aborts the scan when set
+    """
+    stack = [root]
+    batch: List[ScanEntry] = []
+
+    while stack:
+        if stop_event is not None and stop_event.is_set():
+            return
+
+        try:
+            iterator = os.scandir(stack.pop())
+        except OSError:
+            continue
+
+        with iterator:
+            for entry in iterator:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+
+                if is_dir:
+                    if not entry.is_symlink():
+                        stack.append(entry.path)
+                    continue
+
+                try:
+                    size = entry.stat().st_size
+                except OSError:
+                    size = None
+
+                batch.append((entry.path, size))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+
+    if batch:
+        yield batch
+
+
+class DirectoryScanner(threading.Thread):
+    """
+    Scan a directory tree on a background thread
+
+    Batches are posted to ``self.batches``; ``None`` marks the end of the scan.
+    """
+
+    def __init__(self, root: str, batch_size: int = 1000):
+        super().__init__(daemon=True)
+        self.root = root
+        self.batch_size = batch_size
+        self.batches: "queue.Queue[Optional[List[ScanEntry]]]" = queue.Queue()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            for batch in scan_tree(self.root, self.batch_size, self._stop_event):
+                self.batches.put(batch)
+        finally:
+            self.batches.put(None)
+
+    def cancel(self):
+        """Stop scanning at the next directory boundary"""
+        self._stop_event.set()
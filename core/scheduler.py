@@ -0,0 +1,307 @@
+"""
+Per-device I/O scheduling
+Groups queued files by the device (and mount) they live on, gives each
+device its own concurrency and bandwidth budget, and hands out work so the
+slowest device sets the pace instead of list order
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from .extents import fiemap_extents
+
+# Filesystems whose data lives on another machine
+NETWORK_FILESYSTEMS = {
+    '9p', 'afs', 'ceph', 'cifs', 'fuse.sshfs', 'glusterfs', 'lustre', 'ncpfs',
+    'nfs', 'nfs4', 'smb3', 'smbfs', 'sshfs',
+}
+
+MOUNTINFO = '/proc/self/mountinfo'
+SYS_DEV_BLOCK = '/sys/dev/block'
+
+
+class DeviceInfo(NamedTuple):
+    """What the scheduler knows about the device behind a file"""
+    device: Optional[int]
+    mount_point: Optional[str]
+    fs_type: Optional[str]
+    rotational: Optional[bool]
+
+    @property
+    def kind(self) -> str:
+        """'network', 'rotational', 'ssd' or 'unknown'"""
+        if self.fs_type in NETWORK_FILESYSTEMS:
+            return 'network'
+        if self.rotational is None:
+            return 'unknown'
+        return 'rotational' if self.rotational else 'ssd'
+
+
+class DeviceBudget(NamedTuple):
+    """Concurrent jobs and write bandwidth (bytes/s, None = unlimited) for one device"""
+    concurrency: int
+    bandwidth: Optional[float] = None
+
+
+# Defaults per device kind: a spinning disk does best with one stream
+DEFAULT_BUDGETS = {
+    'ssd': DeviceBudget(4),
+    'rotational': DeviceBudget(1),
+    'network': DeviceBudget(2),
+    'unknown': DeviceBudget(2),
+}
+
+# Nominal write rates (bytes/s) used to weigh devices against each other
+# when no bandwidth budget says otherwise; only their ratios matter
+NOMINAL_RATES = {
+    'ssd': 500 * 1024 * 1024,
+    'rotational': 120 * 1024 * 1024,
+    'network': 80 * 1024 * 1024,
+    'unknown': 200 * 1024 * 1024,
+}
+
+
+def _unescape(field: str) -> str:
+    """Decode the octal escapes (\\040 etc.) used in mountinfo fields"""
+    if '\\' not in field:
+        return field
+    import re
+
+    return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), field)
+
+
+def mount_table() -> List[Tuple[int, str, str]]:
+    """
+    Mounted filesystems as (device, mount point, filesystem type)
+
+    Read from /proc/self/mountinfo; empty where it doesn't exist.
+    """
+    mounts = []
+    try:
+        with open(MOUNTINFO, encoding='utf-8', errors='replace') as f:
+            lines = f.readlines()
+    except OSError:
+        return mounts
+
+    for line in lines:
+        fields = line.split()
+        try:
+            separator = fields.index('-')
+            major, minor = fields[2].split(':')
+            mounts.append((os.makedev(int(major), int(minor)), _unescape(fields[4]),
+                           fields[separator + 1]))
+        except (ValueError, IndexError):
+            continue
+    return mounts
+
+
+def is_rotational(device: int) -> Optional[bool]:
+    """
+    Whether a block device spins (None when unknown)
+
+    Partitions report through their parent disk's queue.
+    """
+    if not hasattr(os, 'major'):
+        return None
+    base = Path(SYS_DEV_BLOCK) / f'{os.major(device)}:{os.minor(device)}'
+    for candidate in (base / 'queue' / 'rotational', base / '..' / 'queue' / 'rotational'):
+        try:
+            return candidate.read_text().strip() == '1'
+        except OSError:
+            continue
+    return None
+
+
+class DeviceProbe:
+    """Looks up (and caches) DeviceInfo per st_dev"""
+
+    def __init__(self):
+        self._mounts = None
+        self._cache: Dict[int, DeviceInfo] = {}
+
+    def info(self, path: Union[str, Path], st: os.stat_result) -> DeviceInfo:
+        device = st.st_dev
+        if device not in self._cache:
+            if self._mounts is None:
+                self._mounts = mount_table()
+            mount_point, fs_type = self._mount_for(path, device)
+            self._cache[device] = DeviceInfo(device, mount_point, fs_type,
+                                             is_rotational(device))
+        return self._cache[device]
+
+    def _mount_for(self, path, device: int) -> Tuple[Optional[str], Optional[str]]:
+        # Last match wins: later mounts shadow earlier ones on the same device
+        matches = [(point, fs_type) for dev, point, fs_type in self._mounts if dev == device]
+        if matches:
+            return matches[-1]
+
+        # Anonymous devices (btrfs subvolumes, some FUSE) only match by path
+        path = os.path.abspath(path)
+        best = (None, None)
+        for _dev, point, fs_type in self._mounts:
+            prefix = point.rstrip('/') + '/'
+            if (path + '/').startswith(prefix) and len(point) >= len(best[0] or ''):
+                best = (point, fs_type)
+        return best
+
+
+class BandwidthLimiter:
+    """Token bucket shared by every job writing to one device"""
+
+    def __init__(self, rate: Optional[float], burst: Optional[float] = None):
+        """
+        Args:
+            rate: Bytes per second (None = unlimited)
+            burst: Bytes that may be written ahead of the rate (default: 1/4 second)
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else (rate or 0) / 4
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int):
+        """Account for nbytes written, sleeping when the device is over budget"""
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= nbytes
+            # Reserve the debt now so concurrent writers queue up behind it
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+
+
+class DeviceQueue:
+    """Files waiting on one device, with its budget and running state"""
+
+    def __init__(self, info: DeviceInfo, budget: DeviceBudget):
+        self.info = info
+        self.budget = budget
+        self.limiter = BandwidthLimiter(budget.bandwidth)
+        self.rate = budget.bandwidth or NOMINAL_RATES[info.kind]
+        # (sort key, path, expected bytes)
+        self.files: List[Tuple[tuple, str, int]] = []
+        self.pending = deque()
+        self.active = 0
+        self.remaining_bytes = 0
+
+    @property
+    def remaining_seconds(self) -> float:
+        """Estimated time to write what is left at the device's rate"""
+        return self.remaining_bytes / self.rate
+
+    @property
+    def can_start(self) -> bool:
+        return bool(self.pending) and self.active < self.budget.concurrency
+
+
+class IOScheduler:
+    """
+    Orders a batch of files across devices
+
+    Files are grouped by st_dev. On rotational devices they are sorted by
+    physical offset (FIEMAP) or, failing that, inode number so the head
+    sweeps the disk once; elsewhere the largest files go first so no big
+    file is left running alone at the end. Free worker slots go to the
+    device with the most estimated work left (longest-remaining-first), so
+    every device finishes at about the same time as the slowest one.
+    """
+
+    def __init__(self, budgets: Optional[Dict[Union[str, int], DeviceBudget]] = None,
+                 per_device: Optional[int] = None, probe: Optional[DeviceProbe] = None):
+        """
+        Args:
+            budgets: Budget overrides keyed by device kind ('ssd', 'rotational',
+                'network', 'unknown'), mount point or st_dev
+            per_device: Concurrency for every device, overriding the budgets
+            probe: Device lookup to use (default: a fresh DeviceProbe)
+        """
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.per_device = per_device
+        self.probe = probe or DeviceProbe()
+        self.queues: Dict[Optional[int], DeviceQueue] = {}
+
+    def budget_for(self, info: DeviceInfo) -> DeviceBudget:
+        budget = self.budgets.get(info.device) or self.budgets.get(info.mount_point) \
+            or self.budgets[info.kind]
+        if self.per_device is not None:
+            budget = budget._replace(concurrency=self.per_device)
+        return budget._replace(concurrency=max(1, budget.concurrency))
+
+    def add(self, path: str, st: Optional[os.stat_result], expected: int):
+        """Queue a file (st None when it couldn't be stat'ed) expecting to write expected bytes"""
+        if st is None:
+            device, info = None, DeviceInfo(None, None, None, None)
+        else:
+            device, info = st.st_dev, self.probe.info(path, st)
+
+        queue = self.queues.get(device)
+        if queue is None:
+            queue = self.queues[device] = DeviceQueue(info, self.budget_for(info))
+        queue.files.append(((st.st_ino if st else 0,), path, expected))
+        queue.remaining_bytes += expected
+
+    def plan(self):
+        """Sort every device's files; call once all files are added"""
+        for queue in self.queues.values():
+            if queue.info.rotational:
+                queue.files = [(self._physical_key(path, key), path, expected)
+                               for key, path, expected in queue.files]
+                queue.files.sort(key=lambda item: item[0])
+            else:
+                queue.files.sort(key=lambda item: -item[2])
+            queue.pending = deque((path, expected) for _key, path, expected in queue.files)
+            queue.files = []
+
+    @staticmethod
+    def _physical_key(path: str, inode_key: tuple) -> tuple:
+        """Physical offset of a file's first extent, else its inode"""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return (1,) + inode_key
+        try:
+            extents = fiemap_extents(fd)
+        finally:
+            os.close(fd)
+        if extents and extents[0].physical is not None:
+            return (0, extents[0].physical)
+        return (1,) + inode_key
+
+    def next_job(self) -> Optional[Tuple[Optional[int], str, int]]:
+        """
+        Next (device, path, expected bytes) to start, or None if every device
+        with files left is at its concurrency limit
+        """
+        ready = [queue for queue in self.queues.values() if queue.can_start]
+        if not ready:
+            return None
+        queue = max(ready, key=lambda q: q.remaining_seconds / (q.active + 1))
+        path, expected = queue.pending.popleft()
+        queue.active += 1
+        return queue.info.device, path, expected
+
+    def finished(self, device: Optional[int], expected: int):
+        """A job started by next_job is no longer writing"""
+        queue = self.queues[device]
+        queue.active -= 1
+        queue.remaining_bytes -= expected
+
+    def limiter_for(self, device: Optional[int]) -> Optional[BandwidthLimiter]:
+        """Shared bandwidth limiter for a device (None when unlimited)"""
+        queue = self.queues.get(device)
+        return queue.limiter if queue is not None and queue.limiter.rate else None
+
+    def has_pending(self) -> bool:
+        return any(queue.pending for queue in self.queues.values())
+
+    def __len__(self) -> int:
+        return sum(len(queue.pending) for queue in self.queues.values())
@@ -3,210 +3,1390 @@ Military-grade file shredding engine
 Implements DoD 5220.22-M, Gutmann, and custom methods
 """
 
+import contextlib
+import errno
 import os
-import secrets
-import hashlib
+import stat
+from collections import defaultdict
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+import threading
 import time
 
+from .extents import Extent, allocated_bytes, data_extents
+from .io_backend import (
+    IO_BACKENDS, MMAP_WINDOW, BlockSizeCalibrator, OverwriteTarget, fallocate, fill_mapped,
+    pread_into, syncfs
+)
+from .journal import OVERWRITING, JournalEntry, ShredJournal
+from .metrics import LATENCY_BUCKETS, Histogram, JobMetrics, MetricsSink, NullSink
+from .methods import COMPLEMENT, GUTMANN_PATTERNS, INVERT, MethodRegistry, PassPlan, default_registry
+from .obfuscation import DirectoryBatch, DirectoryHandle, FilenameObfuscator
+from .patterns import PatternCache, allocate_buffer
+from .progress import ProgressTracker
+from .random_source import RandomSource, create_random_source
+from .scheduler import DeviceBudget, DeviceProbe, IOScheduler
+from .verification import DEFAULT_SAMPLES, VERIFY_MODES, Fingerprint, PassVerifier
+
+
+# Durability guarantee of each sync policy, reported in result dicts
+SYNC_POLICIES = {
+    'per_pass': 'Every pass is flushed with fdatasync before the next pass starts',
+    'final': ('Only the final pass is guaranteed to reach stable storage; earlier '
+              'passes may be merged in the page cache unless direct_io is enabled'),
+    'batched': ('Like final, but flushed with one syncfs per batch of files before '
+                'any file in the batch is truncated or unlinked'),
+}
+
+
+class ShredCancelled(Exception):
+    """A job's cancel event was seen at a pass boundary"""
+
+
+class _ShredJob:
+    """Per-file state for a single shred operation"""
+
+    __slots__ = ('path', 'total_bytes', 'processed_bytes', 'on_advance', 'random_source',
+                 'target', 'method', 'passes', 'original_size', 'start_time', 'released',
+                 'extents', 'allocated_bytes', 'location', 'resume', 'directory',
+                 'verifier', 'fingerprint', 'cancel', 'plan', 'pass_checks', 'metrics',
+                 'small', 'backend', 'key', 'leftover')
+
+    def __init__(self, path: Path, on_advance: Optional[Callable] = None):
+        self.path = path
+        self.total_bytes = 0
+        self.processed_bytes = 0
+        self.on_advance = on_advance
+        self.random_source: Optional[RandomSource] = None
+        self.target: Optional[OverwriteTarget] = None
+        self.method = None
+        self.passes: list = []
+        self.original_size = 0
+        self.start_time = 0.0
+        self.released = False
+        self.extents: List[Extent] = []
+        self.allocated_bytes: Optional[int] = None
+        # Where the file is now (differs from path when resuming after renames)
+        self.location = path
+        # Journal key: the original path of the file being shredded
+        self.key = str(path)
+        # Result of an interrupted file found under its rename target, shredded first
+        self.leftover: Optional[dict] = None
+        self.resume: Optional[JournalEntry] = None
+        self.directory: Optional[DirectoryHandle] = None
+        self.verifier: Optional[PassVerifier] = None
+        self.fingerprint: Optional[Fingerprint] = None
+        self.cancel: Optional[threading.Event] = None
+        self.plan: Optional[PassPlan] = None
+        self.pass_checks: List[dict] = []
+        self.metrics: Optional[JobMetrics] = None
+        # Part of a small-file unit (see ShredderEngine._shred_small_files)
+        self.small = False
+        self.backend = 'write'
+
+    def advance(self, nbytes: int):
+        """Record nbytes written and notify the owner"""
+        self.processed_bytes += nbytes
+        if self.on_advance:
+            self.on_advance(self, nbytes)
+
+    def close(self):
+        """Release the file descriptor and random source held by the job"""
+        if self.target:
+            self.target.close()
+            self.target = None
+        if self.random_source:
+            self.random_source.close()
+
+
+# Stand-in for JobMetrics.timed() when metrics are off
+_NO_TIMER = contextlib.nullcontext()
+
+# Files per small-file unit (each holds a descriptor until the unit is done)
+SMALL_UNIT_FILES = 128
+
+# Largest random block and write size of a unit (a full unit at the default
+# small_file_size), whatever small_file_size is set to
+SMALL_UNIT_BUFFER = 8 * 1024 * 1024
+
+
+class _UnitSource:
+    """
+    Random source handing out consecutive slices of one pre-filled block,
+    so a small-file unit costs one random fill per pass instead of one per file
+
+    The block is capped at SMALL_UNIT_BUFFER; a larger unit refills it each
+    time it runs out.
+    """
+
+    def __init__(self, source: RandomSource, size: int):
+        self.source = source
+        self.block = memoryview(allocate_buffer(size))
+        self.position = 0
+
+    def refill(self, nbytes: int):
+        self.source.fill(self.block[:nbytes])
+        self.position = 0
+
+    def fill(self, view: memoryview):
+        if self.position + len(view) > len(self.block):
+            self.refill(len(self.block))
+        end = self.position + len(view)
+        view[:] = self.block[self.position:end]
+        self.position = end
+
+
+class _RandomShare(RandomSource):
+    """One file's share of a small-file unit's random source, for its result"""
+
+    def __init__(self, source: RandomSource, nbytes: int):
+        super().__init__()
+        self.name = source.name
+        self.source = source
+        self.bytes_generated = nbytes
+        if source.bytes_generated:
+            self.seconds = source.seconds * nbytes / source.bytes_generated
+
+    def stats(self) -> dict:
+        return {**self.source.stats(), **super().stats()}
+
+
+class _BatchProgress:
+    """Aggregate progress across all jobs of a shred_many() batch"""
+
+    def __init__(self, total_bytes: int, callback: Optional[Callable]):
+        self.total_bytes = max(total_bytes, 1)
+        self.processed_bytes = 0
+        self.callback = callback
+        self._last_percent = -1
+        self._lock = threading.Lock()
+
+    def add(self, nbytes: int):
+        with self._lock:
+            self.processed_bytes += nbytes
+            percent = min(100, int(self.processed_bytes * 100 / self.total_bytes))
+            if percent == self._last_percent:
+                return
+            self._last_percent = percent
+        if self.callback:
+            self.callback(percent)
+
+
+def _split_ranges(extents: list, workers: int, buffer_size: int) -> list:
+    """Cut extents into buffer-aligned (offset, end) ranges, a few per worker"""
+    total = sum(extent.length for extent in extents)
+    # Several ranges per worker keeps them busy when extents are uneven
+    range_size = max(buffer_size, total // (workers * 4))
+    range_size = -(-range_size // buffer_size) * buffer_size
+    
+    ranges = []
+    for extent in extents:
+        offset = extent.offset
+        end = extent.offset + extent.length
+        while offset < end:
+            ranges.append((offset, min(offset + range_size, end)))
+            offset += range_size
+    return ranges
+
+
+_worker_journals: Dict[str, ShredJournal] = {}
+_worker_engines: Dict[bytes, 'ShredderEngine'] = {}
+
+
+def _shred_in_worker(file_path: str, method: str, verify: Union[bool, str],
+                     options: dict) -> dict:
+    """Process-pool entry point: each worker process owns its own engine"""
+    import pickle
+
+    # One engine per worker process and options, so block size calibration
+    # and pattern buffers carry over from file to file
+    key = pickle.dumps(options)
+    engine = _worker_engines.get(key)
+    if engine is None:
+        journal_path = options.get('journal')
+        if journal_path:
+            # Replay the shared journal once per worker process, never compact it
+            if journal_path not in _worker_journals:
+                _worker_journals[journal_path] = ShredJournal(journal_path, compact=False)
+            options = {**options, 'journal': _worker_journals[journal_path]}
+        engine = _worker_engines[key] = ShredderEngine(**options)
+    return engine.shred_file(file_path, method=method, verify=verify)
+
 
 class ShredderEngine:
     """Core file shredding engine with military-grade algorithms"""
     
-    # Gutmann method patterns (35 passes)
-    GUTMANN_PATTERNS = [
-        # Pass 1-4: Random
-        None, None, None, None,
-        # Pass 5-9: Special patterns
-        b'\x55', b'\xAA', b'\x92\x49\x24', b'\x49\x24\x92', b'\x24\x92\x49',
-        # Pass 10-25: More patterns
-        b'\x00', b'\x11', b'\x22', b'\x33', b'\x44', b'\x55', b'\x66', b'\x77',
-        b'\x88', b'\x99', b'\xAA', b'\xBB', b'\xCC', b'\xDD', b'\xEE', b'\xFF',
-        # Pass 26-28: Special MFM patterns
-        b'\x92\x49\x24', b'\x49\x24\x92', b'\x24\x92\x49',
-        # Pass 29-31: Special patterns
-        b'\x6D\xB6\xDB', b'\xB6\xDB\x6D', b'\xDB\x6D\xB6',
-        # Pass 32-35: Random
-        None, None, None, None
-    ]
-    
-    def __init__(self, progress_callback: Optional[Callable] = None):
+    # Gutmann method patterns (35 passes); methods live in core.methods
+    GUTMANN_PATTERNS = GUTMANN_PATTERNS
+    
+    def __init__(self, progress_callback: Optional[Callable] = None,
+                 random_source: Union[str, Dict[str, str]] = 'urandom',
+                 block_size: Optional[int] = None, direct_io: bool = False,
+                 drop_cache: bool = True, calibrate: bool = True,
+                 sync_policy: str = 'per_pass', progress: Optional[ProgressTracker] = None,
+                 sparse_aware: bool = True, range_workers: int = 1,
+                 parallel_min_size: int = 256 * 1024 * 1024,
+                 journal: Optional[ShredJournal] = None,
+                 checkpoint_interval: int = 256 * 1024 * 1024,
+                 rename_count: int = 10, preserve_name_length: bool = False,
+                 sync_directories: bool = True, scrub_directories: bool = False,
+                 verify_mode: str = 'sampled', verify_samples: int = DEFAULT_SAMPLES,
+                 fingerprint: bool = False, methods: Optional[MethodRegistry] = None,
+                 metrics: Optional[MetricsSink] = None, small_file_size: int = 64 * 1024,
+                 io_backend: Union[str, Dict[Union[str, int], str]] = 'write',
+                 mmap_window: int = MMAP_WINDOW):
         """
         Initialize shredder engine
         
         Args:
             progress_callback: Function to call with progress updates (0-100)
+            random_source: Random source for random passes ('urandom' or 'stream'),
+                or a dict mapping method names to sources (missing methods use 'urandom')
+            block_size: Write size in bytes (None = choose from st_blksize/calibration)
+            direct_io: Write with O_DIRECT where the filesystem supports it
+            drop_cache: Evict overwritten pages from the page cache after each pass
+            calibrate: Allow a short calibration write per device for large files
+            sync_policy: 'per_pass', 'final' or 'batched' (see SYNC_POLICIES)
+            progress: Tracker that running jobs report bytes to (polled by the caller)
+            sparse_aware: Only overwrite regions that hold data, leaving holes unallocated
+            range_workers: Threads writing ranges of one file in parallel (1 = sequential)
+            parallel_min_size: Files smaller than this are always written sequentially
+            journal: Journal recording each file's progress so interrupted files
+                resume where they stopped (checkpoints are flushed first)
+            checkpoint_interval: Bytes written between mid-pass journal checkpoints
+            rename_count: Renames per file before it is unlinked
+            preserve_name_length: Rename through random names as long as the original
+            sync_directories: fsync each directory once its last file is done
+            scrub_directories: Overwrite removed names in each finished directory
+            verify_mode: Read-back used when verify=True ('none', 'sampled' or 'full',
+                see VERIFY_MODES)
+            verify_samples: Blocks re-read per file in 'sampled' mode
+            fingerprint: Hash each file's original content while the first pass runs
+            methods: Registry of shredding methods (default: the built-in methods)
+            metrics: Sink receiving per-phase timings and per-pass histograms of
+                every job (None = no instrumentation)
+            small_file_size: Files up to this size are shredded by shred_many
+                as per-directory units (0 = always one job per file)
+            io_backend: How pattern passes are written ('write' or 'mmap', see
+                IO_BACKENDS), or a dict choosing per device keyed by st_dev,
+                mount point or device kind (unlisted devices use 'write')
+            mmap_window: Bytes mapped at a time by the mmap backend
         """
+        if sync_policy not in SYNC_POLICIES:
+            raise ValueError(f"Unknown sync policy: {sync_policy}")
+        if verify_mode not in VERIFY_MODES:
+            raise ValueError(f"Unknown verify mode: {verify_mode}")
+        backends = io_backend.values() if isinstance(io_backend, dict) else [io_backend]
+        for backend in backends:
+            if backend not in IO_BACKENDS:
+                raise ValueError(f"Unknown I/O backend: {backend}")
+        
         self.progress_callback = progress_callback
-        self.total_bytes = 0
-        self.processed_bytes = 0
+        self.random_source = random_source
+        self.block_size = block_size
+        self.direct_io = direct_io
+        self.drop_cache = drop_cache
+        self.calibrate = calibrate
+        self.sync_policy = sync_policy
+        self.progress = progress
+        self.sparse_aware = sparse_aware
+        self.range_workers = max(1, range_workers)
+        self.parallel_min_size = parallel_min_size
+        self.journal = journal
+        self.checkpoint_interval = checkpoint_interval
+        self.rename_count = rename_count
+        self.preserve_name_length = preserve_name_length
+        self.sync_directories = sync_directories
+        self.scrub_directories = scrub_directories
+        self.obfuscator = FilenameObfuscator(rename_count, preserve_name_length)
+        self.verify_mode = verify_mode
+        self.verify_samples = verify_samples
+        self.fingerprint = fingerprint
+        self.methods = methods or default_registry
+        self.metrics = metrics
+        self.small_file_size = small_file_size
+        self.io_backend = io_backend
+        self.mmap_window = mmap_window
+        self.devices = DeviceProbe()
+        self.pattern_cache = PatternCache()
+        self.calibrator = BlockSizeCalibrator()
         
-    def shred_file(self, file_path: str, method: str = 'dod', verify: bool = True) -> dict:
+    def shred_file(self, file_path: str, method: str = 'dod',
+                   verify: Union[bool, str] = True,
+                   cancel: Optional[threading.Event] = None) -> dict:
         """
         Securely shred a file
         
         Args:
             file_path: Path to file to shred
             method: Shredding method ('dod', 'gutmann', 'random_7', 'simple')
-            verify: Verify file is unrecoverable after shredding
+            verify: Verify file is unrecoverable after shredding (True uses the
+                engine's verify_mode; a mode name picks one for this call)
+            cancel: Event that stops the job at the next pass boundary; the file
+                is then left in place, holding only complete passes
             
         Returns:
             dict with shred results
         """
-        start_time = time.time()
-        file_path = Path(file_path)
+        report = self._percent_reporter() if self.progress_callback else None
+        job = _ShredJob(Path(file_path), report)
+        job.cancel = cancel
+        with self._directory_batch() as directories:
+            directories.expect(job.path)
+            job.directory = directories.get(job.path)
+            result = self._shred_job(job, method, verify)
+            directories.finished(job.path)
+        return result
+
+    def _percent_reporter(self) -> Callable:
+        """on_advance for one job, calling progress_callback when the whole percent changes"""
+        last_percent = [-1]
+
+        def report(job, nbytes):
+            progress = int((job.processed_bytes / job.total_bytes) * 100)
+            if progress != last_percent[0]:
+                last_percent[0] = progress
+                self.progress_callback(progress)
+        return report
+
+    def shred_many(self, paths: Iterable[str], method: str = 'dod',
+                   verify: Union[bool, str] = True,
+                   workers: int = 4, per_device: Optional[int] = None,
+                   use_processes: bool = False, batch_size: int = 64,
+                   budgets: Optional[Dict[Union[str, int], DeviceBudget]] = None
+                   ) -> Iterator[dict]:
+        """
+        Shred a batch of files on a worker pool
+
+        Jobs are grouped by device (st_dev) and handed out by an IOScheduler:
+        each device runs at most its budget's number of jobs, spinning disks
+        get their files in on-disk order, and free slots go to the device
+        with the most work left. Files up to ``small_file_size`` are
+        shredded a directory at a time (see _shred_small_files) unless the
+        engine has a journal or use_processes is set. A path given more
+        than once is shredded (and reported) once.
+
+        Args:
+            paths: Files to shred
+            method: Shredding method (see shred_file)
+            verify: Verify each file after shredding
+            workers: Maximum number of files shredded concurrently
+            per_device: Concurrent jobs on every device (None = by device kind,
+                see scheduler.DEFAULT_BUDGETS)
+            use_processes: Use a process pool instead of a thread pool
+            batch_size: Files per syncfs() under the 'batched' sync policy
+                (each holds an open descriptor until its batch is synced)
+            budgets: DeviceBudget overrides keyed by device kind, mount point
+                or st_dev (bandwidth limits apply to the thread pool only)
+
+        Yields:
+            shred_file() result dicts, in completion order
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+        if use_processes:
+            # multiprocessing is only loaded when a process pool is asked for
+            from concurrent.futures import ProcessPoolExecutor
         
-        if not file_path.exists():
-            return {
-                'success': False,
-                'error': 'File not found',
-                'file': str(file_path)
-            }
+        workers = max(1, workers)
+        pass_count = len(self._get_passes_for_method(method))
+
+        # Group by device, remembering sizes for aggregate progress
+        scheduler = IOScheduler(budgets, per_device)
+        total_bytes = 0
+        file_count = 0
+        directories = self._directory_batch()
+        fast_path = self.small_file_size > 0 and self.journal is None and not use_processes
+        small_files = defaultdict(list)
+        seen = set()
+        for path in paths:
+            key = os.path.abspath(path)
+            if key in seen:
+                continue
+            seen.add(key)
+            directories.expect(Path(path))
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            expected = st.st_size * pass_count if st else 0
+            total_bytes += expected
+            file_count += 1
+            if (fast_path and st is not None and stat.S_ISREG(st.st_mode)
+                    and st.st_size <= self.small_file_size):
+                small_files[Path(path).parent].append((path, st))
+            else:
+                scheduler.add(path, st, expected)
+        
+        # Each unit of a directory's small files is one scheduler job
+        units = {}
+        for items in small_files.values():
+            items.sort(key=lambda item: item[1].st_ino)
+            for i in range(0, len(items), SMALL_UNIT_FILES):
+                unit = items[i:i + SMALL_UNIT_FILES]
+                units[unit[0][0]] = unit
+                scheduler.add(unit[0][0], unit[0][1],
+                              sum(st.st_size for _, st in unit) * pass_count)
+        scheduler.plan()
+
+        batch = _BatchProgress(total_bytes, self.progress_callback)
+        if self.progress:
+            self.progress.expect(total_bytes, file_count)
+        # Batched syncs need the open descriptors, which can't leave a worker process
+        batched = self.sync_policy == 'batched' and not use_processes
+
+        def advance_for(device):
+            limiter = scheduler.limiter_for(device)
+            if limiter and self.progress_callback:
+                def on_advance(job, nbytes):
+                    batch.add(nbytes)
+                    limiter.consume(nbytes)
+                return on_advance
+            if limiter:
+                return lambda job, nbytes: limiter.consume(nbytes)
+            if self.progress_callback:
+                return lambda job, nbytes: batch.add(nbytes)
+            return None
+
+        def run(path, device):
+            job = _ShredJob(Path(path), advance_for(device))
+            job.directory = directories.get(job.path)
+            if batched:
+                return self._begin_job(job, method, verify) or job
+            return self._shred_job(job, method, verify)
+
+        def run_unit(unit, device):
+            return self._shred_small_files(unit, directories.get(Path(unit[0][0])), method,
+                                           verify, advance_for(device))
+
+        executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        executor = executor_cls(max_workers=workers)
+        in_flight = {}
+        awaiting_sync = []
+        overwriting = 0
+
+        try:
+            while scheduler.has_pending() or in_flight or awaiting_sync:
+                # Flush a full batch, or whatever is left once overwrites drain
+                if awaiting_sync and (len(awaiting_sync) >= batch_size
+                                      or (not scheduler.has_pending() and not overwriting)):
+                    synced = set()
+                    for job in awaiting_sync:
+                        device = os.fstat(job.target.fd).st_dev
+                        if device not in synced:
+                            with self._timed(job, 'sync'):
+                                syncfs(job.target.fd)
+                            synced.add(device)
+                    for job in awaiting_sync:
+                        job.target.drop_cached_pages()
+                        future = executor.submit(self._complete_job, job, verify)
+                        in_flight[future] = (None, job.path, 'complete', 0)
+                    awaiting_sync = []
+
+                # Fill free worker slots, busiest device first
+                while len(in_flight) < workers:
+                    next_job = scheduler.next_job()
+                    if next_job is None:
+                        break
+                    device, path, expected = next_job
+                    if path in units:
+                        future = executor.submit(run_unit, units[path], device)
+                    elif use_processes:
+                        # Directories are synced and scrubbed here, once per batch
+                        options = {**self._engine_options(), 'sync_directories': False,
+                                   'scrub_directories': False}
+                        future = executor.submit(_shred_in_worker, path, method, verify,
+                                                 options)
+                    else:
+                        future = executor.submit(run, path, device)
+                    in_flight[future] = (device, path, 'overwrite', expected)
+                    overwriting += 1
+
+                if not in_flight:
+                    continue
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    device, path, stage, expected = in_flight.pop(future)
+                    if stage == 'overwrite':
+                        scheduler.finished(device, expected)
+                        overwriting -= 1
+                    unit = units.pop(path, None) if stage == 'overwrite' else None
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        failed = [file_path for file_path, _ in unit] if unit else [path]
+                        errors = [{'success': False, 'error': str(e), 'file': str(file_path),
+                                   'path': str(file_path)} for file_path in failed]
+                        result = errors if unit else errors[0]
+                    if isinstance(result, _ShredJob):
+                        awaiting_sync.append(result)
+                        continue
+                    if use_processes:
+                        written = result['bytes_written'] if result['success'] else 0
+                        batch.add(written)
+                        if self.progress:
+                            self.progress.add_finished(written, max(written, expected))
+                        handle = directories.get(Path(path))
+                        if result['success'] and handle is not None:
+                            handle.removed(Path(path).name)
+                        if self.metrics is not None and result.get('metrics'):
+                            self._export_metrics(result['metrics'], result)
+                    for result in (result if isinstance(result, list) else [result]):
+                        directories.finished(Path(result['path']))
+                        yield result
+        finally:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=True)
+            for job in awaiting_sync:
+                self._release_job(job)
+            directories.close()
+
+    def _engine_options(self) -> dict:
+        """Constructor options needed to rebuild this engine in a worker process"""
+        return {
+            'random_source': self.random_source,
+            'block_size': self.block_size,
+            'direct_io': self.direct_io,
+            'drop_cache': self.drop_cache,
+            'calibrate': self.calibrate,
+            'sync_policy': self.sync_policy,
+            'sparse_aware': self.sparse_aware,
+            'range_workers': self.range_workers,
+            'parallel_min_size': self.parallel_min_size,
+            'journal': str(self.journal.path) if self.journal else None,
+            'checkpoint_interval': self.checkpoint_interval,
+            'rename_count': self.rename_count,
+            'preserve_name_length': self.preserve_name_length,
+            'sync_directories': self.sync_directories,
+            'scrub_directories': self.scrub_directories,
+            'verify_mode': self.verify_mode,
+            'verify_samples': self.verify_samples,
+            'fingerprint': self.fingerprint,
+            'methods': self.methods,
+            # Workers collect into their results; this engine's sink exports them
+            'metrics': NullSink() if self.metrics is not None else None,
+            'small_file_size': self.small_file_size,
+            'io_backend': self.io_backend,
+            'mmap_window': self.mmap_window,
+        }
+    
+    def _directory_batch(self) -> DirectoryBatch:
+        """Shared directory handles for one shred_file/shred_many call"""
+        return DirectoryBatch(sync=self.sync_directories, scrub=self.scrub_directories)
+
+    def _shred_job(self, job: _ShredJob, method: str, verify: Union[bool, str]) -> dict:
+        """Run the full shred sequence for one job"""
+        error = self._begin_job(job, method, verify)
+        if error:
+            return error
+        if self.sync_policy == 'batched':
+            # A lone file is a batch of one
+            self._sync(job)
+        return self._complete_job(job, verify)
+
+    def _begin_job(self, job: _ShredJob, method: str,
+                   verify: Union[bool, str] = False) -> Optional[dict]:
+        """
+        Open the file once and run every overwrite pass
+
+        Returns:
+            None on success (the job keeps its descriptor open), else an error result
+        """
+        job.start_time = time.time()
+        job.method = method
+        if self.metrics is not None:
+            job.metrics = JobMetrics()
+        
+        entry = None
+        if self.journal:
+            entry = self.journal.lookup(job.key)
+            if entry is None:
+                # Given by the rename target an interrupted run left it under
+                entry = self.journal.locate(str(job.path))
+                if entry is not None:
+                    job.key = entry.path
+            elif self._replaced(job.path, entry):
+                # A new file took the original name: the interrupted one is its own job
+                job.leftover = self._shred_leftover(job, entry, verify)
+                entry = None
+        if entry:
+            job.location = entry.current_path()
+        
+        try:
+            with self._timed(job, 'open'):
+                job.target = OverwriteTarget(job.location, direct=self.direct_io,
+                                             drop_cache=self.drop_cache)
+            if self.progress:
+                self.progress.job_started(job)
+        except FileNotFoundError:
+            return self._error_result(job, 'File not found')
+        except Exception as e:
+            return self._error_result(job, e)
         
         try:
             # Get file info before shredding
-            original_size = file_path.stat().st_size
-            original_name = file_path.name
+            st = os.fstat(job.target.fd)
+            job.original_size = st.st_size
+            if self.journal:
+                job.resume = self._resume_entry(job, entry, st)
+                if job.resume:
+                    job.original_size = job.resume.size
             
             # Step 1: Overwrite file content
-            passes = self._get_passes_for_method(method)
-            self._overwrite_file_content(file_path, passes)
+            job.plan = self.methods.get(method)
+            job.passes = job.plan.patterns
+            if None in job.passes:
+                job.random_source = create_random_source(self._random_source_for(method))
+            mode = self._verify_mode_for(verify)
+            if mode != 'none' and job.passes:
+                job.verifier = PassVerifier(mode, job.passes[-1], self.pattern_cache,
+                                            self.verify_samples)
+            if self.fingerprint:
+                job.fingerprint = Fingerprint()
+            self._overwrite_file_content(job.path, job.passes, job)
+            return None
+            
+        except Exception as e:
+            return self._error_result(job, e)
+
+    def _complete_job(self, job: _ShredJob, verify: Union[bool, str]) -> dict:
+        """Verify, rename, truncate and unlink a fully overwritten file"""
+        try:
+            # Read back the final pass while the data is still there
+            with self._timed(job, 'verify'):
+                overwrite_check = job.verifier.check(job.target.fd) if job.verifier else None
+            fingerprint = job.fingerprint.finish(job.original_size) if job.fingerprint else None
             
             # Step 2: Rename file multiple times (obfuscate filename)
-            final_path = self._obfuscate_filename(file_path)
+            if os.name == 'nt':
+                # Windows cannot rename a file that is still open
+                job.target.close()
+            with self._timed(job, 'rename'):
+                if job.small:
+                    names = None
+                elif job.resume and job.resume.stage != OVERWRITING:
+                    names = job.resume.remaining_renames()
+                else:
+                    names = self.obfuscator.plan(job.location, job.directory)
+                    if self.journal:
+                        self.journal.renames(job.key, names)
+                final_path = self._obfuscate_filename(job.location, names, job.directory)
+            if os.name == 'nt':
+                job.target = OverwriteTarget(final_path, drop_cache=self.drop_cache)
             
             # Step 3: Truncate file to 0 bytes
-            self._truncate_file(final_path)
+            with self._timed(job, 'truncate'):
+                # Small-file units flush truncations with one syncfs at the end
+                self._truncate_file(job.target, sync=not job.small)
+                job.target.close()
+                if self.journal:
+                    self.journal.truncated(job.key)
             
             # Step 4: Delete file
-            final_path.unlink()
+            with self._timed(job, 'unlink'):
+                if job.directory:
+                    job.directory.unlink(final_path.name)
+                    job.directory.removed(os.path.basename(job.key))
+                else:
+                    final_path.unlink()
+                if self.journal:
+                    self.journal.unlinked(job.key)
             
             # Step 5: Verify deletion (optional)
             verification = None
-            if verify:
-                verification = self._verify_deletion(final_path, original_size)
+            if self._verify_mode_for(verify) != 'none':
+                with self._timed(job, 'verify'):
+                    verification = self._verify_deletion(final_path, job.original_size,
+                                                         overwrite_check)
             
-            elapsed = time.time() - start_time
+            elapsed = time.time() - job.start_time
             
-            return {
+            return self._finish_metrics(job, {
                 'success': True,
-                'file': original_name,
-                'size': original_size,
-                'method': method,
-                'passes': len(passes),
+                'file': job.path.name,
+                'path': str(job.path),
+                'size': job.original_size,
+                'method': job.method,
+                'passes': len(job.passes),
+                'logical_bytes': job.original_size,
+                'allocated_bytes': job.allocated_bytes,
+                'bytes_written': job.processed_bytes,
                 'time': elapsed,
-                'verified': verification
-            }
+                'verified': verification,
+                'verification': overwrite_check,
+                'pass_checks': job.pass_checks,
+                'fingerprint': fingerprint,
+                'random': job.random_source.stats() if job.random_source else None,
+                'io_backend': job.backend,
+                'sync_policy': self.sync_policy,
+                'durability': SYNC_POLICIES[self.sync_policy]
+            })
             
-        except PermissionError:
-            return {
-                'success': False,
-                'error': 'Permission denied',
-                'file': str(file_path)
-            }
         except Exception as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'file': str(file_path)
-            }
+            return self._error_result(job, e)
+        finally:
+            self._release_job(job)
+
+    def _release_job(self, job: _ShredJob):
+        """Close the job's descriptor and stop tracking its progress"""
+        job.close()
+        if self.progress and not job.released:
+            self.progress.job_finished(job)
+        job.released = True
+
+    def _error_result(self, job: _ShredJob, error) -> dict:
+        """Release the job's resources and build a failure result"""
+        self._release_job(job)
+        cancelled = isinstance(error, ShredCancelled)
+        if isinstance(error, PermissionError):
+            error = 'Permission denied'
+        result = {
+            'success': False,
+            'error': str(error),
+            'file': str(job.path),
+            'path': str(job.path)
+        }
+        if cancelled:
+            result['cancelled'] = True
+        return self._finish_metrics(job, result)
+    
+    def _finish_metrics(self, job: _ShredJob, result: dict) -> dict:
+        """Attach the job's metrics record (and any leftover's result) to its result"""
+        if job.leftover is not None:
+            result['leftover'] = job.leftover
+        if job.metrics is None:
+            return result
+        if job.fingerprint:
+            job.metrics.phases['fingerprint'] = job.fingerprint.seconds
+        record = job.metrics.record(path=str(job.path), method=job.method,
+                                    success=result['success'],
+                                    bytes_written=job.processed_bytes,
+                                    seconds=time.time() - job.start_time)
+        job.metrics = None
+        result['metrics'] = record
+        self._export_metrics(record, result)
+        return result
+
+    def _export_metrics(self, record: dict, result: dict):
+        """Hand a record to the sink; a failing sink never changes the job's outcome"""
+        try:
+            self.metrics.job_finished(record)
+        except Exception as e:
+            result['metrics_error'] = str(e)
+    
+    def _timed(self, job: _ShredJob, phase: str):
+        """Context manager timing a phase of the job (no-op without metrics)"""
+        return job.metrics.timed(phase) if job.metrics else _NO_TIMER
+    
+    def _sync(self, job: _ShredJob):
+        """Flush the job's file to the device"""
+        with self._timed(job, 'sync'):
+            job.target.sync()
+    
+    @staticmethod
+    def _replaced(path: Path, entry: JournalEntry) -> bool:
+        """True if the entry's file was renamed away and another file now has its name"""
+        if entry.current_path() == Path(entry.path):
+            return False
+        try:
+            return not entry.matches(os.lstat(path))
+        except OSError:
+            return False
+
+    def _shred_leftover(self, job: _ShredJob, entry: JournalEntry,
+                        verify: Union[bool, str]) -> dict:
+        """Finish an interrupted file under its rename target, with its journalled method"""
+        leftover = _ShredJob(entry.current_path(), job.on_advance)
+        leftover.key = entry.path
+        leftover.directory = job.directory
+        leftover.cancel = job.cancel
+        return self._shred_job(leftover, entry.method, verify)
+
+    def _resume_entry(self, job: _ShredJob, entry: Optional[JournalEntry],
+                      st: os.stat_result) -> Optional[JournalEntry]:
+        """Journal entry to resume the job from, or None after recording a fresh start"""
+        if entry is not None and entry.matches(st):
+            # Past the overwrite, the method no longer matters
+            if entry.stage != OVERWRITING or entry.method == job.method:
+                return entry
+        self.journal.queued(job.key, job.method, st)
+        return None
+    
+    def _checkpoint(self, job: _ShredJob, passes_done: int, offset: int = 0,
+                    synced: bool = False):
+        """Flush what has been written, then record it in the journal"""
+        if not synced:
+            self._sync(job)
+        self.journal.checkpoint(job.key, passes_done, offset)
+    
+    def _verify_mode_for(self, verify: Union[bool, str]) -> str:
+        """Read-back mode for a shred call's verify argument"""
+        if isinstance(verify, str):
+            if verify not in VERIFY_MODES:
+                raise ValueError(f"Unknown verify mode: {verify}")
+            return verify
+        return self.verify_mode if verify else 'none'
+    
+    def _random_source_for(self, method: str) -> str:
+        """Get the random source name configured for a method"""
+        if isinstance(self.random_source, dict):
+            return self.random_source.get(method, 'urandom')
+        return self.random_source
     
     def _get_passes_for_method(self, method: str) -> list:
-        """Get overwrite patterns for specified method"""
-        if method == 'dod':
-            # DoD 5220.22-M (3 passes)
-            return [
-                b'\x00',      # Pass 1: All zeros
-                b'\xFF',      # Pass 2: All ones
-                None          # Pass 3: Random
-            ]
-        elif method == 'gutmann':
-            # Gutmann 35-pass
-            return self.GUTMANN_PATTERNS
-        elif method == 'random_7':
-            # 7 random passes
-            return [None] * 7
-        elif method == 'simple':
-            # Simple 1-pass random
-            return [None]
-        else:
-            return [None]
-    
-    def _overwrite_file_content(self, file_path: Path, passes: list):
+        """Get overwrite patterns for specified method (ValueError if unknown)"""
+        return self.methods.get(method).patterns
+    
+    def estimate(self, file_path: str, method: str = 'dod') -> dict:
+        """
+        Estimate what shredding a file would cost, without touching it
+        
+        Bytes come from the method's pass plan and the file's data size;
+        time from the device's calibrated write throughput (a short probe
+        write next to the file the first time a device is seen, if
+        calibration is enabled).
+        
+        Returns:
+            dict with method, passes, bytes_written, bytes_read, seconds
+            (None if the throughput is unknown), data_bytes and write_rate
+        """
+        path = Path(file_path)
+        st = os.stat(path)
+        plan = self.methods.get(method)
+        
+        data_bytes = st.st_size
+        allocated = allocated_bytes(st)
+        if self.sparse_aware and allocated is not None:
+            data_bytes = min(data_bytes, allocated)
+        rate = self.calibrator.throughput(path.parent, st) if self.calibrate else None
+        
+        estimate = plan.estimate(data_bytes, rate)
+        estimate.update(path=str(path), logical_bytes=st.st_size, data_bytes=data_bytes,
+                        write_rate=rate)
+        return estimate
+    
+    def _overwrite_file_content(self, file_path: Path, passes: list, job: _ShredJob):
         """Overwrite file content with specified patterns"""
-        file_size = file_path.stat().st_size
-        self.total_bytes = file_size * len(passes)
-        self.processed_bytes = 0
+        target = job.target
+        st = os.fstat(target.fd)
+        file_size = st.st_size
         
-        # Buffer size: 64KB for efficiency
-        buffer_size = 64 * 1024
+        # Only data regions are overwritten; writing holes would allocate them
+        job.allocated_bytes = allocated_bytes(st)
+        with self._timed(job, 'open'):
+            if self.sparse_aware:
+                job.extents = data_extents(target.fd, file_size)
+            else:
+                job.extents = [Extent(0, file_size)] if file_size else []
         
-        for pass_num, pattern in enumerate(passes, 1):
-            with open(file_path, 'r+b') as f:
-                f.seek(0)
-                remaining = file_size
-                
-                while remaining > 0:
-                    chunk_size = min(buffer_size, remaining)
-                    
-                    # Generate data for this chunk
-                    if pattern is None:
-                        # Random data
-                        data = secrets.token_bytes(chunk_size)
-                    elif len(pattern) == 1:
-                        # Single byte pattern
-                        data = pattern * chunk_size
+        data_bytes = sum(extent.length for extent in job.extents)
+        parallel = self.range_workers > 1 and data_bytes >= self.parallel_min_size
+        
+        # Resume after the last journal checkpoint
+        first_pass, first_offset = 0, 0
+        if job.resume and job.resume.stage != OVERWRITING:
+            first_pass = len(passes)
+        elif job.resume:
+            first_pass = job.resume.passes_done
+            # Parallel ranges finish out of order, so they resume per pass
+            first_offset = 0 if parallel else job.resume.offset
+        
+        skipped = sum(max(0, min(extent.offset + extent.length, first_offset) - extent.offset)
+                      for extent in job.extents)
+        job.total_bytes = max(0, data_bytes * (len(passes) - first_pass) - skipped)
+        job.processed_bytes = 0
+        if job.verifier:
+            job.verifier.plan(job.extents)
+        if first_pass or first_offset:
+            # The original content is already gone
+            job.fingerprint = None
+        if first_pass >= len(passes):
+            return
+        
+        buffer_size = self.block_size or self.calibrator.block_size_for(
+            file_path, st, calibrate=self.calibrate
+        )
+        
+        job.plan.prepare(self.pattern_cache, buffer_size)
+        # Mapped writes would go through the page cache O_DIRECT was asked to skip
+        if not target.direct:
+            job.backend = self._backend_for(file_path, st)
+        
+        if parallel:
+            if job.fingerprint:
+                # Ranges finish out of order, so hash in a separate sweep first
+                for extent in job.extents:
+                    for offset in range(extent.offset, extent.offset + extent.length, buffer_size):
+                        job.fingerprint.read(target.fd, offset,
+                                             min(buffer_size, extent.offset + extent.length - offset))
+            self._overwrite_ranges_parallel(job, passes, buffer_size, first_pass)
+            return
+        
+        # Scratch buffer for random data and complement read-modify-write
+        needs_buffer = any(pattern is None or pattern is COMPLEMENT for pattern in passes)
+        random_buffer = memoryview(allocate_buffer(buffer_size)) if needs_buffer else None
+        interval = self.checkpoint_interval if self.journal else 0
+        
+        for pass_index in range(first_pass, len(passes)):
+            self._check_cancelled(job)
+            pattern = passes[pass_index]
+            pass_verifier = self._pass_verifier(job, pass_index)
+            observe = self._observer_for(job, pass_index, pass_verifier)
+            fingerprint = job.fingerprint if pass_index == 0 else None
+            if job.metrics:
+                job.metrics.start_pass(pass_index, pattern)
+            for extent in job.extents:
+                offset = max(extent.offset, first_offset)
+                end = extent.offset + extent.length
+                while offset < end:
+                    stop = min(end, offset + interval) if interval else end
+                    if job.backend == 'mmap' and isinstance(pattern, bytes):
+                        self._map_range(job, pattern, offset, stop, buffer_size,
+                                        job.advance, fingerprint)
                     else:
-                        # Multi-byte pattern
-                        data = (pattern * (chunk_size // len(pattern) + 1))[:chunk_size]
-                    
-                    # Write data
-                    f.write(data)
-                    remaining -= chunk_size
-                    self.processed_bytes += chunk_size
-                    
-                    # Update progress
-                    if self.progress_callback:
-                        progress = int((self.processed_bytes / self.total_bytes) * 100)
-                        self.progress_callback(progress)
+                        self._write_range(job, pattern, offset, stop, buffer_size,
+                                          random_buffer, job.random_source, job.advance,
+                                          observe, fingerprint)
+                    offset = stop
+                    if interval and offset < end:
+                        self._checkpoint(job, pass_index, offset)
+            first_offset = 0
+            
+            # Flush to disk
+            if self.sync_policy == 'per_pass':
+                self._sync(job)
+            if pass_verifier:
+                self._verify_pass(job, pass_index, pass_verifier)
+            if job.metrics:
+                job.metrics.end_pass()
+            if self.journal:
+                self._checkpoint(job, pass_index + 1, synced=self.sync_policy == 'per_pass')
+        
+        if self.sync_policy == 'final':
+            self._sync(job)
+    
+    def _shred_small_files(self, items: list, directory: Optional[DirectoryHandle],
+                           method: str, verify: Union[bool, str],
+                           on_advance: Optional[Callable] = None) -> List[dict]:
+        """
+        Shred one directory's small files as a unit
+        
+        Each file is opened once (relative to the directory) and fstat'ed
+        through that descriptor, on top of the stat shred_many took to pick
+        its unit. Passes run across the whole unit: pattern passes come
+        from one cached buffer, random passes from a single fill shared by
+        every file (each result reports its share of the generation cost), and the unit is flushed with one syncfs per pass (or one in
+        total under the 'final' and 'batched' policies) instead of one
+        fdatasync per file. Renames skip the existence probes and
+        truncations are flushed by a last syncfs once every file is gone.
+        
+        Args:
+            items: (path, stat result) pairs, all in the same directory
+            directory: Shared handle for that directory
+            
+        Returns:
+            One shred_file() result per file
+        """
+        plan = self.methods.get(method)
+        passes = plan.patterns
+        mode = self._verify_mode_for(verify)
+        dir_fd = directory.fd if directory is not None else None
+        results = []
+        jobs = []
+        
+        for path, _st in items:
+            job = _ShredJob(Path(path), on_advance)
+            job.small = True
+            job.directory = directory
+            job.start_time = time.time()
+            job.method = method
+            job.plan = plan
+            job.passes = passes
+            if self.metrics is not None:
+                job.metrics = JobMetrics()
+            try:
+                with self._timed(job, 'open'):
+                    name = job.path.name if dir_fd is not None else job.path
+                    job.target = OverwriteTarget(name, drop_cache=self.drop_cache, dir_fd=dir_fd)
+                    st = os.fstat(job.target.fd)
+                    job.original_size = st.st_size
+                    job.allocated_bytes = allocated_bytes(st)
+                    if (self.sparse_aware and job.allocated_bytes is not None
+                            and job.allocated_bytes < st.st_size):
+                        job.extents = data_extents(job.target.fd, st.st_size)
+                    else:
+                        job.extents = [Extent(0, st.st_size)] if st.st_size else []
+                if self.progress:
+                    self.progress.job_started(job)
+            except FileNotFoundError:
+                results.append(self._error_result(job, 'File not found'))
+                continue
+            except Exception as e:
+                results.append(self._error_result(job, e))
+                continue
+            
+            job.total_bytes = sum(extent.length for extent in job.extents) * len(passes)
+            if mode != 'none' and passes:
+                job.verifier = PassVerifier(mode, passes[-1], self.pattern_cache,
+                                            self.verify_samples)
+                job.verifier.plan(job.extents)
+            if self.fingerprint:
+                job.fingerprint = Fingerprint()
+            jobs.append(job)
+        
+        if not jobs:
+            return results
+        
+        buffer_size = min(self.small_file_size, SMALL_UNIT_BUFFER)
+        plan.prepare(self.pattern_cache, buffer_size)
+        unit_bytes = min(sum(extent.length for job in jobs for extent in job.extents),
+                         SMALL_UNIT_BUFFER)
+        scratch = memoryview(allocate_buffer(buffer_size))
+        unit_source = random_source = None
+        if None in passes:
+            random_source = create_random_source(self._random_source_for(method))
+            unit_source = _UnitSource(random_source, unit_bytes)
+        
+        try:
+            for pass_index, pattern in enumerate(passes):
+                if pattern is None:
+                    unit_source.refill(unit_bytes)
+                verifiers = {}
+                live = []
+                for job in jobs:
+                    try:
+                        verifiers[job] = self._pass_verifier(job, pass_index)
+                        observe = self._observer_for(job, pass_index, verifiers[job])
+                        fingerprint = job.fingerprint if pass_index == 0 else None
+                        if job.metrics:
+                            job.metrics.start_pass(pass_index, pattern)
+                        for extent in job.extents:
+                            self._write_range(job, pattern, extent.offset,
+                                              extent.offset + extent.length, buffer_size,
+                                              scratch, unit_source, job.advance, observe,
+                                              fingerprint)
+                        live.append(job)
+                    except Exception as e:
+                        results.append(self._error_result(job, e))
+                jobs = live
+                if not jobs:
+                    break
                 
-                # Flush to disk
-                f.flush()
-                os.fsync(f.fileno())
+                if (self.sync_policy == 'per_pass' or pass_index == len(passes) - 1
+                        or any(verifiers.values())):
+                    self._sync_unit(jobs)
+                live = []
+                for job in jobs:
+                    try:
+                        if verifiers[job]:
+                            self._verify_pass(job, pass_index, verifiers[job], synced=True)
+                        if job.metrics:
+                            job.metrics.end_pass()
+                        live.append(job)
+                    except Exception as e:
+                        results.append(self._error_result(job, e))
+                jobs = live
+            
+            random_passes = sum(1 for pattern in passes if pattern is None)
+            for job in jobs:
+                if random_source:
+                    job.random_source = _RandomShare(
+                        random_source,
+                        sum(extent.length for extent in job.extents) * random_passes)
+                results.append(self._complete_job(job, verify))
+        finally:
+            for job in jobs:
+                self._release_job(job)
+            if random_source:
+                random_source.close()
+        
+        # Truncations and unlinks of the whole unit
+        if self.sync_policy != 'batched' and any(result['success'] for result in results):
+            self._sync_directory_fs(directory, Path(items[0][0]).parent)
+        
+        return results
     
-    def _obfuscate_filename(self, file_path: Path) -> Path:
-        """Rename file multiple times to obfuscate original name"""
-        current_path = file_path
+    def _sync_unit(self, jobs: List[_ShredJob]):
+        """Flush a small-file unit with one syncfs, splitting its cost across the jobs"""
+        started = time.perf_counter()
+        syncfs(jobs[0].target.fd)
+        share = (time.perf_counter() - started) / len(jobs)
+        for job in jobs:
+            job.target.drop_cached_pages()
+            if job.metrics:
+                job.metrics.add('sync', share)
+    
+    def _sync_directory_fs(self, directory: Optional[DirectoryHandle], path: Path):
+        """syncfs the filesystem holding a directory"""
+        try:
+            if directory is not None and directory.fd is not None:
+                syncfs(directory.fd)
+                return
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                syncfs(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+    
+    def _check_cancelled(self, job: _ShredJob):
+        """Stop between passes if the job was cancelled"""
+        if job.cancel is not None and job.cancel.is_set():
+            raise ShredCancelled('Cancelled at a pass boundary')
+    
+    def _pass_verifier(self, job: _ShredJob, pass_index: int) -> Optional[PassVerifier]:
+        """Verifier for a verify-after pass of the job's method"""
+        mode = job.plan.verify_after.get(pass_index)
+        if not mode:
+            return None
+        verifier = PassVerifier(mode, job.passes[pass_index], self.pattern_cache,
+                                self.verify_samples)
+        verifier.plan(job.extents)
+        return verifier
+    
+    def _verify_pass(self, job: _ShredJob, pass_index: int, verifier: PassVerifier,
+                     synced: bool = False):
+        """Read back a verify-after pass; a mismatch fails the job before deletion"""
+        if not synced and self.sync_policy != 'per_pass':
+            self._sync(job)
+        with self._timed(job, 'verify'):
+            check = verifier.check(job.target.fd)
+        check['pass'] = pass_index + 1
+        job.pass_checks.append(check)
+        if check['ok'] is False:
+            raise OSError(f"Pass {pass_index + 1} read-back mismatch "
+                          f"({check['mismatches']} of {check['blocks']} blocks)")
+    
+    def _observer_for(self, job: _ShredJob, pass_index: int,
+                      pass_verifier: Optional[PassVerifier] = None) -> Optional[Callable]:
+        """Capture hook for passes whose data must be remembered for read-back"""
+        hooks = []
+        if job.verifier and job.verifier.needs_capture and pass_index == len(job.passes) - 1:
+            hooks.append(job.verifier.observe)
+        if pass_verifier and pass_verifier.needs_capture:
+            hooks.append(pass_verifier.observe)
+        if len(hooks) < 2:
+            return hooks[0] if hooks else None
+        
+        def observe(data, offset):
+            for hook in hooks:
+                hook(data, offset)
+        return observe
+    
+    def _write_range(self, job: _ShredJob, pattern: Optional[bytes], offset: int, end: int,
+                     buffer_size: int, random_buffer: Optional[memoryview],
+                     random_source: Optional[RandomSource], advance: Callable,
+                     observe: Optional[Callable] = None,
+                     fingerprint: Optional[Fingerprint] = None):
+        """Write one pass over [offset, end)"""
+        target = job.target
+        metrics = job.metrics
+        if metrics:
+            clock = time.perf_counter
+            start, generate, writing = offset, 0.0, 0.0
+            latency = Histogram(LATENCY_BUCKETS)
         
-        # Rename 10 times with random names
-        for _ in range(10):
-            # Generate random filename (same length as original)
-            random_name = secrets.token_hex(8) + current_path.suffix
-            new_path = current_path.parent / random_name
+        while offset < end:
+            chunk_size = min(buffer_size, end - offset)
+            if metrics:
+                started = clock()
+            
+            # Get data for this chunk
+            if pattern is None:
+                # Random data, generated in place
+                data = random_buffer[:chunk_size]
+                random_source.fill(data)
+            elif pattern is COMPLEMENT:
+                # Invert what the file holds now
+                data = random_buffer[:chunk_size]
+                pread_into(target.fd, data, offset)
+                data[:] = data.tobytes().translate(INVERT)
+            else:
+                # Cached pattern buffer, phase-aligned to this offset
+                data = self.pattern_cache.get(pattern, buffer_size, offset)[:chunk_size]
             
-            current_path.rename(new_path)
-            current_path = new_path
+            if metrics:
+                # Random/complement data; pattern slices cost next to nothing
+                generate += clock() - started
+            
+            # Hash the original content just before it is overwritten
+            # (timed by the Fingerprint itself)
+            if fingerprint:
+                fingerprint.read(target.fd, offset, chunk_size)
+            
+            # Write data
+            if metrics:
+                started = clock()
+                target.write_at(data, offset)
+                elapsed = clock() - started
+                writing += elapsed
+                latency.observe(elapsed)
+            else:
+                target.write_at(data, offset)
+            if observe:
+                observe(data, offset)
+            offset += chunk_size
+            advance(chunk_size)
+        
+        if metrics:
+            metrics.merge_range(generate, writing, offset - start, latency)
+    
+    def _map_range(self, job: _ShredJob, pattern: bytes, offset: int, end: int,
+                   buffer_size: int, advance: Callable,
+                   fingerprint: Optional[Fingerprint] = None):
+        """
+        Write one pattern pass over [offset, end) through mmap windows
+        
+        Under the per_pass policy each window is msync'ed before the next one
+        is mapped; otherwise the pass's (or job's) later sync flushes it.
+        Files that can't be mapped fall back to write().
+        """
+        target = job.target
+        metrics = job.metrics
+        if metrics:
+            clock = time.perf_counter
+            start, writing = offset, 0.0
+            latency = Histogram(LATENCY_BUCKETS)
+        flush = self.sync_policy == 'per_pass'
         
-        return current_path
+        while offset < end:
+            stop = min(end, offset + self.mmap_window)
+            if fingerprint:
+                fingerprint.read(target.fd, offset, stop - offset)
+            try:
+                if metrics:
+                    started = clock()
+                    fill_mapped(target.fd, pattern, offset, stop, flush)
+                    elapsed = clock() - started
+                    writing += elapsed
+                    latency.observe(elapsed)
+                else:
+                    fill_mapped(target.fd, pattern, offset, stop, flush)
+            except (OSError, ValueError):
+                # Not mappable (some FUSE and network filesystems)
+                job.backend = 'write'
+                self._write_range(job, pattern, offset, stop, buffer_size, None, None,
+                                  advance)
+                if stop < end:
+                    self._write_range(job, pattern, stop, end, buffer_size, None, None,
+                                      advance, None, fingerprint)
+                break
+            advance(stop - offset)
+            offset = stop
+        
+        if metrics:
+            metrics.merge_range(0.0, writing, offset - start, latency)
+    
+    def _backend_for(self, path: Path, st: os.stat_result) -> str:
+        """I/O backend configured for the device holding a file"""
+        if not isinstance(self.io_backend, dict):
+            return self.io_backend
+        info = self.devices.info(path, st)
+        for key in (st.st_dev, info.mount_point, info.kind):
+            if key in self.io_backend:
+                return self.io_backend[key]
+        return 'write'
     
-    def _truncate_file(self, file_path: Path):
+    def _overwrite_ranges_parallel(self, job: _ShredJob, passes: list, buffer_size: int,
+                                   first_pass: int = 0):
+        """
+        Overwrite one large file with several threads writing disjoint ranges
+        
+        Every pass ends with a barrier: all ranges must finish (and, under the
+        per_pass policy, be flushed) before any range of the next pass starts.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        ranges = _split_ranges(job.extents, self.range_workers, buffer_size)
+        workers = min(self.range_workers, len(ranges))
+        lock = threading.Lock()
+        
+        def advance(nbytes):
+            with lock:
+                job.advance(nbytes)
+        
+        # Each worker thread gets its own random buffer and source
+        local = threading.local()
+        worker_sources = []
+        
+        def write(pattern, offset, end, observe):
+            if (pattern is None or pattern is COMPLEMENT) and not hasattr(local, 'buffer'):
+                local.buffer = memoryview(allocate_buffer(buffer_size))
+            if pattern is None and not hasattr(local, 'source'):
+                local.source = create_random_source(job.random_source.name)
+                with lock:
+                    worker_sources.append(local.source)
+            if job.backend == 'mmap' and isinstance(pattern, bytes):
+                self._map_range(job, pattern, offset, end, buffer_size, advance)
+                return
+            self._write_range(job, pattern, offset, end, buffer_size,
+                              getattr(local, 'buffer', None), getattr(local, 'source', None),
+                              advance, observe)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for pass_index in range(first_pass, len(passes)):
+                    self._check_cancelled(job)
+                    pattern = passes[pass_index]
+                    pass_verifier = self._pass_verifier(job, pass_index)
+                    observe = self._observer_for(job, pass_index, pass_verifier)
+                    if job.metrics:
+                        job.metrics.start_pass(pass_index, pattern)
+                    futures = [executor.submit(write, pattern, offset, end, observe)
+                               for offset, end in ranges]
+                    # Barrier: re-raises the first worker error
+                    for future in futures:
+                        future.result()
+                    
+                    if self.sync_policy == 'per_pass':
+                        self._sync(job)
+                    if pass_verifier:
+                        self._verify_pass(job, pass_index, pass_verifier)
+                    if job.metrics:
+                        job.metrics.end_pass()
+                    if self.journal:
+                        self._checkpoint(job, pass_index + 1,
+                                         synced=self.sync_policy == 'per_pass')
+            
+            if self.sync_policy == 'final':
+                self._sync(job)
+        finally:
+            for source in worker_sources:
+                job.random_source.merge_stats(source)
+                source.close()
+    
+    def _obfuscate_filename(self, file_path: Path, names: Optional[List[str]] = None,
+                            directory: Optional[DirectoryHandle] = None) -> Path:
+        """Rename file multiple times to obfuscate original name"""
+        if names is None:
+            return self.obfuscator.rename_random(file_path, directory)
+        return self.obfuscator.rename_chain(file_path, names, directory)
+    
+    def _truncate_file(self, target: OverwriteTarget, sync: bool = True):
         """Truncate file to 0 bytes"""
-        with open(file_path, 'wb') as f:
-            f.truncate(0)
-            f.flush()
-            os.fsync(f.fileno())
+        os.ftruncate(target.fd, 0)
+        if sync and self.sync_policy != 'batched':
+            os.fsync(target.fd)
     
-    def _verify_deletion(self, file_path: Path, original_size: int) -> dict:
+    def _verify_deletion(self, file_path: Path, original_size: int,
+                         overwrite_check: Optional[dict] = None) -> dict:
         """Verify file cannot be recovered"""
+        exists = file_path.exists()
+        overwritten = overwrite_check['ok'] if overwrite_check else None
         return {
-            'file_exists': file_path.exists(),
+            'file_exists': exists,
             'original_size': original_size,
-            'recoverable': False  # After our process, file is not recoverable
+            # None when the final pass was not (or could not be) read back
+            'overwrite_verified': overwritten,
+            'recoverable': exists or overwritten is False
         }
     
     def get_file_hash(self, file_path: str) -> str:
         """Calculate SHA256 hash of file (for logging)"""
+        import hashlib
+        
         sha256 = hashlib.sha256()
         
         with open(file_path, 'rb') as f:
@@ -219,62 +1399,153 @@ class ShredderEngine:
 class FreeSpaceShredder:
     """Shred free space on disk to prevent recovery of previously deleted files"""
     
-    def __init__(self, progress_callback: Optional[Callable] = None):
+    # Prefix shared by every temporary file we create (fill files, state, calibration)
+    TEMP_PREFIX = '__shredder_temp_'
+    STATE_FILE = '__shredder_temp_state.json'
+    
+    # Single-purpose free-space methods; any ShredderEngine method also works
+    METHODS = {
+        'zero': [b'\x00'],
+        'ones': [b'\xff'],
+        'random': [None],
+    }
+    
+    # Leave 100MB free for safety
+    SAFETY_MARGIN = 100 * 1024 * 1024
+    
+    def __init__(self, progress_callback: Optional[Callable] = None,
+                 random_source: str = 'urandom', block_size: Optional[int] = None,
+                 direct_io: bool = False, drop_cache: bool = True,
+                 workers: int = 1, preallocate: bool = True,
+                 methods: Optional[MethodRegistry] = None):
+        """
+        Initialize free space shredder
+        
+        Args:
+            progress_callback: Function to call with progress updates (0-100)
+            random_source: Random source for random passes ('urandom' or 'stream')
+            block_size: Write size in bytes (None = calibrate per device)
+            direct_io: Write with O_DIRECT where the filesystem supports it
+            drop_cache: Evict written pages from the page cache after each pass
+            workers: Number of fill files written in parallel
+            preallocate: Reserve each fill file with fallocate before writing it
+            methods: Registry for engine methods (default: the built-in methods)
+        """
         self.progress_callback = progress_callback
+        self.random_source = random_source
+        self.block_size = block_size
+        self.direct_io = direct_io
+        self.drop_cache = drop_cache
+        self.workers = max(1, workers)
+        self.preallocate = preallocate
+        self.methods = methods or default_registry
+        self.calibrator = BlockSizeCalibrator()
+        self.pattern_cache = PatternCache()
+    
+    def get_passes(self, method: str) -> list:
+        """Get overwrite patterns for a free-space method"""
+        if method in self.METHODS:
+            return self.METHODS[method]
+        if method not in self.methods:
+            raise ValueError(f"Unknown free-space method: {method}")
+        passes = self.methods.get(method).patterns
+        if COMPLEMENT in passes:
+            # Fill files have no prior content to invert
+            raise ValueError(f"Method {method} can't be used for free space")
+        return passes
     
-    def shred_free_space(self, target_path: str, method: str = 'random') -> dict:
+    def cleanup_stale(self, target_path: str) -> int:
         """
-        Fill free space with random data then delete
+        Delete temporary files left behind by interrupted runs
+        
+        Returns:
+            Number of files removed
+        """
+        removed = 0
+        with os.scandir(target_path) as entries:
+            for entry in entries:
+                if entry.name.startswith(self.TEMP_PREFIX) and entry.is_file(follow_symlinks=False):
+                    try:
+                        os.unlink(entry.path)
+                        removed += 1
+                    except OSError:
+                        pass
+        return removed
+    
+    def shred_free_space(self, target_path: str, method: str = 'random',
+                         resume: bool = False) -> dict:
+        """
+        Fill free space with overwrite passes then delete the fill files
+        
+        Args:
+            target_path: Directory on the filesystem to wipe
+            method: 'zero', 'ones', 'random' or any ShredderEngine method ('dod', 'gutmann', ...)
+            resume: Continue an interrupted run recorded in the target directory
+                instead of cleaning up its leftovers and starting over
         
         WARNING: This can take a long time on large disks
         """
+        import shutil
+
         try:
-            import psutil
-            
             target_path = Path(target_path)
+            passes = self.get_passes(method)
+            state_path = target_path / self.STATE_FILE
             
-            # Get free space
-            disk_usage = psutil.disk_usage(str(target_path))
-            free_bytes = disk_usage.free
-            
-            # Leave 100MB free for safety
-            safety_margin = 100 * 1024 * 1024
-            bytes_to_write = max(0, free_bytes - safety_margin)
+            state = self._load_state(state_path) if resume else None
+            if state is not None and state.get('method') != method:
+                state = None
+            resumed = state is not None
             
-            if bytes_to_write == 0:
-                return {
-                    'success': False,
-                    'error': 'Not enough free space'
-                }
-            
-            # Create temp file
-            temp_file = target_path / f'__shredder_temp_{secrets.token_hex(8)}.tmp'
+            stale_removed = 0
+            if not resumed:
+                # A fresh run: anything left by a crashed run is garbage
+                stale_removed = self.cleanup_stale(target_path)
+                
+                # Free space available to us (excludes root's reserve on Unix)
+                bytes_to_write = max(0, shutil.disk_usage(target_path).free - self.SAFETY_MARGIN)
+                
+                if bytes_to_write == 0:
+                    return {
+                        'success': False,
+                        'error': 'Not enough free space'
+                    }
+                
+                run_id = os.urandom(8).hex()
+                share = -(-bytes_to_write // self.workers)
+                state = {'run': run_id, 'method': method, 'files': {}}
+                for n in range(self.workers):
+                    size = min(share, bytes_to_write - n * share)
+                    if size > 0:
+                        name = f'{self.TEMP_PREFIX}{run_id}_{n}.tmp'
+                        state['files'][name] = {'size': size, 'passes_done': 0}
             
-            # Write random data
-            buffer_size = 1024 * 1024  # 1MB chunks
-            written = 0
+            buffer_size = self.block_size or self.calibrator.device_block_size(
+                target_path, os.stat(target_path)
+            )
             
-            with open(temp_file, 'wb') as f:
-                while written < bytes_to_write:
-                    chunk_size = min(buffer_size, bytes_to_write - written)
-                    data = secrets.token_bytes(chunk_size)
-                    f.write(data)
-                    written += chunk_size
-                    
-                    if self.progress_callback:
-                        progress = int((written / bytes_to_write) * 100)
-                        self.progress_callback(progress)
-                
-                f.flush()
-                os.fsync(f.fileno())
+            run = _FreeSpaceRun(self, target_path, state, state_path, passes, buffer_size)
+            run.save_state()
+            run.execute()
             
-            # Delete temp file
-            temp_file.unlink()
+            # Delete fill files and the state file
+            for name in state['files']:
+                try:
+                    (target_path / name).unlink()
+                except FileNotFoundError:
+                    pass
+            state_path.unlink()
             
             return {
                 'success': True,
-                'bytes_written': written,
-                'method': method
+                'bytes_written': run.written,
+                'bytes_covered': sum(info['size'] for info in state['files'].values()),
+                'method': method,
+                'passes': len(passes),
+                'files': len(state['files']),
+                'resumed': resumed,
+                'stale_removed': stale_removed,
+                'random': run.random_stats()
             }
             
         except Exception as e:
@@ -282,3 +1553,164 @@ class FreeSpaceShredder:
                 'success': False,
                 'error': str(e)
             }
+    
+    def _load_state(self, state_path: Path) -> Optional[dict]:
+        """Read the state file of an interrupted run, if any"""
+        import json
+        
+        try:
+            with open(state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+class _FreeSpaceRun:
+    """One free-space wipe: fill files written in parallel, pass by pass"""
+    
+    def __init__(self, shredder: FreeSpaceShredder, target_path: Path, state: dict,
+                 state_path: Path, passes: list, buffer_size: int):
+        self.shredder = shredder
+        self.target_path = target_path
+        self.state = state
+        self.state_path = state_path
+        self.passes = passes
+        self.buffer_size = buffer_size
+        self.written = 0
+        self.sources: List[RandomSource] = []
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._last_percent = -1
+        self.total = max(1, sum(info['size'] * (len(passes) - info['passes_done'])
+                                for info in state['files'].values()))
+    
+    def execute(self):
+        """Write every fill file on its own worker thread"""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        names = [name for name, info in self.state['files'].items()
+                 if info['passes_done'] < len(self.passes)]
+        if not names:
+            return
+        
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            for future in [executor.submit(self._fill, name) for name in names]:
+                future.result()
+    
+    def save_state(self):
+        """Atomically persist per-file progress so the run can be resumed"""
+        import json
+        
+        tmp_path = self.state_path.with_name(self.state_path.name + '.new')
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps(self.state)
+            try:
+                with open(tmp_path, 'w') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.state_path)
+            except OSError as e:
+                if e.errno != errno.ENOSPC:
+                    raise
+                # No room for the checkpoint: a resume repeats the pass instead
+                tmp_path.unlink(missing_ok=True)
+    
+    def random_stats(self) -> Optional[dict]:
+        """Combined statistics of every worker's random source"""
+        if not self.sources:
+            return None
+        combined = self.sources[0]
+        for source in self.sources[1:]:
+            combined.merge_stats(source)
+        return combined.stats()
+    
+    def _advance(self, nbytes: int):
+        with self._lock:
+            self.written += nbytes
+            percent = min(100, int(self.written * 100 / self.total))
+            if percent == self._last_percent:
+                return
+            self._last_percent = percent
+        if self.shredder.progress_callback:
+            self.shredder.progress_callback(percent)
+    
+    def _fill(self, name: str):
+        """Run the remaining passes over one fill file"""
+        shredder = self.shredder
+        info = self.state['files'][name]
+        path = self.target_path / name
+        
+        source = None
+        random_buffer = None
+        if None in self.passes:
+            source = create_random_source(shredder.random_source)
+            random_buffer = memoryview(allocate_buffer(self.buffer_size))
+            with self._lock:
+                self.sources.append(source)
+        
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o600)
+        os.close(fd)
+        
+        try:
+            with OverwriteTarget(path, direct=shredder.direct_io,
+                                 drop_cache=shredder.drop_cache) as target:
+                if shredder.preallocate and info['passes_done'] == 0:
+                    info['size'] = self._preallocate(target.fd, info['size'])
+                
+                for pass_index in range(info['passes_done'], len(self.passes)):
+                    pattern = self.passes[pass_index]
+                    size = self._write_pass(target, pattern, info['size'],
+                                            random_buffer, source)
+                    
+                    # The first pass may stop early when the disk fills up
+                    with self._lock:
+                        info['size'] = size
+                        info['passes_done'] = pass_index + 1
+                    target.sync()
+                    self.save_state()
+        finally:
+            if source is not None:
+                source.close()
+    
+    def _preallocate(self, fd: int, size: int) -> int:
+        """Reserve space for a fill file, shrinking the request if the disk is short"""
+        # Where fallocate isn't supported the file is written without a
+        # reservation (posix_fallocate would emulate it with an extra pass)
+        while size > self.buffer_size:
+            try:
+                fallocate(fd, 0, size)
+                return size
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    size -= max(self.buffer_size, size // 16)
+                    continue
+                return size
+        return size
+    
+    def _write_pass(self, target: OverwriteTarget, pattern: Optional[bytes], size: int,
+                    random_buffer: Optional[memoryview],
+                    source: Optional[RandomSource]) -> int:
+        """Write one pass over a fill file; returns the bytes actually covered"""
+        offset = 0
+        while offset < size:
+            chunk_size = min(self.buffer_size, size - offset)
+            
+            if pattern is None:
+                data = random_buffer[:chunk_size]
+                source.fill(data)
+            else:
+                data = self.shredder.pattern_cache.get(pattern, self.buffer_size, offset)[:chunk_size]
+            
+            try:
+                target.write_at(data, offset)
+            except OSError as e:
+                if e.errno != errno.ENOSPC:
+                    raise
+                # Disk is full: this is as much free space as we can cover
+                return offset
+            
+            offset += chunk_size
+            self._advance(chunk_size)
+        return size
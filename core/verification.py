@@ -0,0 +1,218 @@
+"""
+Overwrite verification
+Read-back checks of the final pass and an inline fingerprint of the original
+content, each reporting what it cost
+"""
+
+import time
+from bisect import bisect_right
+from random import SystemRandom
+from typing import Dict, List, Tuple
+
+from .io_backend import drop_cache, pread
+from .patterns import PatternCache
+
+# What each verification mode re-reads after the final pass
+VERIFY_MODES = {
+    'none': 'No read-back',
+    'sampled': 'Random blocks of the final pass are re-read from the device and compared',
+    'full': 'The whole final pass is re-read from the device and compared',
+}
+
+# Size of one sampled block (one logical block on common devices)
+SAMPLE_SIZE = 4096
+DEFAULT_SAMPLES = 16
+
+# Read size for full verification and for the fingerprint of holes
+READ_CHUNK = 1024 * 1024
+
+_system_random = SystemRandom()
+
+
+def _digest(data) -> bytes:
+    """Short digest of one chunk written by a random pass (full mode)"""
+    import hashlib
+
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class PassVerifier:
+    """
+    Checks that a pass (normally the final one) really reached the device
+
+    Pattern passes are compared against the pattern itself. Random (and
+    complement) data can't be regenerated, so the expected bytes are captured while the
+    pass is written: the sampled blocks themselves, or (full mode) a short
+    digest of every written chunk. Reads evict the range from the page
+    cache first so they come from the device, not from memory.
+    """
+
+    def __init__(self, mode: str, pattern, pattern_cache: PatternCache,
+                 samples: int = DEFAULT_SAMPLES):
+        if mode not in VERIFY_MODES:
+            raise ValueError(f"Unknown verify mode: {mode}")
+        self.mode = mode
+        self.pattern = pattern
+        self.pattern_cache = pattern_cache
+        self.sample_count = samples
+        # Sampled: sorted (start, end) blocks and the bytes captured for them
+        self._samples: List[Tuple[int, int]] = []
+        self._starts: List[int] = []
+        self._captured: Dict[int, bytearray] = {}
+        # Full: chunk offset -> (length, digest) of the random data written there
+        self._digests: Dict[int, Tuple[int, bytes]] = {}
+        self._extents: list = []
+        self.observed = False
+
+    @property
+    def needs_capture(self) -> bool:
+        """Whether the pass has to be observed as it is written"""
+        return not isinstance(self.pattern, bytes) and self.mode != 'none'
+
+    def plan(self, extents: list):
+        """Pick sample blocks from the file's data extents"""
+        self._extents = list(extents)
+        if self.mode != 'sampled':
+            return
+
+        total = sum(extent.length for extent in extents)
+        if total == 0:
+            return
+
+        blocks = set()
+        for _ in range(min(self.sample_count, -(-total // SAMPLE_SIZE))):
+            position = _system_random.randrange(total)
+            for extent in extents:
+                if position < extent.length:
+                    start = extent.offset + position // SAMPLE_SIZE * SAMPLE_SIZE
+                    start = max(start, extent.offset)
+                    end = min(start + SAMPLE_SIZE, extent.offset + extent.length)
+                    blocks.add((start, end))
+                    break
+                position -= extent.length
+
+        self._samples = sorted(blocks)
+        self._starts = [start for start, _ in self._samples]
+
+    def observe(self, data, offset: int):
+        """Record what the pass wrote at offset (random and complement passes)"""
+        self.observed = True
+        end = offset + len(data)
+
+        if self.mode == 'full':
+            digest = _digest(data)
+            self._digests[offset] = (len(data), digest)
+            return
+
+        # Samples that overlap [offset, end)
+        index = max(0, bisect_right(self._starts, offset) - 1)
+        while index < len(self._samples):
+            start, stop = self._samples[index]
+            if start >= end:
+                break
+            lo, hi = max(start, offset), min(stop, end)
+            if lo < hi:
+                buffer = self._captured.setdefault(start, bytearray(stop - start))
+                buffer[lo - start:hi - start] = data[lo - offset:hi - offset]
+            index += 1
+
+    def check(self, fd: int) -> dict:
+        """
+        Re-read the pass and compare it with what was written
+
+        Returns:
+            dict with mode, ok (None when nothing could be checked), blocks
+            checked, mismatches, bytes_read and seconds spent
+        """
+        start_time = time.perf_counter()
+        checked = mismatches = bytes_read = 0
+
+        if self.mode == 'none':
+            ranges = []
+        elif self.mode == 'sampled':
+            ranges = self._samples
+        elif not isinstance(self.pattern, bytes):
+            ranges = [(offset, offset + length)
+                      for offset, (length, _) in sorted(self._digests.items())]
+        else:
+            ranges = [(offset, min(offset + READ_CHUNK, extent.offset + extent.length))
+                      for extent in self._extents
+                      for offset in range(extent.offset, extent.offset + extent.length,
+                                          READ_CHUNK)]
+
+        for start, end in ranges:
+            if self.needs_capture and not self.observed:
+                # Resumed past the pass: nothing was captured
+                break
+            drop_cache(fd, start, end - start)
+            data = pread(fd, end - start, start)
+            bytes_read += len(data)
+            checked += 1
+            if not self._matches(data, start, end):
+                mismatches += 1
+
+        return {
+            'mode': self.mode,
+            'ok': mismatches == 0 if checked else None,
+            'blocks': checked,
+            'mismatches': mismatches,
+            'bytes_read': bytes_read,
+            'seconds': time.perf_counter() - start_time,
+        }
+
+    def _matches(self, data: bytes, start: int, end: int) -> bool:
+        if len(data) != end - start:
+            return False
+        if isinstance(self.pattern, bytes):
+            size = SAMPLE_SIZE if self.mode == 'sampled' else READ_CHUNK
+            return data == self.pattern_cache.get(self.pattern, size, start)[:end - start]
+        if self.mode == 'full':
+            return _digest(data) == self._digests[start][1]
+        return data == self._captured.get(start)
+
+
+class Fingerprint:
+    """
+    SHA-256 of a file's original content, read just ahead of the first pass
+
+    Same digest as ShredderEngine.get_file_hash, but each block is read
+    right before it is overwritten instead of in a separate sweep. Holes
+    are hashed as zeros without being read.
+    """
+
+    def __init__(self):
+        import hashlib
+
+        self._sha256 = hashlib.sha256()
+        self._position = 0
+        self.bytes_read = 0
+        self.seconds = 0.0
+
+    def read(self, fd: int, offset: int, length: int):
+        """Hash [offset, offset + length) before it is overwritten"""
+        start_time = time.perf_counter()
+        self._skip_to(offset)
+        data = pread(fd, length, offset)
+        self._sha256.update(data)
+        self._position = offset + len(data)
+        self.bytes_read += len(data)
+        self.seconds += time.perf_counter() - start_time
+
+    def _skip_to(self, offset: int):
+        """Hash a hole up to offset as zeros"""
+        zeros = None
+        while self._position < offset:
+            n = min(READ_CHUNK, offset - self._position)
+            if zeros is None or len(zeros) < n:
+                zeros = bytes(n)
+            self._sha256.update(memoryview(zeros)[:n])
+            self._position += n
+
+    def finish(self, size: int) -> dict:
+        """Digest of the whole file (trailing hole included) and its cost"""
+        self._skip_to(size)
+        return {
+            'sha256': self._sha256.hexdigest(),
+            'bytes_read': self.bytes_read,
+            'seconds': self.seconds,
+        }
@@ -0,0 +1,589 @@
+"""
+Watch-folder shredding
+Watches drop directories (inotify, or polling where it isn't available),
+queues files once their writers have closed them and they have stopped
+changing, and shreds them in batches on a ShredderEngine
+"""
+
+import errno
+import fnmatch
+import os
+import select
+import stat
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .shredder_engine import FreeSpaceShredder, ShredderEngine
+
+# linux/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event without its variable-length name
+_EVENT = struct.Struct('iIII')
+_READ_SIZE = 256 * 1024
+# Reads per poll() before yielding, so a flood of events can't starve the queue
+_MAX_READS = 16
+
+_inotify = None
+
+
+def _inotify_functions():
+    """(inotify_init1, inotify_add_watch) from libc, or False where unavailable"""
+    global _inotify
+
+    if _inotify is None:
+        _inotify = False
+        try:
+            import ctypes
+            import ctypes.util
+
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            init = libc.inotify_init1
+            init.argtypes = [ctypes.c_int]
+            add_watch = libc.inotify_add_watch
+            add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            _inotify = (init, add_watch)
+        except (OSError, AttributeError, TypeError):
+            pass
+    return _inotify
+
+
+def _libc_error(path: Optional[str] = None) -> OSError:
+    import ctypes
+
+    err = ctypes.get_errno()
+    return OSError(err, os.strerror(err), path)
+
+
+class InotifySource:
+    """Files closed after writing, or moved in, reported by inotify (Linux)"""
+
+    name = 'inotify'
+
+    def __init__(self, directories: Sequence[str]):
+        """
+        Raises:
+            OSError: if inotify is unavailable or a directory can't be watched
+        """
+        functions = _inotify_functions()
+        if not functions:
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        init, self._add_watch = functions
+        self.fd = init(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise _libc_error()
+        self._directories: Dict[int, str] = {}
+        try:
+            for directory in directories:
+                wd = self._add_watch(self.fd, os.fsencode(directory),
+                                     IN_CLOSE_WRITE | IN_MOVED_TO)
+                if wd < 0:
+                    raise _libc_error(directory)
+                self._directories[wd] = directory
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def poll(self, timeout: float) -> Tuple[List[str], bool]:
+        """
+        Wait up to timeout for events
+
+        Returns:
+            (paths written or moved in, whether the kernel queue overflowed
+            and events were lost)
+        """
+        paths: List[str] = []
+        overflow = False
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return paths, overflow
+
+        for _ in range(_MAX_READS):
+            try:
+                data = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                start = offset + _EVENT.size
+                offset = start + length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif mask & IN_IGNORED:
+                    # The directory was removed (or unmounted)
+                    self._directories.pop(wd, None)
+                elif not mask & IN_ISDIR and wd in self._directories:
+                    name = data[start:offset].rstrip(b'\0')
+                    if name:
+                        paths.append(os.path.join(self._directories[wd], os.fsdecode(name)))
+        return paths, overflow
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    """New or changed files found by rescanning the directories every interval"""
+
+    name = 'polling'
+
+    def __init__(self, directories: Sequence[str], interval: float = 1.0):
+        self.directories = list(directories)
+        self.interval = interval
+        # Directory -> name -> (size, mtime_ns) at the last scan
+        self._seen: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        self._next_scan = 0.0
+
+    def poll(self, timeout: float) -> Tuple[List[str], bool]:
+        """Paths that appeared or changed since the last scan (never overflows)"""
+        wait = self._next_scan - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if time.monotonic() < self._next_scan:
+                return [], False
+        self._next_scan = time.monotonic() + self.interval
+
+        changed = []
+        for directory in self.directories:
+            previous = self._seen.get(directory, {})
+            current = {}
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if not entry.is_file(follow_symlinks=False):
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        key = (st.st_size, st.st_mtime_ns)
+                        current[entry.name] = key
+                        if previous.get(entry.name) != key:
+                            changed.append(entry.path)
+            except OSError:
+                continue
+            self._seen[directory] = current
+        return changed, False
+
+    def close(self):
+        pass
+
+
+class _Pending:
+    """A file waiting to stop changing"""
+
+    __slots__ = ('size', 'mtime', 'detected', 'deadline')
+
+    def __init__(self, st: os.stat_result, detected: float, deadline: float):
+        self.size = st.st_size
+        self.mtime = st.st_mtime_ns
+        self.detected = detected
+        self.deadline = deadline
+
+
+class WatchFolderShredder:
+    """
+    Long-running shredder for drop directories
+
+    Files are picked up when a writer closes them (inotify IN_CLOSE_WRITE)
+    or moves them in (IN_MOVED_TO), or when a polling scan sees them where
+    inotify isn't available. A file is queued once its size and mtime have
+    not changed for ``settle`` seconds, then shredded with the next batch:
+    one ShredderEngine.shred_many call per batch, so small files get the
+    per-directory fast path and at most ``workers`` files are written at
+    once.
+
+    Memory is bounded by ``max_queue``: while it is full new files are not
+    tracked, and the directories are rescanned once the queue has drained
+    to half (as they are after an inotify overflow and at startup), so no
+    file is missed. Files whose shred failed are left in place and not
+    retried until they are replaced or changed.
+
+    Queue depth, lag and throughput are available from stats(), and are
+    written as JSON to ``status_file`` every ``status_interval`` seconds.
+
+    Example:
+        watcher = WatchFolderShredder(['/srv/to-destroy'], ShredderEngine(sync_policy='batched'))
+        watcher.start()
+        ...
+        watcher.stop()
+    """
+
+    def __init__(self, directories: Iterable[str], engine: Optional[ShredderEngine] = None,
+                 method: str = 'dod', verify: bool = True, workers: int = 4,
+                 batch_size: int = 512, batch_delay: float = 0.25, settle: float = 1.0,
+                 max_queue: int = 100_000, use_inotify: bool = True,
+                 poll_interval: float = 1.0, ignore: Sequence[str] = (),
+                 on_result: Optional[Callable[[dict], None]] = None,
+                 status_file: Optional[str] = None, status_interval: float = 10.0,
+                 window: float = 60.0, shred_options: Optional[dict] = None):
+        """
+        Args:
+            directories: Drop directories to watch (not recursive)
+            engine: Engine to shred with (default: ShredderEngine())
+            method, verify: As for shred_many
+            workers: Files shredded concurrently within a batch
+            batch_size: Most files per shred_many call
+            batch_delay: Seconds to let a batch fill before starting it
+            settle: Seconds a file's size and mtime must stay unchanged
+            max_queue: Most files tracked at once (settling, queued and shredding)
+            use_inotify: Use inotify where available (False = always poll)
+            poll_interval: Seconds between scans when polling
+            ignore: fnmatch patterns of names to leave alone
+            on_result: Called with every shred result (from the shredding thread)
+            status_file: Where to write stats() as JSON (None = nowhere)
+            status_interval: Seconds between status file updates
+            window: Seconds of history behind the lag and throughput figures
+            shred_options: Extra shred_many arguments (per_device, budgets, ...)
+
+        Raises:
+            ValueError: for a missing directory or an unknown method
+        """
+        self.directories = [str(Path(directory)) for directory in directories]
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                raise ValueError(f"Not a directory: {directory}")
+        self.engine = engine or ShredderEngine()
+        self.engine.methods.get(method)
+        self.method = method
+        self.verify = verify
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_delay = batch_delay
+        self.settle = settle
+        self.max_queue = max(1, max_queue)
+        self.use_inotify = use_inotify
+        self.poll_interval = poll_interval
+        self.ignore = [FreeSpaceShredder.TEMP_PREFIX + '*', *ignore]
+        self.on_result = on_result
+        self.status_file = Path(status_file) if status_file else None
+        self.status_interval = status_interval
+        self.window = window
+        self.shred_options = shred_options or {}
+
+        self.source = None
+        self._lock = threading.Lock()
+        self._ready_changed = threading.Condition(self._lock)
+        # Watch thread only: files settling, oldest deadline first
+        self._pending: 'OrderedDict[str, _Pending]' = OrderedDict()
+        # Shared: stable files waiting for a batch, as (path, detected, size)
+        self._ready = deque()
+        self._queued: Set[str] = set()
+        self._active: Set[Tuple[int, int]] = set()
+        # (st_dev, st_ino) -> time_ns of the failure, so a file that
+        # reuses the inode later isn't mistaken for the failed one
+        self._failed: Dict[Tuple[int, int], int] = {}
+        self._shredding = 0
+        self._rescan = True
+        self._stopping = threading.Event()
+        self._drain = False
+        self._threads: List[threading.Thread] = []
+
+        self._started = time.monotonic()
+        self._last_status = 0.0
+        # (finished at, lag seconds, bytes) per file, for the window figures
+        self._recent = deque()
+        self.totals = dict.fromkeys(('queued', 'shredded', 'failed', 'vanished',
+                                     'dropped_full', 'rescans', 'overflows'), 0)
+
+    # ---- Lifecycle ----
+
+    def start(self):
+        """Start watching and shredding on background threads"""
+        self.source = None
+        if self.use_inotify:
+            try:
+                self.source = InotifySource(self.directories)
+            except OSError:
+                pass
+        if self.source is None:
+            self.source = PollingSource(self.directories, self.poll_interval)
+
+        self._started = time.monotonic()
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._watch_loop, name='shredder-watch', daemon=True),
+            threading.Thread(target=self._shred_loop, name='shredder-batches', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, drain: bool = False):
+        """
+        Stop watching and wait for the threads
+
+        Args:
+            drain: Shred every file already queued first (otherwise only the
+                running batch is finished; files left behind are picked up
+                by the next start)
+        """
+        with self._lock:
+            self._drain = drain
+            self._stopping.set()
+            self._ready_changed.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._write_status()
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---- Watching ----
+
+    def _watch_loop(self):
+        tick = min(0.25, self.settle / 4) if self.settle > 0 else 0.05
+        while not self._stopping.is_set():
+            paths, overflow = self.source.poll(tick)
+            now = time.monotonic()
+            for path in paths:
+                self._candidate(path, now)
+            if overflow:
+                self._count('overflows')
+                self._rescan = True
+            if self._rescan and self.depth() <= self.max_queue // 2:
+                self._rescan_directories(now)
+            self._promote(time.monotonic())
+            if self.status_file and now - self._last_status >= self.status_interval:
+                self._write_status()
+
+    def _candidate(self, path: str, now: float):
+        """Start (or restart) the settle timer of a file that was written or appeared"""
+        name = os.path.basename(path)
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.ignore):
+            return
+        entry = self._pending.get(path)
+        if entry is None and self.depth() >= self.max_queue:
+            # Picked up again by the rescan once the queue drains
+            self._count('dropped_full')
+            self._rescan = True
+            return
+
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return
+        if not stat.S_ISREG(st.st_mode):
+            return
+        if entry is None:
+            self._pending[path] = _Pending(st, now, now + self.settle)
+        else:
+            entry.size, entry.mtime = st.st_size, st.st_mtime_ns
+            entry.deadline = now + self.settle
+            self._pending.move_to_end(path)
+
+    def _promote(self, now: float):
+        """Queue every settling file whose size and mtime held still"""
+        while self._pending:
+            path, entry = next(iter(self._pending.items()))
+            if entry.deadline > now:
+                break
+            del self._pending[path]
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            if (st.st_size, st.st_mtime_ns) != (entry.size, entry.mtime):
+                entry.size, entry.mtime = st.st_size, st.st_mtime_ns
+                entry.deadline = now + self.settle
+                self._pending[path] = entry
+                continue
+
+            key = (st.st_dev, st.st_ino)
+            with self._lock:
+                if path in self._queued or key in self._active:
+                    # Our own writes and renames come back as events, but a
+                    # new file may also reuse the name or the inode of one
+                    # being shredded: look again once its batch is done
+                    entry.deadline = now + self.settle
+                    self._pending[path] = entry
+                    continue
+                failed_at = self._failed.get(key)
+                if failed_at is not None and st.st_ctime_ns <= failed_at:
+                    continue
+                self.totals['queued'] += 1
+                self._ready.append((path, entry.detected, st.st_size))
+                self._queued.add(path)
+                self._ready_changed.notify()
+
+    def _rescan_directories(self, now: float):
+        """Offer every file in the directories (after startup, overflow or a full queue)"""
+        self._rescan = False
+        self._count('rescans')
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if self._rescan:
+                            # Full again: the next rescan continues
+                            return
+                        if entry.path not in self._pending:
+                            self._candidate(entry.path, now)
+            except OSError:
+                continue
+
+    # ---- Shredding ----
+
+    def _shred_loop(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            try:
+                self._shred_batch(batch)
+            except Exception as e:
+                # Keep serving; the batch's files stay where they are
+                self._count('failed', len(batch))
+                for path, _detected, _size in batch:
+                    if self.on_result:
+                        self.on_result({'success': False, 'error': str(e),
+                                        'file': os.path.basename(path), 'path': path})
+
+    def _take_batch(self) -> Optional[list]:
+        """Next batch of queued files, or None once stopping"""
+        with self._ready_changed:
+            while not self._ready:
+                if self._stopping.is_set():
+                    return None
+                self._ready_changed.wait(0.5)
+            if self._stopping.is_set() and not self._drain:
+                return None
+
+            # Give a burst a moment to fill the batch
+            deadline = time.monotonic() + self.batch_delay
+            while len(self._ready) < self.batch_size and not self._stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._ready_changed.wait(remaining)
+
+            batch = [self._ready.popleft() for _ in range(min(self.batch_size, len(self._ready)))]
+            self._shredding += len(batch)
+            return batch
+
+    def _shred_batch(self, batch: list):
+        files = {}
+        try:
+            for path, detected, size in batch:
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    self._count('vanished')
+                    continue
+                files[str(Path(path))] = (path, detected, (st.st_dev, st.st_ino))
+            with self._lock:
+                self._active.update(key for _path, _detected, key in files.values())
+
+            results = self.engine.shred_many([path for path, _d, _k in files.values()],
+                                             method=self.method, verify=self.verify,
+                                             workers=self.workers, **self.shred_options)
+            for result in results:
+                _path, detected, key = files.get(str(Path(result['path'])), (None, None, None))
+                now = time.monotonic()
+                with self._lock:
+                    if result['success']:
+                        self.totals['shredded'] += 1
+                    else:
+                        self.totals['failed'] += 1
+                        if key is not None:
+                            self._failed[key] = time.time_ns()
+                    if detected is not None:
+                        self._recent.append((now, now - detected,
+                                             result.get('bytes_written') or 0))
+                if self.on_result:
+                    self.on_result(result)
+        finally:
+            with self._lock:
+                for _path, _detected, key in files.values():
+                    self._active.discard(key)
+                for path, _detected, _size in batch:
+                    self._queued.discard(path)
+                self._shredding -= len(batch)
+
+    # ---- Reporting ----
+
+    def _count(self, name: str, n: int = 1):
+        """Add to a total (both threads update them)"""
+        with self._lock:
+            self.totals[name] += n
+
+    def depth(self) -> int:
+        """Files tracked: settling, queued and being shredded"""
+        return len(self._pending) + len(self._ready) + self._shredding
+
+    def stats(self) -> dict:
+        """Queue depth, lag and throughput (figures over the last ``window`` seconds)"""
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and self._recent[0][0] < now - self.window:
+                self._recent.popleft()
+            lags = [lag for _t, lag, _b in self._recent]
+            written = sum(nbytes for _t, _lag, nbytes in self._recent)
+            oldest = self._ready[0][1] if self._ready else None
+            ready, shredding = len(self._ready), self._shredding
+            totals = dict(self.totals)
+        try:
+            first = next(iter(self._pending.values()), None)
+        except RuntimeError:
+            # Changed by the watch thread mid-read
+            first = None
+        if first is not None:
+            oldest = first.detected if oldest is None else min(oldest, first.detected)
+        span = max(1e-9, min(self.window, now - self._started))
+
+        return {
+            'directories': self.directories,
+            'source': self.source.name if self.source else None,
+            'queue': {
+                'settling': len(self._pending),
+                'ready': ready,
+                'shredding': shredding,
+                'depth': len(self._pending) + ready + shredding,
+                'capacity': self.max_queue,
+            },
+            'lag': {
+                'oldest_seconds': now - oldest if oldest is not None else 0.0,
+                'average_seconds': sum(lags) / len(lags) if lags else 0.0,
+                'max_seconds': max(lags, default=0.0),
+            },
+            'throughput': {
+                'files_per_s': len(lags) / span,
+                'bytes_per_s': written / span,
+                'window_seconds': span,
+            },
+            'totals': totals,
+            'uptime_seconds': now - self._started,
+        }
+
+    def _write_status(self):
+        import json
+
+        self._last_status = time.monotonic()
+        if not self.status_file:
+            return
+        tmp_path = self.status_file.with_name(self.status_file.name + '.tmp')
+        try:
+            tmp_path.write_text(json.dumps({'timestamp': time.time(), **self.stats()}, indent=2),
+                                encoding='utf-8')
+            os.replace(tmp_path, self.status_file)
+        except OSError:
+            pass
@@ -4,16 +4,124 @@ Built with CustomTkinter for modern appearance
 """
 
 import customtkinter as ctk
+import tkinter as tk
 from tkinter import filedialog
 import threading
+import queue
 from pathlib import Path
 from datetime import datetime
 import os
 
-from core.shredder_engine import ShredderEngine, FreeSpaceShredder
+from core.job_list import DONE, FAILED, SHREDDING, STATUS_NAMES, JobList
+from core.journal import ShredJournal, default_journal_path
+from core.progress import ProgressTracker
+from core.scanner import DirectoryScanner
+from core.shredder_engine import ShredderEngine
+
+
+class VirtualFileList(ctk.CTkFrame):
+    """Scrollable file list that only draws the rows currently visible"""
+    
+    STATUS_COLORS = {
+        SHREDDING: "#F59E0B",
+        DONE: "gray50",
+        FAILED: "#DC2626"
+    }
+    
+    def __init__(self, master, jobs, format_size, font, **kwargs):
+        super().__init__(master, **kwargs)
+        self.jobs = jobs
+        self.format_size = format_size
+        self.font = font
+        self.row_height = font.metrics("linespace") + 2
+        self.first_row = 0
+        self._row_items = []
+        
+        colors = ctk.ThemeManager.theme["CTkTextbox"]
+        self.text_color = self._apply_appearance_mode(colors["text_color"])
+        
+        self.canvas = tk.Canvas(
+            self,
+            highlightthickness=0,
+            bd=0,
+            bg=self._apply_appearance_mode(colors["fg_color"])
+        )
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+        
+        self.canvas.bind("<Configure>", lambda event: self.refresh())
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", lambda event: self.yview("scroll", -3, "units"))
+        self.canvas.bind("<Button-5>", lambda event: self.yview("scroll", 3, "units"))
+    
+    def visible_rows(self):
+        """Number of rows that fit in the canvas"""
+        return max(1, self.canvas.winfo_height() // self.row_height)
+    
+    def yview(self, *args):
+        """Scrollbar protocol: 'moveto fraction' or 'scroll n units|pages'"""
+        total = len(self.jobs)
+        rows = self.visible_rows()
+        
+        if args[0] == "moveto":
+            first = int(float(args[1]) * total)
+        else:
+            step = rows if args[2] == "pages" else 1
+            first = self.first_row + int(args[1]) * step
+        
+        self.first_row = max(0, min(first, total - rows))
+        self.refresh()
+    
+    def _on_mousewheel(self, event):
+        self.yview("scroll", -3 if event.delta > 0 else 3, "units")
+    
+    def refresh(self):
+        """Redraw the visible rows from the job list"""
+        total = len(self.jobs)
+        rows = self.visible_rows()
+        self.first_row = max(0, min(self.first_row, total - rows))
+        
+        # Keep exactly one canvas text item per visible row
+        while len(self._row_items) < rows:
+            y = len(self._row_items) * self.row_height + 2
+            self._row_items.append(
+                self.canvas.create_text(4, y, anchor="nw", font=self.font)
+            )
+        while len(self._row_items) > rows:
+            self.canvas.delete(self._row_items.pop())
+        
+        for offset, item in enumerate(self._row_items):
+            index = self.first_row + offset
+            if index >= total:
+                self.canvas.itemconfigure(item, text="")
+                continue
+            
+            file_path, size, status = self.jobs.row(index)
+            size_str = "Error reading size" if size is None else self.format_size(size)
+            text = f"{index + 1}. {file_path} ({size_str})"
+            if status in self.STATUS_COLORS:
+                text += f" [{STATUS_NAMES[status]}]"
+            self.canvas.itemconfigure(
+                item,
+                text=text,
+                fill=self.STATUS_COLORS.get(status, self.text_color)
+            )
+        
+        if total:
+            self.scrollbar.set(self.first_row / total, min(1.0, (self.first_row + rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
 
 
 class ModernShredderGUI:
+    # Number of files shredded concurrently
+    SHRED_WORKERS = 4
+    # How often a running folder scan pushes new files to the list (ms)
+    SCAN_POLL_MS = 100
+    # How often shred progress and finished results are applied to the UI (ms)
+    RESULT_POLL_MS = 100
+    
     def __init__(self):
         # Set appearance
         ctk.set_appearance_mode("dark")
@@ -25,14 +133,38 @@ class ModernShredderGUI:
         self.root.geometry("900x700")
         
         # Initialize engine
-        self.engine = ShredderEngine(progress_callback=self.update_progress)
-        self.free_space_engine = FreeSpaceShredder(progress_callback=self.update_progress)
+        # Workers report into the tracker; the Tk thread polls it
+        self.progress = ProgressTracker()
+        # Interrupted files resume from the journal instead of starting over
+        try:
+            self.journal = ShredJournal(default_journal_path())
+        except OSError:
+            self.journal = None
+        self.engine = ShredderEngine(progress=self.progress, journal=self.journal)
         
         # File list
-        self.files_to_shred = []
+        self.files_to_shred = JobList()
+        self.scanner = None
+        self.results_queue = queue.Queue()
+        self.shred_results = []
         self.is_shredding = False
         
         self._create_ui()
+        self._restore_interrupted()
+        
+    def _restore_interrupted(self):
+        """Queue files an interrupted run left unfinished"""
+        if not self.journal:
+            return
+        pending = self.journal.pending()
+        if pending:
+            # Listed where they are now: a rename target, if the run got that far
+            self.files_to_shred.extend((str(entry.current_path()), entry.size)
+                                       for entry in pending)
+            self.update_file_list()
+            self.status_label.configure(
+                text=f"Restored {len(pending)} interrupted file(s) - shred to resume"
+            )
         
     def _create_ui(self):
         """Create the user interface"""
@@ -132,11 +264,12 @@ class ModernShredderGUI:
         )
         self.file_count_label.pack(side="right", padx=10)
         
-        # File list (scrollable)
-        self.file_listbox = ctk.CTkTextbox(
+        # File list (scrollable, only visible rows are drawn)
+        self.file_listbox = VirtualFileList(
             file_frame,
-            font=ctk.CTkFont(family="Consolas", size=11),
-            wrap="none"
+            jobs=self.files_to_shred,
+            format_size=self.format_size,
+            font=ctk.CTkFont(family="Consolas", size=11)
         )
         self.file_listbox.pack(fill="both", expand=True, padx=10, pady=10)
         
@@ -208,10 +341,14 @@ class ModernShredderGUI:
             filetypes=[("All files", "*.*")]
         )
         
+        entries = []
         for file in files:
-            if file not in self.files_to_shred:
-                self.files_to_shred.append(file)
+            try:
+                entries.append((file, os.path.getsize(file)))
+            except OSError:
+                entries.append((file, None))
         
+        self.files_to_shred.extend(entries)
         self.update_file_list()
     
     def add_folder(self):
@@ -219,39 +356,56 @@ class ModernShredderGUI:
         folder = filedialog.askdirectory(title="Select folder to shred")
         
         if folder:
-            for root, dirs, files in os.walk(folder):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if file_path not in self.files_to_shred:
-                        self.files_to_shred.append(file_path)
+            if self.scanner:
+                self.scanner.cancel()
+            
+            # Enumerate in the background and stream batches into the list
+            self.scanner = DirectoryScanner(folder)
+            self.scanner.start()
+            self.status_label.configure(text=f"Scanning {folder}...")
+            self.root.after(self.SCAN_POLL_MS, self._poll_scanner, self.scanner)
+    
+    def _poll_scanner(self, scanner):
+        """Move scanned batches into the file list (runs on the Tk thread)"""
+        if scanner is not self.scanner:
+            return
+        
+        finished = False
+        while True:
+            try:
+                batch = scanner.batches.get_nowait()
+            except queue.Empty:
+                break
+            if batch is None:
+                finished = True
+                break
+            self.files_to_shred.extend(batch)
         
         self.update_file_list()
+        
+        if finished:
+            self.scanner = None
+            if not self.is_shredding:
+                self.status_label.configure(text="Ready to shred")
+        else:
+            self.root.after(self.SCAN_POLL_MS, self._poll_scanner, scanner)
     
     def clear_list(self):
         """Clear file list"""
-        self.files_to_shred = []
+        if self.scanner:
+            self.scanner.cancel()
+            self.scanner = None
+        self.files_to_shred.clear()
         self.update_file_list()
     
     def update_file_list(self):
-        """Update the file listbox"""
-        self.file_listbox.delete("1.0", "end")
-        
-        total_size = 0
-        
-        for i, file_path in enumerate(self.files_to_shred, 1):
-            try:
-                size = os.path.getsize(file_path)
-                total_size += size
-                size_str = self.format_size(size)
-                
-                self.file_listbox.insert("end", f"{i}. {file_path} ({size_str})\n")
-            except:
-                self.file_listbox.insert("end", f"{i}. {file_path} (Error reading size)\n")
+        """Redraw the visible part of the file list and the running totals"""
+        self.file_listbox.refresh()
         
         # Update count label
         count = len(self.files_to_shred)
         self.file_count_label.configure(
-            text=f"Files: {count} | Total: {self.format_size(total_size)}"
+            text=f"Files: {count} | Total: {self.format_size(self.files_to_shred.total_bytes)}"
         )
     
     def format_size(self, bytes_size):
@@ -262,11 +416,21 @@ class ModernShredderGUI:
             bytes_size /= 1024.0
         return f"{bytes_size:.2f} PB"
     
-    def update_progress(self, progress):
-        """Update progress bar"""
+    def format_eta(self, seconds):
+        """Format seconds as H:MM:SS"""
+        if seconds is None:
+            return "--:--"
+        minutes, secs = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+    
+    def update_progress(self, progress, mb_per_s=None, eta_seconds=None):
+        """Update progress bar (Tk thread only)"""
         self.progress_bar.set(progress / 100)
-        self.progress_label.configure(text=f"{progress}%")
-        self.root.update_idletasks()
+        text = f"{progress}%"
+        if mb_per_s is not None:
+            text += f" | {mb_per_s:.1f} MB/s | ETA {self.format_eta(eta_seconds)}"
+        self.progress_label.configure(text=text)
     
     def start_shredding(self):
         """Start shredding process"""
@@ -277,6 +441,10 @@ class ModernShredderGUI:
             self.show_warning("No files selected!")
             return
         
+        if self.scanner:
+            self.show_warning("Folder scan still in progress!")
+            return
+        
         # Confirmation dialog
         confirm = ctk.CTkInputDialog(
             text="Type 'DELETE' to confirm permanent file destruction:",
@@ -289,43 +457,84 @@ class ModernShredderGUI:
         self.is_shredding = True
         self.shred_button.configure(state="disabled", text="🔥 SHREDDING IN PROGRESS...")
         
-        # Run in thread
-        thread = threading.Thread(target=self.shred_files_thread)
+        # Run in thread on a snapshot of the queue
+        files = list(self.files_to_shred)
+        self.shred_results = []
+        self.progress.reset()
+        thread = threading.Thread(target=self.shred_files_thread, args=(files,))
         thread.daemon = True
         thread.start()
+        
+        self.root.after(self.RESULT_POLL_MS, self._poll_results, len(files))
     
-    def shred_files_thread(self):
+    def shred_files_thread(self, files):
         """Shred files in background thread"""
         method = self.method_var.get()
         verify = self.verify_var.get()
+        done = set()
+        
+        try:
+            for result in self.engine.shred_many(files, method=method, verify=verify,
+                                                 workers=self.SHRED_WORKERS):
+                done.add(result['path'])
+                self.results_queue.put(result)
+        except Exception as e:
+            # Fail whatever the batch didn't get to, so the files stay queued
+            for path in files:
+                if str(path) not in done:
+                    self.results_queue.put({'success': False, 'error': str(e),
+                                            'file': str(path), 'path': str(path)})
+        finally:
+            # Complete
+            self.results_queue.put(None)
+    
+    def _poll_results(self, total_files):
+        """Apply progress and finished shred results to the UI (runs on the Tk thread)"""
+        finished = False
+        last = None
+        while True:
+            try:
+                result = self.results_queue.get_nowait()
+            except queue.Empty:
+                break
+            if result is None:
+                finished = True
+                break
+            self.shred_results.append(result)
+            self.files_to_shred.set_status(result['path'], DONE if result['success'] else FAILED)
+            last = result
+        
+        if last is not None:
+            self.status_label.configure(
+                text=f"Shredded {len(self.shred_results)}/{total_files}: {Path(last['file']).name}"
+            )
+            self.update_file_list()
         
-        total_files = len(self.files_to_shred)
+        snapshot = self.progress.snapshot()
+        self.update_progress(snapshot['percent'], snapshot['mb_per_s'], snapshot['eta_seconds'])
+        
+        if finished:
+            self.is_shredding = False
+            self.shredding_complete(self.shred_results)
+        else:
+            self.root.after(self.RESULT_POLL_MS, self._poll_results, total_files)
+    
+    def shredding_complete(self, results):
+        """Handle shredding completion"""
         shredded = 0
         failed = 0
+        unverified = 0
         
-        results = []
-        
-        for i, file_path in enumerate(self.files_to_shred, 1):
-            self.status_label.configure(
-                text=f"Shredding {i}/{total_files}: {Path(file_path).name}"
-            )
-            
-            result = self.engine.shred_file(file_path, method=method, verify=verify)
-            results.append(result)
-            
+        # Drop shredded files; failed ones stay queued for another attempt
+        for result in results:
             if result['success']:
                 shredded += 1
+                self.files_to_shred.remove(result['path'])
+                if result['verified'] and result['verified']['recoverable']:
+                    unverified += 1
             else:
                 failed += 1
         
-        # Complete
-        self.is_shredding = False
-        self.files_to_shred = []
-        
-        self.root.after(0, lambda: self.shredding_complete(shredded, failed, results))
-    
-    def shredding_complete(self, shredded, failed, results):
-        """Handle shredding completion"""
         self.update_file_list()
         self.progress_bar.set(0)
         self.progress_label.configure(text="0%")
@@ -337,7 +546,10 @@ class ModernShredderGUI:
         # Show results
         message = f"✅ Shredding Complete!\n\n"
         message += f"Successfully shredded: {shredded}\n"
-        message += f"Failed: {failed}\n\n"
+        message += f"Failed: {failed}\n"
+        if unverified:
+            message += f"⚠️ Read-back mismatch (data may remain on disk): {unverified}\n"
+        message += "\n"
         
         if shredded > 0:
             message += "Files have been PERMANENTLY deleted and cannot be recovered."